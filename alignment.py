@@ -0,0 +1,754 @@
+import bisect
+import difflib
+import logging
+from array import array
+
+# Words of unchanged narration re-aligned on each side of a changed region.
+REALIGN_MARGIN = 20
+# Streaming alignment: opcodes are final once an 'equal' run of STREAM_ANCHOR
+# tokens after them lies at least STREAM_SETTLE tokens behind the newest word.
+# New words are aligned every STREAM_STEP tokens, against a manuscript window
+# STREAM_SLACK times as long as the unsettled transcript (plus STREAM_SETTLE).
+STREAM_ANCHOR = 4
+STREAM_SETTLE = 64
+STREAM_STEP = 256
+STREAM_SLACK = 1.25
+# Unsettled tokens allowed before they are finalized without an anchor, which
+# bounds the work per step when the narration stops matching (e.g. ad-libbing).
+STREAM_MAX_PENDING = 8192
+
+
+class Alignment:
+    """
+    The result of aligning manuscript tokens with transcribed words, computed once
+    and shared by mismatch detection and the karaoke word map.
+
+    Besides the difflib-style opcodes it holds a manuscript<->transcript index
+    mapping for every paired token ('equal' and 'replace' blocks), with -1 marking
+    tokens that have no counterpart.
+
+    The opcodes index transcript tokens. When a transcribed word was split into
+    several tokens, `token_to_word` maps them back, and the lookup methods below
+    return word indices.
+    """
+
+    def __init__(
+        self, opcodes, manuscript_length, transcript_length, token_to_word=None
+    ):
+        """
+        Args:
+            opcodes (list): (tag, i1, i2, j1, j2) tuples covering both sequences, or
+                            only the aligned span of the manuscript.
+            manuscript_length (int): Number of manuscript tokens that were aligned.
+            transcript_length (int): Number of transcript tokens that were aligned.
+            token_to_word (array, optional): The transcribed word index of every
+                            transcript token, from tokenizer.split_words(). None
+                            when tokens and words are the same.
+        """
+        self.opcodes = opcodes
+        self.token_to_word = token_to_word
+        self.manuscript_to_transcript = array("l", [-1]) * manuscript_length
+        self.transcript_to_manuscript = array("l", [-1]) * transcript_length
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal" or tag == "replace":
+                size = min(i2 - i1, j2 - j1)
+                self.manuscript_to_transcript[i1 : i1 + size] = array(
+                    "l", range(j1, j1 + size)
+                )
+                self.transcript_to_manuscript[j1 : j1 + size] = array(
+                    "l", range(i1, i1 + size)
+                )
+
+    def transcript_index(self, manuscript_index):
+        """Returns the transcribed word index paired with a manuscript token, or None."""
+        index = self.manuscript_to_transcript[manuscript_index]
+        if index < 0:
+            return None
+        return index if self.token_to_word is None else self.token_to_word[index]
+
+    def manuscript_index(self, transcript_index):
+        """
+        Returns the manuscript token index paired with a transcribed word (its first
+        paired token, for a word split into several), or None.
+        """
+        if self.token_to_word is None:
+            index = self.transcript_to_manuscript[transcript_index]
+            return index if index >= 0 else None
+        token = bisect.bisect_left(self.token_to_word, transcript_index)
+        while (
+            token < len(self.token_to_word)
+            and self.token_to_word[token] == transcript_index
+        ):
+            if self.transcript_to_manuscript[token] >= 0:
+                return self.transcript_to_manuscript[token]
+            token += 1
+        return None
+
+    def pairs(self):
+        """
+        Yields (manuscript_index, transcript_index) for every paired token, with
+        transcribed word indices; a split word appears once per paired token.
+        """
+        token_to_word = self.token_to_word
+        for i, j in enumerate(self.manuscript_to_transcript):
+            if j >= 0:
+                yield i, (j if token_to_word is None else token_to_word[j])
+
+    def word_range(self, j1, j2, word_count):
+        """
+        Converts a [j1, j2) transcript token range into the range of transcribed
+        words it touches. An empty range maps to the position before the word
+        holding token j1.
+
+        Args:
+            j1 (int): First token of the range.
+            j2 (int): Token after the range.
+            word_count (int): Number of transcribed words.
+        """
+        return word_range(self.token_to_word, j1, j2, word_count)
+
+    def word_opcodes(self, word_count, mismatches_only=False):
+        """
+        Returns the opcodes with transcript ranges converted to word ranges.
+
+        Args:
+            word_count (int): Number of transcribed words.
+            mismatches_only (bool): Leave out the 'equal' opcodes.
+        """
+        opcodes = self.mismatch_opcodes() if mismatches_only else self.opcodes
+        if self.token_to_word is None:
+            return opcodes
+        return [
+            (tag, i1, i2) + self.word_range(j1, j2, word_count)
+            for tag, i1, i2, j1, j2 in opcodes
+        ]
+
+    def mismatch_opcodes(self):
+        """Returns only the non-'equal' opcodes."""
+        return [opcode for opcode in self.opcodes if opcode[0] != "equal"]
+
+
+def word_range(token_to_word, j1, j2, word_count):
+    """See Alignment.word_range(); token_to_word may be None."""
+    if token_to_word is None:
+        return j1, j2
+    w1 = token_to_word[j1] if j1 < len(token_to_word) else word_count
+    if j2 == j1:
+        return w1, w1
+    return w1, token_to_word[j2 - 1] + 1
+
+
+class DifflibAligner:
+    """
+    The original alignment: one difflib.SequenceMatcher over both full sequences.
+
+    Kept selectable so results from the faster engines can be compared against it.
+    """
+
+    name = "difflib"
+
+    def get_opcodes(self, a, b):
+        """
+        Returns difflib-style (tag, i1, i2, j1, j2) opcodes turning `a` into `b`.
+        """
+        matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+        return matcher.get_opcodes()
+
+
+class AnchorAligner:
+    """
+    Anchor-based alignment in the spirit of patience/histogram diff.
+
+    Both sequences are normally vocabulary ids (see vocabulary.Vocabulary), so
+    every comparison and n-gram key is on small integers rather than strings.
+    Words (or short n-grams) that occur exactly once on both sides are used as
+    anchors. The longest chain of anchors that is increasing on both sides splits
+    the problem into small gaps, which are then solved independently. Gaps
+    without anchors are solved by a bounded, banded edit-distance alignment, so
+    the cost grows with the size of the differences rather than with the square
+    of the chapter length.
+    """
+
+    name = "anchor"
+
+    def __init__(self, max_ngram=3, band_width=32, max_cells=1000000):
+        """
+        Args:
+            max_ngram (int): Longest n-gram tried when a gap has no unique words.
+            band_width (int): Half-width of the diagonal band used in gap alignment.
+            max_cells (int): Upper bound on DP cells for a single gap. Gaps that
+                             would exceed it are reported as one block.
+        """
+        self.max_ngram = max_ngram
+        self.band_width = band_width
+        self.max_cells = max_cells
+
+    def get_opcodes(self, a, b):
+        """
+        Returns difflib-style (tag, i1, i2, j1, j2) opcodes turning `a` into `b`.
+        """
+        builder = _OpcodeBuilder()
+        # The stack holds pending gaps and already-known equal runs, in reverse
+        # output order, so opcodes are produced left to right.
+        stack = [("gap", 0, len(a), 0, len(b))]
+        while stack:
+            kind, alo, ahi, blo, bhi = stack.pop()
+            if kind == "equal":
+                builder.add("equal", alo, ahi, blo, bhi)
+                continue
+
+            # --- Trim the common prefix and suffix of the gap ---
+            start_a = alo
+            while alo < ahi and blo < bhi and a[alo] == b[blo]:
+                alo += 1
+                blo += 1
+            builder.add("equal", start_a, alo, blo - (alo - start_a), blo)
+
+            end_a = ahi
+            while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+                ahi -= 1
+                bhi -= 1
+            if ahi < end_a:
+                stack.append(("equal", ahi, end_a, bhi, bhi + (end_a - ahi)))
+
+            if alo == ahi or blo == bhi:
+                builder.add("replace", alo, ahi, blo, bhi)
+                continue
+
+            anchors = self._find_anchors(a, b, alo, ahi, blo, bhi)
+            if not anchors:
+                for opcode in self._banded_opcodes(a, b, alo, ahi, blo, bhi):
+                    builder.add(*opcode)
+                continue
+
+            pieces = []
+            cur_a, cur_b = alo, blo
+            for i, j, size in anchors:
+                pieces.append(("gap", cur_a, i, cur_b, j))
+                pieces.append(("equal", i, i + size, j, j + size))
+                cur_a, cur_b = i + size, j + size
+            pieces.append(("gap", cur_a, ahi, cur_b, bhi))
+            stack.extend(reversed(pieces))
+
+        return builder.opcodes
+
+    def _find_anchors(self, a, b, alo, ahi, blo, bhi):
+        """
+        Finds the longest increasing chain of n-grams unique to both slices.
+
+        Returns:
+            list: (i, j, size) tuples, strictly increasing and non-overlapping.
+        """
+        for n in range(1, self.max_ngram + 1):
+            if ahi - alo < n or bhi - blo < n:
+                break
+            unique_a = _unique_ngrams(a, alo, ahi, n)
+            if not unique_a:
+                continue
+            unique_b = _unique_ngrams(b, blo, bhi, n)
+            pairs = sorted(
+                (i, unique_b[key]) for key, i in unique_a.items() if key in unique_b
+            )
+            if not pairs:
+                continue
+            chain = _longest_increasing_chain(pairs)
+
+            # Overlapping n-grams on the same diagonal are merged into one run;
+            # any other overlap is dropped to keep the anchors disjoint.
+            anchors = []
+            for i, j in chain:
+                if anchors:
+                    prev_i, prev_j, prev_size = anchors[-1]
+                    if i < prev_i + prev_size or j < prev_j + prev_size:
+                        if i - prev_i == j - prev_j:
+                            anchors[-1] = (prev_i, prev_j, i + n - prev_i)
+                        continue
+                anchors.append((i, j, n))
+            return anchors
+        return []
+
+    def _banded_opcodes(self, a, b, alo, ahi, blo, bhi):
+        """
+        Aligns a gap with an edit-distance DP restricted to a diagonal band.
+        """
+        n = ahi - alo
+        m = bhi - blo
+        if (n + 1) * (m + 1) <= self.max_cells:
+            width = m
+        else:
+            width = self.band_width + m // n + 1
+            if (n + 1) * (2 * width + 1) > self.max_cells:
+                logging.warning(
+                    f"Alignment gap of {n}x{m} tokens has no anchors and exceeds the "
+                    f"DP budget; reporting it as a single block."
+                )
+                return [("replace", alo, ahi, blo, bhi)]
+
+        def band(row):
+            center = row * m // n
+            return max(0, center - width), min(m, center + width)
+
+        # trace codes: 0 = diagonal, 1 = up (delete a[i]), 2 = left (insert b[j])
+        prev_lo, prev_hi = band(0)
+        prev = list(range(prev_hi - prev_lo + 1))
+        traces = [(prev_lo, bytearray([2]) * (prev_hi - prev_lo + 1))]
+        for row in range(1, n + 1):
+            lo, hi = band(row)
+            cur = [0] * (hi - lo + 1)
+            trace = bytearray(hi - lo + 1)
+            token = a[alo + row - 1]
+            for col in range(lo, hi + 1):
+                best = None
+                code = 0
+                if col > 0 and prev_lo <= col - 1 <= prev_hi:
+                    best = prev[col - 1 - prev_lo] + (token != b[blo + col - 1])
+                if prev_lo <= col <= prev_hi:
+                    cost = prev[col - prev_lo] + 1
+                    if best is None or cost < best:
+                        best, code = cost, 1
+                if col > lo:
+                    cost = cur[col - 1 - lo] + 1
+                    if best is None or cost < best:
+                        best, code = cost, 2
+                cur[col - lo] = best
+                trace[col - lo] = code
+            traces.append((lo, trace))
+            prev, prev_lo, prev_hi = cur, lo, hi
+
+        # --- Walk the trace back from the bottom-right corner ---
+        steps = []
+        row, col = n, m
+        while row > 0 or col > 0:
+            lo, trace = traces[row]
+            code = trace[col - lo] if row > 0 else 2
+            if code == 0:
+                row -= 1
+                col -= 1
+                equal = a[alo + row] == b[blo + col]
+                steps.append(("equal" if equal else "replace", row, col, 1, 1))
+            elif code == 1:
+                row -= 1
+                steps.append(("replace", row, col, 1, 0))
+            else:
+                col -= 1
+                steps.append(("replace", row, col, 0, 1))
+
+        builder = _OpcodeBuilder()
+        for tag, row, col, da, db in reversed(steps):
+            builder.add(tag, alo + row, alo + row + da, blo + col, blo + col + db)
+        return builder.opcodes
+
+
+class _OpcodeBuilder:
+    """
+    Accumulates contiguous spans and merges them into difflib-style opcodes.
+
+    Adjacent equal spans are merged, and adjacent non-equal spans are merged into
+    a single block tagged 'replace', 'delete' or 'insert' from its final shape.
+    """
+
+    def __init__(self):
+        self.opcodes = []
+
+    def add(self, tag, i1, i2, j1, j2):
+        if i1 == i2 and j1 == j2:
+            return
+        is_equal = tag == "equal"
+        if self.opcodes:
+            last_tag, li1, li2, lj1, lj2 = self.opcodes[-1]
+            if (last_tag == "equal") == is_equal:
+                i1, j1 = li1, lj1
+                self.opcodes.pop()
+        if not is_equal:
+            if i1 == i2:
+                tag = "insert"
+            elif j1 == j2:
+                tag = "delete"
+            else:
+                tag = "replace"
+        self.opcodes.append((tag, i1, i2, j1, j2))
+
+
+def _unique_ngrams(seq, lo, hi, n):
+    """
+    Maps every n-gram occurring exactly once in seq[lo:hi] to its position.
+    """
+    seen = {}
+    repeated = set()
+    window = seq[lo:hi]
+    # zip() builds the n-gram tuples in C instead of slicing once per position.
+    keys = window if n == 1 else zip(*(window[k:] for k in range(n)))
+    for k, key in enumerate(keys, lo):
+        if key in seen:
+            repeated.add(key)
+        else:
+            seen[key] = k
+    for key in repeated:
+        del seen[key]
+    return seen
+
+
+def _longest_increasing_chain(pairs):
+    """
+    Patience-sorts (i, j) pairs (sorted by i) into the longest chain increasing in j.
+    """
+    tails = []  # j value at the end of the best chain of each length
+    tail_index = []
+    back = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        back[k] = tail_index[pos - 1] if pos > 0 else None
+
+    chain = []
+    k = tail_index[-1] if tail_index else None
+    while k is not None:
+        chain.append(pairs[k])
+        k = back[k]
+    chain.reverse()
+    return chain
+
+
+ALIGNERS = {
+    AnchorAligner.name: AnchorAligner,
+    DifflibAligner.name: DifflibAligner,
+}
+
+DEFAULT_ALIGNER = AnchorAligner.name
+
+
+def align(
+    manuscript_words,
+    transcribed_words,
+    aligner=None,
+    manuscript_span=None,
+    match_span=None,
+    token_to_word=None,
+):
+    """
+    Aligns two sequences of words and returns an Alignment.
+
+    Args:
+        manuscript_words (array or list): Manuscript tokens as vocabulary ids (or
+                                          normalized words).
+        transcribed_words (array or list): Transcribed words, encoded the same way.
+        aligner (str or object, optional): See get_aligner().
+        manuscript_span (tuple, optional): A (start, end) token range to align the
+                                           transcript against, e.g. one chapter of
+                                           a whole-book manuscript. Tokens outside
+                                           it are left unpaired and produce no
+                                           opcodes. Defaults to the whole manuscript.
+        match_span (tuple, optional): The (start, end) range the transcript is known
+                                      to cover inside a padded manuscript_span.
+                                      Deletions at the very start or end of the
+                                      transcript are clipped to it, so the padding
+                                      is not reported as skipped text.
+        token_to_word (array, optional): See Alignment.
+    """
+    start, end = manuscript_span or (0, len(manuscript_words))
+    opcodes = get_aligner(aligner).get_opcodes(
+        manuscript_words[start:end], transcribed_words
+    )
+    if start:
+        opcodes = [
+            (tag, i1 + start, i2 + start, j1, j2) for tag, i1, i2, j1, j2 in opcodes
+        ]
+    if match_span is not None:
+        opcodes = _clip_edge_deletions(opcodes, match_span, len(transcribed_words))
+    return Alignment(
+        opcodes, len(manuscript_words), len(transcribed_words), token_to_word
+    )
+
+
+def realign(
+    alignment,
+    manuscript_words,
+    transcribed_words,
+    changed_range,
+    aligner=None,
+    margin=REALIGN_MARGIN,
+    token_to_word=None,
+):
+    """
+    Updates an alignment after part of the transcript was replaced, e.g. by pickups
+    or a partial re-record, re-aligning only the affected region.
+
+    The region is widened from the changed words to the nearest 'equal' blocks on
+    both sides (plus `margin` words into them). Opcodes outside it are kept, with
+    the ones after it shifted to the new transcript positions.
+
+    Args:
+        alignment (Alignment): The alignment with the old transcript.
+        manuscript_words (array or list): Manuscript tokens as vocabulary ids.
+        transcribed_words (array or list): The complete new transcript, encoded
+                                           with the same vocabulary.
+        changed_range (tuple): (start, old_end, new_end): the old transcript tokens
+                               [start, old_end) were replaced by the new tokens
+                               [start, new_end).
+        aligner (str or object, optional): See get_aligner().
+        margin (int): Words of the surrounding 'equal' blocks re-aligned as well.
+        token_to_word (array, optional): The new transcript's token-to-word map.
+
+    Returns:
+        tuple: (new_alignment, region), where region is the re-aligned
+               (manuscript_start, manuscript_end, transcript_start, old_end,
+               new_end) range.
+    """
+    start, old_end, new_end = changed_range
+    shift = new_end - old_end
+    opcodes = alignment.opcodes
+    manuscript_length = len(alignment.manuscript_to_transcript)
+
+    # Cut inside the nearest equal block before the change, keeping at least one
+    # equal word on the left so no mismatch merges across the cut.
+    left = bisect.bisect_left([opcode[3] for opcode in opcodes], start) - 1
+    while left >= 0 and opcodes[left][0] != "equal":
+        left -= 1
+    builder = _OpcodeBuilder()
+    if left >= 0:
+        _, i1, _, j1, j2 = opcodes[left]
+        j_lo = max(j1 + 1, min(j2, start) - margin)
+        i_lo = i1 + (j_lo - j1)
+        for opcode in opcodes[:left]:
+            builder.add(*opcode)
+        builder.add("equal", i1, i_lo, j1, j_lo)
+    else:
+        i_lo, j_lo = (opcodes[0][1], opcodes[0][3]) if opcodes else (0, 0)
+
+    # The same on the right, in old transcript positions.
+    right = bisect.bisect_right([opcode[4] for opcode in opcodes], old_end)
+    while right < len(opcodes) and opcodes[right][0] != "equal":
+        right += 1
+    if right < len(opcodes):
+        _, i1, i2, j1, j2 = opcodes[right]
+        j_hi = min(j2 - 1, max(j1, old_end) + margin)
+        i_hi = i1 + (j_hi - j1)
+    elif opcodes:
+        i_hi, j_hi = opcodes[-1][2], opcodes[-1][4]
+    else:
+        i_hi, j_hi = manuscript_length, old_end
+
+    middle = get_aligner(aligner).get_opcodes(
+        manuscript_words[i_lo:i_hi], transcribed_words[j_lo : j_hi + shift]
+    )
+    for tag, i1, i2, j1, j2 in middle:
+        builder.add(tag, i1 + i_lo, i2 + i_lo, j1 + j_lo, j2 + j_lo)
+    if right < len(opcodes):
+        _, i1, i2, j1, j2 = opcodes[right]
+        builder.add("equal", i_hi, i2, j_hi + shift, j2 + shift)
+        for tag, i1, i2, j1, j2 in opcodes[right + 1 :]:
+            builder.add(tag, i1, i2, j1 + shift, j2 + shift)
+
+    new_alignment = Alignment(
+        builder.opcodes, manuscript_length, len(transcribed_words), token_to_word
+    )
+    return new_alignment, (i_lo, i_hi, j_lo, j_hi, j_hi + shift)
+
+
+class StreamingAlignment:
+    """
+    Aligns a transcript that is still being produced, a piece at a time.
+
+    Only the transcript tokens since the last final opcode (the unsettled tail)
+    are aligned on each step, against a manuscript window that starts where the
+    final opcodes end and is sized to the tail, so memory and the work per step
+    stay bounded however long the chapter. Opcodes become final once an 'equal'
+    run of `anchor` tokens follows them and at least `settle` tokens have been
+    aligned behind that run. Later words can then no longer change them in
+    practice, because the next step starts from that match.
+    """
+
+    def __init__(
+        self,
+        manuscript_words,
+        aligner=None,
+        manuscript_span=None,
+        token_to_word=None,
+        anchor=STREAM_ANCHOR,
+        settle=STREAM_SETTLE,
+        step=STREAM_STEP,
+        max_pending=STREAM_MAX_PENDING,
+        typecode="l",
+    ):
+        """
+        Args:
+            manuscript_words (array or list): Manuscript tokens as vocabulary ids.
+            aligner (str or object, optional): See get_aligner().
+            manuscript_span (tuple, optional): The (start, end) token range the
+                                               transcript starts and ends in.
+                                               Defaults to the whole manuscript.
+            token_to_word (array, optional): The transcribed word of every token,
+                                             extended by the caller as words
+                                             arrive, so steps never finalize half
+                                             of a split word.
+            anchor (int): Equal tokens that make an opcode final.
+            settle (int): Tokens aligned behind the anchor before it counts.
+            step (int): New tokens collected between alignment steps.
+            max_pending (int): Unsettled tokens finalized without an anchor.
+            typecode (str): Array typecode of the transcript tokens passed to
+                            extend(), e.g. vocabulary.ID_TYPECODE.
+        """
+        self.manuscript_words = manuscript_words
+        self.aligner = get_aligner(aligner)
+        self.start, self.end = manuscript_span or (0, len(manuscript_words))
+        self.token_to_word = token_to_word
+        self.anchor = anchor
+        self.settle = settle
+        self.step = step
+        self.max_pending = max_pending
+        self.transcript = array(typecode)
+        # Where the final opcodes end, on both sides.
+        self.i = self.start
+        self.j = 0
+        self._builder = _OpcodeBuilder()
+        self._aligned_length = 0
+
+    @property
+    def opcodes(self):
+        """The final opcodes so far."""
+        return self._builder.opcodes
+
+    def seek(self, manuscript_start):
+        """
+        Moves the start of the manuscript window, e.g. to a chapter located in a
+        whole-book manuscript. Only allowed before any opcode is final.
+        """
+        if self.opcodes:
+            raise ValueError("The alignment has already started.")
+        self.i = self.start = manuscript_start
+
+    def extend(self, transcript_words):
+        """
+        Appends transcript tokens and aligns them once enough have arrived.
+
+        Args:
+            transcript_words (iterable): New tokens, encoded like the manuscript.
+
+        Returns:
+            list: The opcodes that became final, possibly none.
+        """
+        self.transcript.extend(transcript_words)
+        if len(self.transcript) - self._aligned_length < self.step:
+            return []
+        return self._advance(final=False)
+
+    def finish(self, clip_end=False):
+        """
+        Aligns the remaining tail once the transcript is complete.
+
+        Args:
+            clip_end (bool): Drop a trailing deletion, i.e. the manuscript after
+                             the last narrated word. Use it when the manuscript
+                             span runs past the chapter (a whole book).
+
+        Returns:
+            list: The opcodes that became final.
+        """
+        return self._advance(final=True, clip_end=clip_end)
+
+    def alignment(self):
+        """Returns the final opcodes as an Alignment of the whole transcript."""
+        return Alignment(
+            self.opcodes,
+            len(self.manuscript_words),
+            len(self.transcript),
+            self.token_to_word,
+        )
+
+    def _advance(self, final, clip_end=False):
+        length = len(self.transcript)
+        self._aligned_length = length
+        pending = length - self.j
+        i_hi = self.end
+        if not final or clip_end:
+            i_hi = min(self.end, self.i + int(pending * STREAM_SLACK) + self.settle)
+        opcodes = [
+            (tag, i1 + self.i, i2 + self.i, j1 + self.j, j2 + self.j)
+            for tag, i1, i2, j1, j2 in self.aligner.get_opcodes(
+                self.manuscript_words[self.i : i_hi], self.transcript[self.j :]
+            )
+        ]
+        if final:
+            if clip_end and opcodes and opcodes[-1][0] == "delete":
+                opcodes.pop()
+            return self._commit(opcodes)
+
+        limit = length - self.settle
+        for position in range(len(opcodes) - 1, -1, -1):
+            tag, i1, _, j1, j2 = opcodes[position]
+            if tag != "equal" or j1 + self.anchor > limit:
+                continue
+            j_cut = min(j2, limit)
+            # Keep split words ("well-known") on one side of the cut.
+            while (
+                self.token_to_word is not None
+                and j1 + self.anchor < j_cut < length
+                and self.token_to_word[j_cut - 1] == self.token_to_word[j_cut]
+            ):
+                j_cut -= 1
+            if j_cut - j1 < self.anchor:
+                continue
+            cut = ("equal", i1, i1 + (j_cut - j1), j1, j_cut)
+            return self._commit(opcodes[:position] + [cut])
+
+        if pending <= self.max_pending:
+            return []
+        # No anchor for too long: finalize everything but the settling tail.
+        committed = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if j2 > limit:
+                if j1 < limit and tag != "equal":
+                    # Split the block that straddles the tail.
+                    committed.append((tag, i1, min(i2, i1 + limit - j1), j1, limit))
+                break
+            committed.append((tag, i1, i2, j1, j2))
+        logging.warning(
+            f"No stable match for {pending} transcript tokens; finalizing {len(committed)} opcodes without one."
+        )
+        return self._commit(committed)
+
+    def _commit(self, opcodes):
+        for opcode in opcodes:
+            self._builder.add(*opcode)
+        if opcodes:
+            self.i, self.j = opcodes[-1][2], opcodes[-1][4]
+        return opcodes
+
+
+def _clip_edge_deletions(opcodes, match_span, transcript_length):
+    match_start, match_end = match_span
+    clipped = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "delete" and j1 == 0:
+            i1 = max(i1, match_start)
+        if tag == "delete" and j2 == transcript_length:
+            i2 = min(i2, match_end)
+        if i1 < i2 or j1 < j2:
+            clipped.append((tag, i1, i2, j1, j2))
+    return clipped
+
+
+def get_aligner(aligner=None):
+    """
+    Resolves an aligner name (or instance) to an aligner instance.
+
+    Args:
+        aligner (str or object, optional): A key of ALIGNERS, an object with a
+                                           get_opcodes(a, b) method, or None for
+                                           the default engine.
+    """
+    if aligner is None:
+        aligner = DEFAULT_ALIGNER
+    if isinstance(aligner, str):
+        try:
+            return ALIGNERS[aligner]()
+        except KeyError:
+            raise ValueError(
+                f"Unknown aligner '{aligner}'. Choose from: {', '.join(ALIGNERS)}"
+            )
+    return aligner
@@ -0,0 +1,161 @@
+import io
+import logging
+import os
+
+import pygame
+
+from mp3_index import DEFAULT_CACHE_DIR, load_seek_index
+
+
+class _FileWindow(io.RawIOBase):
+    """
+    A read-only view of a file from a byte offset to its end, so the mixer
+    decodes from a frame boundary as if it were the start of the file.
+    """
+
+    def __init__(self, path, offset):
+        super().__init__()
+        self._file = open(path, "rb")
+        self._offset = offset
+        self._size = os.fstat(self._file.fileno()).st_size - offset
+        self._file.seek(offset)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            position += self.tell()
+        elif whence == io.SEEK_END:
+            position += self._size
+        self._file.seek(self._offset + max(0, position))
+        return self.tell()
+
+    def tell(self):
+        return self._file.tell() - self._offset
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class AudioEngine:
+    """
+    Plays one chapter's audio through pygame's mixer and keeps the playback clock.
+
+    For MP3 files a frame seek index (see mp3_index) is used: playback from any
+    time starts by handing the mixer the file from that frame's byte offset, so
+    seeking costs the same at the end of a multi-hour file as at its start and
+    never depends on the mixer's bitrate estimates. The clock is the exact start
+    time of that frame plus the time the mixer has played since. Other formats
+    fall back to the mixer's own seeking.
+
+    pygame's mixer belongs to the main thread, so every method must be called
+    from it.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Args:
+            cache_dir (str, optional): Where MP3 seek indexes are cached, or None.
+        """
+        self.cache_dir = cache_dir
+        self.path = None
+        self.seek_index = None
+        self.started = False
+        self.paused = False
+        self._base_time = 0.0
+        self._window = None
+
+    @property
+    def duration(self):
+        """Length of the audio in seconds, or None when it is not known."""
+        return self.seek_index.duration if self.seek_index is not None else None
+
+    def load(self, path, seek_index=None):
+        """
+        Loads an audio file, stopping any current playback.
+
+        Args:
+            path (str): The audio file.
+            seek_index (Mp3SeekIndex, optional): A prebuilt index of the file, e.g.
+                                                 from the background loader. Built
+                                                 (or read from the cache) for MP3
+                                                 files when omitted.
+        """
+        self.stop()
+        pygame.mixer.music.load(path)
+        if seek_index is None and path.lower().endswith(".mp3"):
+            try:
+                seek_index = load_seek_index(path, self.cache_dir)
+            except (OSError, ValueError) as e:
+                logging.warning(
+                    f"No seek index for {path} ({e}); using the mixer's seeking."
+                )
+        self.path = path
+        self.seek_index = seek_index
+
+    def play(self, start=0.0):
+        """Starts playback at `start` seconds."""
+        start = max(0.0, start)
+        if self.duration is not None:
+            start = min(start, self.duration)
+        if self.seek_index is not None:
+            offset, self._base_time = self.seek_index.frame_at(start)
+            window = _FileWindow(self.path, offset)
+            pygame.mixer.music.load(window, "mp3")
+            self._close_window()
+            self._window = window
+            pygame.mixer.music.play()
+        else:
+            pygame.mixer.music.play(start=start)
+            self._base_time = start
+        self.started = True
+        self.paused = False
+
+    def pause(self):
+        if self.started and not self.paused:
+            pygame.mixer.music.pause()
+            self.paused = True
+
+    def resume(self):
+        """Continues after pause(), or starts from the beginning if never started."""
+        if not self.started:
+            self.play(0.0)
+        elif self.paused:
+            pygame.mixer.music.unpause()
+            self.paused = False
+
+    def stop(self):
+        if self.path is not None:
+            pygame.mixer.music.stop()
+        self.started = False
+        self.paused = False
+        self._base_time = 0.0
+
+    def position(self):
+        """Returns the playback position in seconds."""
+        if not self.started:
+            return self._base_time
+        # get_pos() counts the milliseconds the mixer has played since play(),
+        # and stops counting while paused; it is -1 once playback has ended.
+        played = pygame.mixer.music.get_pos()
+        if played < 0:
+            return self.duration if self.duration is not None else self._base_time
+        return self._base_time + played / 1000.0
+
+    def close(self):
+        self.stop()
+        pygame.mixer.music.unload()
+        self._close_window()
+
+    def _close_window(self):
+        if self._window is not None:
+            self._window.close()
+            self._window = None
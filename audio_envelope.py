@@ -0,0 +1,497 @@
+"""
+Compact loudness envelope of a narration, and the checks that run on it.
+
+Each audio file is decoded once (via ffmpeg) into the RMS and peak level of
+every 10 ms frame, and the result is cached as `<chapter>_envelope.bin` next to
+the timestamp JSON. Later analyses and waveform views memory-map that file, so
+a multi-hour chapter is a few megabytes that open instantly instead of minutes
+of decoding. The envelope is used to find dead air, clipping and mouth noise
+between words, and to snap Whisper's word starts to the real speech onsets.
+
+Usage:
+    python audio_envelope.py --audio "narrations/1 - ADP.mp3" --json "jsons/1 - ADP_timestamps.json"
+"""
+
+import argparse
+import csv
+import json
+import logging
+import math
+import mmap
+import os
+import subprocess
+import sys
+from array import array
+
+from word_store import load_word_store
+
+# Rebuild cached envelopes whenever the format or the decoding changes.
+ENVELOPE_VERSION = 1
+ENVELOPE_SUFFIX = "_envelope.bin"
+TIMESTAMP_SUFFIX = "_timestamps.json"
+# The header is padded to a fixed size so the level arrays start aligned.
+HEADER_SIZE = 256
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 160  # 10 ms at SAMPLE_RATE
+# Frames decoded and reduced per chunk of ffmpeg output.
+DECODE_CHUNK_FRAMES = 6000
+FULL_SCALE = 32767
+
+# Levels below SILENCE_DB (dBFS, RMS) count as silence. Silences inside the
+# narration longer than DEAD_AIR_SECONDS are reported.
+SILENCE_DB = -50.0
+DEAD_AIR_SECONDS = 3.0
+# Peaks at or above this level are clipped.
+CLIP_LEVEL = 32700
+# A burst above the silence level of at most this many frames, in a pause
+# between words and away from both words, is reported as mouth noise.
+MOUTH_NOISE_MAX_FRAMES = 5
+MOUTH_NOISE_GUARD_SECONDS = 0.05
+MOUTH_NOISE_MIN_GAP_SECONDS = 0.2
+# Word starts move to a rise out of silence at most this far away.
+SNAP_MAX_SHIFT = 0.15
+
+
+def level_for_db(db):
+    """Returns the 16-bit amplitude of a dBFS level."""
+    return int(FULL_SCALE * 10 ** (db / 20.0))
+
+
+def envelope_path_for(json_path):
+    """Returns where the envelope of a chapter is cached, next to its timestamps."""
+    if json_path.endswith(TIMESTAMP_SUFFIX):
+        return json_path[: -len(TIMESTAMP_SUFFIX)] + ENVELOPE_SUFFIX
+    return os.path.splitext(json_path)[0] + ENVELOPE_SUFFIX
+
+
+def _audio_identity(audio_path):
+    # As for the MP3 seek index, the file's size and mtime rather than a hash of
+    # hours of audio.
+    stat = os.stat(audio_path)
+    return {"audio_size": stat.st_size, "audio_mtime_ns": stat.st_mtime_ns}
+
+
+def decode_levels(audio_path):
+    """
+    Decodes an audio file into per-frame RMS and peak levels.
+
+    The audio is streamed from ffmpeg as 16 kHz mono samples and reduced a chunk
+    at a time, so memory does not grow with the length of the file.
+
+    Returns:
+        tuple: (rms, peak) arrays of unsigned 16-bit levels, one per frame.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Audio analysis needs numpy: pip install numpy")
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-i",
+        audio_path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+    try:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        raise RuntimeError("Audio analysis needs ffmpeg on the PATH.")
+
+    rms = array("H")
+    peak = array("H")
+    chunk_bytes = DECODE_CHUNK_FRAMES * FRAME_SAMPLES * 2
+    leftover = b""
+    with process.stdout:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            final = not data
+            data = leftover + data
+            usable = len(data) if final else len(data) - len(data) % (FRAME_SAMPLES * 2)
+            leftover = data[usable:]
+            if usable:
+                samples = numpy.frombuffer(data[:usable], numpy.int16)
+                padding = -len(samples) % FRAME_SAMPLES
+                if padding:
+                    samples = numpy.concatenate(
+                        [samples, numpy.zeros(padding, numpy.int16)]
+                    )
+                frames = samples.astype(numpy.float64).reshape(-1, FRAME_SAMPLES)
+                rms.frombytes(
+                    numpy.sqrt(numpy.mean(frames * frames, axis=1))
+                    .round()
+                    .astype(numpy.uint16)
+                    .tobytes()
+                )
+                peak.frombytes(
+                    numpy.minimum(numpy.abs(frames).max(axis=1), FULL_SCALE)
+                    .astype(numpy.uint16)
+                    .tobytes()
+                )
+            if final:
+                break
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg could not decode {audio_path}.")
+    return rms, peak
+
+
+class AudioEnvelope:
+    """
+    The memory-mapped RMS and peak levels of an audio file, one per 10 ms frame.
+
+    `rms` and `peak` are memoryviews of unsigned 16-bit levels straight over the
+    cache file; nothing is read until a frame is used.
+    """
+
+    frame_seconds = FRAME_SAMPLES / SAMPLE_RATE
+
+    def __init__(self, path, header, buffer):
+        self.path = path
+        self.header = header
+        self.frames = header["frames"]
+        self._mmap = buffer
+        size = self.frames * 2
+        # Every view of the map has to be released before it can be closed.
+        self._views = [memoryview(buffer)]
+        self._views.append(self._views[0][HEADER_SIZE : HEADER_SIZE + size])
+        self._views.append(self._views[0][HEADER_SIZE + size : HEADER_SIZE + 2 * size])
+        self.rms = self._views[1].cast("H")
+        self.peak = self._views[2].cast("H")
+
+    def __len__(self):
+        return self.frames
+
+    @property
+    def duration(self):
+        return self.frames * self.frame_seconds
+
+    def frame_at(self, time_in_seconds):
+        """Returns the frame holding a time, clamped to the envelope."""
+        frame = int(time_in_seconds / self.frame_seconds)
+        return max(0, min(frame, self.frames - 1)) if self.frames else 0
+
+    def time_of(self, frame):
+        return frame * self.frame_seconds
+
+    def columns(self, start_time, end_time, count):
+        """
+        Returns `count` (rms, peak) pairs summarizing [start_time, end_time), the
+        loudest frame of each column, for drawing a waveform.
+
+        The levels are magnitudes, so there is no separate minimum: a column is
+        drawn symmetrically, from -peak to +peak.
+        """
+        first = self.frame_at(start_time)
+        last = max(first + 1, min(self.frames, self.frame_at(end_time) + 1))
+        columns = []
+        for column in range(count):
+            lo = first + (last - first) * column // count
+            hi = max(lo + 1, first + (last - first) * (column + 1) // count)
+            columns.append((max(self.rms[lo:hi]), max(self.peak[lo:hi])))
+        return columns
+
+    def close(self):
+        for view in [self.rms, self.peak] + self._views[::-1]:
+            view.release()
+        self._mmap.close()
+
+    @staticmethod
+    def write(path, rms, peak, identity):
+        """Writes levels as a padded JSON header followed by the two arrays."""
+        header = dict(
+            identity,
+            version=ENVELOPE_VERSION,
+            frames=len(rms),
+            frame_samples=FRAME_SAMPLES,
+            sample_rate=SAMPLE_RATE,
+            byteorder=sys.byteorder,
+        )
+        encoded = json.dumps(header).encode("utf-8")
+        if len(encoded) >= HEADER_SIZE:
+            raise ValueError("Envelope header too long.")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encoded.ljust(HEADER_SIZE - 1) + b"\n")
+            rms.tofile(f)
+            peak.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def open(cls, path, identity=None):
+        """
+        Memory-maps an envelope written by write().
+
+        Args:
+            path (str): The envelope file.
+            identity (dict, optional): The audio file's size and mtime; an envelope
+                                       of a different file counts as missing.
+
+        Returns:
+            AudioEnvelope: The envelope, or None if it is missing or stale.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.read(HEADER_SIZE))
+                if (
+                    header.get("version") != ENVELOPE_VERSION
+                    or header.get("byteorder") != sys.byteorder
+                    or header.get("frame_samples") != FRAME_SAMPLES
+                    or header.get("sample_rate") != SAMPLE_RATE
+                ):
+                    return None
+                if identity is not None and any(
+                    header.get(key) != value for key, value in identity.items()
+                ):
+                    return None
+                if os.fstat(f.fileno()).st_size < HEADER_SIZE + 4 * header["frames"]:
+                    return None
+                if not header["frames"]:
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        return cls(path, header, buffer)
+
+
+def load_envelope(audio_path, envelope_path):
+    """
+    Returns the envelope of an audio file, decoding it only if no up-to-date
+    envelope is cached at `envelope_path`.
+    """
+    identity = _audio_identity(audio_path)
+    envelope = AudioEnvelope.open(envelope_path, identity)
+    if envelope is not None:
+        logging.info(f"Loaded audio envelope {envelope_path} ({len(envelope)} frames).")
+        return envelope
+    rms, peak = decode_levels(audio_path)
+    if not rms:
+        raise RuntimeError(f"No audio decoded from {audio_path}.")
+    AudioEnvelope.write(envelope_path, rms, peak, identity)
+    logging.info(
+        f"Built audio envelope of {audio_path}: {len(rms)} frames, {len(rms) * AudioEnvelope.frame_seconds:.1f}s."
+    )
+    return AudioEnvelope.open(envelope_path, identity)
+
+
+def _quiet_runs(envelope, first, last, threshold):
+    """Yields (start_frame, end_frame) of runs below `threshold` in [first, last)."""
+    rms = envelope.rms
+    run_start = None
+    for frame in range(first, last):
+        if rms[frame] < threshold:
+            if run_start is None:
+                run_start = frame
+        elif run_start is not None:
+            yield run_start, frame
+            run_start = None
+    if run_start is not None:
+        yield run_start, last
+
+
+def find_dead_air(
+    envelope, words=None, min_seconds=DEAD_AIR_SECONDS, silence_db=SILENCE_DB
+):
+    """
+    Finds long silences inside the narration.
+
+    Args:
+        envelope (AudioEnvelope): The audio's envelope.
+        words (WordStore, optional): The transcription. When given, silence before
+                                     the first word and after the last (room tone
+                                     at the head and tail) is not reported.
+        min_seconds (float): Shortest silence reported.
+        silence_db (float): Level below which a frame is silent.
+
+    Returns:
+        list: {'type': 'dead_air', 'start', 'end', 'duration'} dicts.
+    """
+    first, last = 0, len(envelope)
+    if words is not None and len(words):
+        first = envelope.frame_at(words.start[0])
+        last = envelope.frame_at(words.end[len(words) - 1]) + 1
+    min_frames = math.ceil(min_seconds / envelope.frame_seconds)
+    issues = []
+    for start, end in _quiet_runs(envelope, first, last, level_for_db(silence_db)):
+        if end - start >= min_frames:
+            issues.append(
+                {
+                    "type": "dead_air",
+                    "start": round(envelope.time_of(start), 3),
+                    "end": round(envelope.time_of(end), 3),
+                    "duration": round((end - start) * envelope.frame_seconds, 3),
+                }
+            )
+    return issues
+
+
+def find_clipping(envelope, clip_level=CLIP_LEVEL):
+    """
+    Finds runs of frames whose peak reaches full scale.
+
+    Returns:
+        list: {'type': 'clipping', 'start', 'end', 'frames'} dicts.
+    """
+    issues = []
+    peak = envelope.peak
+    run_start = None
+    for frame in range(len(envelope) + 1):
+        clipped = frame < len(envelope) and peak[frame] >= clip_level
+        if clipped and run_start is None:
+            run_start = frame
+        elif not clipped and run_start is not None:
+            issues.append(
+                {
+                    "type": "clipping",
+                    "start": round(envelope.time_of(run_start), 3),
+                    "end": round(envelope.time_of(frame), 3),
+                    "frames": frame - run_start,
+                }
+            )
+            run_start = None
+    return issues
+
+
+def find_mouth_noise(envelope, words, silence_db=SILENCE_DB):
+    """
+    Finds short bursts of sound (clicks, lip smacks) in the pauses between words.
+
+    Only pauses of at least MOUTH_NOISE_MIN_GAP_SECONDS are searched, leaving
+    MOUTH_NOISE_GUARD_SECONDS next to each word alone, and only bursts of at most
+    MOUTH_NOISE_MAX_FRAMES frames with silence on both sides count; breaths are
+    longer and are not reported.
+
+    Returns:
+        list: {'type': 'mouth_noise', 'start', 'end', 'peak_db', 'after_word'} dicts,
+              where after_word is the index of the word before the pause.
+    """
+    threshold = level_for_db(silence_db)
+    guard = MOUTH_NOISE_GUARD_SECONDS
+    issues = []
+    rms, peak = envelope.rms, envelope.peak
+    for k in range(len(words) - 1):
+        gap_start, gap_end = words.end[k] + guard, words.start[k + 1] - guard
+        if words.start[k + 1] - words.end[k] < MOUTH_NOISE_MIN_GAP_SECONDS:
+            continue
+        first, last = envelope.frame_at(gap_start), envelope.frame_at(gap_end)
+        burst_start = None
+        for frame in range(first, last):
+            if rms[frame] >= threshold:
+                if burst_start is None:
+                    burst_start = frame
+                continue
+            if burst_start is not None:
+                if (
+                    burst_start > first
+                    and frame - burst_start <= MOUTH_NOISE_MAX_FRAMES
+                ):
+                    loudest = max(peak[burst_start:frame])
+                    issues.append(
+                        {
+                            "type": "mouth_noise",
+                            "start": round(envelope.time_of(burst_start), 3),
+                            "end": round(envelope.time_of(frame), 3),
+                            "peak_db": round(
+                                20 * math.log10(max(loudest, 1) / FULL_SCALE), 1
+                            ),
+                            "after_word": k,
+                        }
+                    )
+                burst_start = None
+    return issues
+
+
+def snap_word_starts(envelope, words, max_shift=SNAP_MAX_SHIFT, silence_db=SILENCE_DB):
+    """
+    Moves word starts to the speech onset nearest to Whisper's estimate.
+
+    An onset is a frame that rises out of silence. Words that follow the previous
+    word without a pause have no such frame nearby and keep their start. Starts
+    never move into the previous word (unless Whisper already overlapped them)
+    or past their own end.
+
+    Returns:
+        tuple: (starts, moved): an array('d') of the new starts, and the number of
+               words whose start moved.
+    """
+    threshold = level_for_db(silence_db)
+    rms = envelope.rms
+    reach = math.ceil(max_shift / envelope.frame_seconds)
+    starts = array("d", words.start)
+    moved = 0
+    for k in range(len(words)):
+        original = words.start[k]
+        center = envelope.frame_at(original)
+        best = None
+        for frame in range(
+            max(1, center - reach), min(len(envelope), center + reach + 1)
+        ):
+            if rms[frame - 1] < threshold <= rms[frame] and (
+                best is None or abs(frame - center) < abs(best - center)
+            ):
+                best = frame
+        if best is None:
+            continue
+        snapped = envelope.time_of(best)
+        lower = 0.0
+        if k:
+            lower = max(starts[k - 1], min(words.end[k - 1], original))
+        snapped = max(lower, min(snapped, words.end[k] - envelope.frame_seconds))
+        if snapped != original:
+            starts[k] = snapped
+            moved += 1
+    return starts, moved
+
+
+def analyze(envelope, words):
+    """
+    Runs every check on a chapter.
+
+    Returns:
+        list: The dead air, clipping and mouth noise issues, ordered by time.
+    """
+    issues = find_dead_air(envelope, words) + find_clipping(envelope)
+    issues += find_mouth_noise(envelope, words)
+    issues.sort(key=lambda issue: issue["start"])
+    return issues
+
+
+ISSUE_FIELDS = ["type", "start", "end", "duration", "frames", "peak_db", "after_word"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check a narration for dead air, clipping and mouth noise."
+    )
+    parser.add_argument("--audio", required=True, help="The narration audio file.")
+    parser.add_argument("--json", required=True, help="Its _timestamps.json file.")
+    parser.add_argument(
+        "--envelope",
+        default=None,
+        help="Envelope cache file (default: next to the JSON).",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    envelope = load_envelope(args.audio, args.envelope or envelope_path_for(args.json))
+    issues = analyze(envelope, load_word_store(args.json))
+    envelope.close()
+    writer = csv.DictWriter(sys.stdout, fieldnames=ISSUE_FIELDS)
+    writer.writeheader()
+    writer.writerows(issues)
+    print(f"{len(issues)} audio issues.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,583 @@
+"""
+Headless batch validation of a whole book.
+
+Pairs every `_timestamps.json` in the transcript directory with its manuscript
+DOCX (and narration MP3, when present), runs mismatch detection for each chapter
+in a process pool and writes per-chapter and whole-book reports. When one DOCX
+holds the whole book, each chapter is first located inside it, and the summary
+reports chapters that overlap or are missing from the manuscript. With a results
+database, chapters whose files have not changed since they were last validated
+(or reviewed) reuse the stored alignment and keep their review status. With
+audio checks, each narration is also checked for dead air, clipping and mouth
+noise (see audio_envelope). It imports neither tkinter nor pygame, so it can run
+unattended on servers and CI machines.
+
+Usage:
+    python batch_validate.py --manuscripts manuscripts --jsons jsons --narrations narrations
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from alignment import ALIGNERS, DEFAULT_ALIGNER
+from audio_envelope import ISSUE_FIELDS, analyze, envelope_path_for, load_envelope
+from chapter_locator import LOCATE_RATIO, ShingleIndex, find_coverage_issues
+from manuscript import load_manuscript
+from mismatch_detector import MismatchDetector
+from results_store import ResultsStore, chapter_key
+from transcriber import BACKENDS
+from verification import DEFAULT_BUDGET_SECONDS, DEFAULT_VERIFY_MODEL, Verifier
+from vocabulary import Vocabulary
+from word_store import load_word_store
+
+TIMESTAMP_SUFFIX = "_timestamps.json"
+
+REPORT_FIELDS = [
+    "chapter",
+    "type",
+    "start_time",
+    "confidence",
+    "manuscript_text",
+    "narrated_text",
+    "context",
+    "status",
+    "verification",
+    "manuscript_start",
+    "manuscript_end",
+    "transcript_start",
+    "transcript_end",
+]
+
+# Parsed manuscripts, cached per worker process so a whole-book DOCX shared by
+# several chapters is only parsed once per process.
+_manuscript_cache = {}
+# Vocabularies and shingle indexes of whole-book manuscripts, cached the same
+# way; the chapters of a book share the vocabulary its index was built with.
+_vocabulary_cache = {}
+_shingle_index_cache = {}
+# Second-pass verifiers, one per worker process so each model is loaded once.
+_verifier_cache = {}
+# Read-only connections to the results database, one per worker process; only
+# the parent process writes to it.
+_store_cache = {}
+
+
+def _chapter_number(name):
+    match = re.search(r"\d+", name)
+    return int(match.group(0)) if match else None
+
+
+def _list_files(directory, extension):
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(extension) and not name.startswith("~$")
+    )
+
+
+def _match_by_name(stem, paths):
+    """
+    Finds the file for a chapter: same stem first, then the same chapter number.
+    """
+    by_stem = {os.path.splitext(os.path.basename(p))[0]: p for p in paths}
+    if stem in by_stem:
+        return by_stem[stem]
+    number = _chapter_number(stem)
+    if number is not None:
+        candidates = [p for s, p in by_stem.items() if _chapter_number(s) == number]
+        if len(candidates) == 1:
+            return candidates[0]
+    return None
+
+
+def pair_chapters(manuscript_dir, json_dir, narration_dir=None):
+    """
+    Pairs chapter transcripts with their manuscript and narration files.
+
+    A transcript `<stem>_timestamps.json` is paired with `<stem>.docx`, or else with
+    the DOCX carrying the same chapter number. When the manuscript directory holds
+    a single DOCX (a whole-book manuscript), every chapter is paired with it.
+
+    Returns:
+        list: Chapter dicts of {'chapter', 'json_path', 'docx_path', 'audio_path'}.
+    """
+    manuscripts = _list_files(manuscript_dir, ".docx")
+    narrations = _list_files(narration_dir, ".mp3")
+    chapters = []
+    for json_path in _list_files(json_dir, TIMESTAMP_SUFFIX):
+        stem = os.path.basename(json_path)[: -len(TIMESTAMP_SUFFIX)]
+        docx_path = _match_by_name(stem, manuscripts)
+        if docx_path is None and len(manuscripts) == 1:
+            docx_path = manuscripts[0]
+        if docx_path is None:
+            logging.warning(f"No manuscript found for chapter '{stem}'; skipping.")
+            continue
+        chapters.append(
+            {
+                "chapter": stem,
+                "json_path": json_path,
+                "docx_path": docx_path,
+                "audio_path": _match_by_name(stem, narrations),
+            }
+        )
+    chapters.sort(key=lambda c: (_chapter_number(c["chapter"]) or 0, c["chapter"]))
+    return chapters
+
+
+def validate_chapter(
+    chapter, aligner=None, verify=None, store_path=None, audio_checks=False
+):
+    """
+    Runs the DOCX parse and mismatch detection for one chapter.
+
+    Args:
+        chapter (dict): A chapter from pair_chapters().
+        aligner (str, optional): See MismatchDetector.
+        verify (dict, optional): {'backend', 'model', 'budget_seconds'} to
+                                 re-transcribe the audio around mismatches with
+                                 a stronger backend, or None to skip that pass.
+        store_path (str, optional): A results database to reuse stored results of
+                                    unchanged chapters from.
+        audio_checks (bool): Check the narration for dead air, clipping and mouth
+                             noise. Its envelope is cached next to the JSON.
+
+    This is the unit of work sent to the process pool, so it only takes and
+    returns plain picklable data.
+
+    Returns:
+        dict: The chapter info plus 'mismatches', 'word_count', 'token_count',
+              'location' (the chapter's span in a whole-book manuscript, or None),
+              'audio_issues' (a list, or None without audio checks or audio),
+              per-stage 'timings' in seconds and, with a store_path, what to
+              store: 'key', 'opcodes', 'manuscript_span', 'match_span' and
+              'restored' (whether the stored results were reused).
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    docx_path = chapter["docx_path"]
+    if docx_path not in _manuscript_cache:
+        _manuscript_cache[docx_path] = load_manuscript(docx_path)
+    full_manuscript_text, manuscript_tokens = _manuscript_cache[docx_path]
+    timings["parse_docx"] = time.perf_counter() - started
+
+    stage_start = time.perf_counter()
+    transcribed_data = load_word_store(chapter["json_path"])
+    timings["parse_json"] = time.perf_counter() - stage_start
+
+    if docx_path not in _vocabulary_cache:
+        _vocabulary_cache[docx_path] = Vocabulary()
+    detector = MismatchDetector(
+        manuscript_tokens,
+        transcribed_data,
+        full_manuscript_text,
+        aligner=aligner,
+        vocabulary=_vocabulary_cache[docx_path],
+    )
+
+    key = stored = None
+    if store_path:
+        stage_start = time.perf_counter()
+        key = chapter_key(
+            docx_path,
+            chapter["json_path"],
+            chapter["audio_path"],
+            aligner,
+            name=chapter["chapter"],
+        )
+        if store_path not in _store_cache:
+            _store_cache[store_path] = ResultsStore(store_path, read_only=True)
+        stored = _store_cache[store_path].load_chapter(key)
+        if stored is not None and stored["opcodes"] is None:
+            stored = None
+        timings["store_lookup"] = time.perf_counter() - stage_start
+
+    if stored is not None:
+        stage_start = time.perf_counter()
+        detector.restore(
+            stored["opcodes"],
+            stored["manuscript_span"],
+            stored["match_span"],
+            stored["location"],
+        )
+        mismatches = stored["mismatches"]
+        timings["restore"] = time.perf_counter() - stage_start
+    else:
+        if len(manuscript_tokens) > LOCATE_RATIO * len(transcribed_data):
+            stage_start = time.perf_counter()
+            if docx_path not in _shingle_index_cache:
+                _shingle_index_cache[docx_path] = ShingleIndex(
+                    detector.manuscript_ids()
+                )
+            detector.locate_chapter(_shingle_index_cache[docx_path])
+            timings["locate"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        mismatches = detector.find_mismatches()
+        timings["find_mismatches"] = time.perf_counter() - stage_start
+
+    verification = None
+    if verify is not None and chapter["audio_path"]:
+        stage_start = time.perf_counter()
+        verifier_key = (verify["backend"], verify["model"])
+        if verifier_key not in _verifier_cache:
+            _verifier_cache[verifier_key] = Verifier(
+                verify["backend"], verify["model"], aligner=aligner
+            )
+        verification = _verifier_cache[verifier_key].verify(
+            detector,
+            mismatches,
+            chapter["audio_path"],
+            budget_seconds=verify["budget_seconds"],
+        )
+        timings["verify"] = time.perf_counter() - stage_start
+
+    audio_issues = None
+    if audio_checks and chapter["audio_path"]:
+        stage_start = time.perf_counter()
+        try:
+            envelope = load_envelope(
+                chapter["audio_path"], envelope_path_for(chapter["json_path"])
+            )
+            try:
+                audio_issues = analyze(envelope, transcribed_data)
+            finally:
+                envelope.close()
+        except (RuntimeError, OSError) as e:
+            # The mismatch report stands on its own; only the audio checks are lost.
+            logging.warning(f"Skipping audio checks of '{chapter['chapter']}': {e}")
+        timings["audio"] = time.perf_counter() - stage_start
+
+    # Reports are exported, so this is where the lazy context gets filled in.
+    stage_start = time.perf_counter()
+    for mismatch in mismatches:
+        detector.get_context(mismatch)
+    timings["context"] = time.perf_counter() - stage_start
+
+    timings["total"] = time.perf_counter() - started
+    result = dict(chapter)
+    result.update(
+        {
+            "mismatches": mismatches,
+            "word_count": len(transcribed_data),
+            "token_count": len(manuscript_tokens),
+            "location": detector.location,
+            "verification": verification,
+            "audio_issues": audio_issues,
+            "timings": timings,
+        }
+    )
+    # Nothing in the result refers to the words, so a mapped .bin can be closed.
+    transcribed_data.close()
+    if key is not None:
+        result.update(
+            {
+                "key": key,
+                "opcodes": detector.alignment.opcodes,
+                "manuscript_span": detector.manuscript_span,
+                "match_span": detector.match_span,
+                "restored": stored is not None,
+            }
+        )
+    return result
+
+
+def _report_rows(result):
+    for mismatch in result["mismatches"]:
+        i1, i2 = mismatch["manuscript_indices"]
+        j1, j2 = mismatch["transcript_indices"]
+        yield {
+            "chapter": result["chapter"],
+            "type": mismatch["type"],
+            "start_time": mismatch["start_time"],
+            "confidence": round(mismatch["confidence"], 4),
+            "manuscript_text": mismatch["manuscript_text"],
+            "narrated_text": mismatch["narrated_text"],
+            "context": mismatch["context"],
+            "status": mismatch["status"],
+            "verification": mismatch.get("verification", {}).get("verdict"),
+            "manuscript_start": i1,
+            "manuscript_end": i2,
+            "transcript_start": j1,
+            "transcript_end": j2,
+        }
+
+
+def write_reports(rows, base_path, formats):
+    """
+    Writes report rows to `<base_path>.csv` and/or `<base_path>.jsonl`.
+    """
+    rows = list(rows)
+    if "csv" in formats:
+        with open(base_path + ".csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    if "jsonl" in formats:
+        with open(base_path + ".jsonl", "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def write_audio_issues(result, output_dir):
+    """Writes a chapter's audio issues to `<chapter>_audio_issues.csv`."""
+    path = os.path.join(output_dir, f"{result['chapter']}_audio_issues.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ISSUE_FIELDS)
+        writer.writeheader()
+        writer.writerows(result["audio_issues"])
+
+
+def _count_audio_issues(issues):
+    counts = {}
+    for issue in issues:
+        counts[issue["type"]] = counts.get(issue["type"], 0) + 1
+    return counts
+
+
+def run_batch(
+    chapters,
+    output_dir,
+    workers=None,
+    aligner=None,
+    formats=("csv", "jsonl"),
+    verify=None,
+    store_path=None,
+    audio_checks=False,
+):
+    """
+    Validates all chapters in a process pool and writes the reports and summary.
+
+    With a store_path, workers reuse the stored results of unchanged chapters and
+    this process saves every chapter's results to the database. With
+    audio_checks, each chapter's audio issues are written next to its report.
+
+    Returns:
+        dict: The run summary (also written to `<output_dir>/summary.json`).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    results = []
+    failures = []
+    # Created (or migrated) here, before the workers open it read-only.
+    store = ResultsStore(store_path) if store_path else None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                validate_chapter, chapter, aligner, verify, store_path, audio_checks
+            ): chapter
+            for chapter in chapters
+        }
+        for future in as_completed(futures):
+            chapter = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(
+                    f"Chapter '{chapter['chapter']}' failed: {e}", exc_info=True
+                )
+                failures.append({"chapter": chapter["chapter"], "error": str(e)})
+                continue
+            if store is not None:
+                store.save_chapter(
+                    result["key"],
+                    result["mismatches"],
+                    opcodes=result["opcodes"],
+                    manuscript_span=result["manuscript_span"],
+                    match_span=result["match_span"],
+                    location=result["location"],
+                )
+            write_reports(
+                _report_rows(result),
+                os.path.join(output_dir, f"{result['chapter']}_mismatches"),
+                formats,
+            )
+            if result["audio_issues"] is not None:
+                write_audio_issues(result, output_dir)
+            logging.info(
+                f"Chapter '{result['chapter']}': {len(result['mismatches'])} mismatches "
+                f"in {result['timings']['total']:.2f}s."
+            )
+            results.append(result)
+    if store is not None:
+        store.close()
+
+    results.sort(key=lambda r: (_chapter_number(r["chapter"]) or 0, r["chapter"]))
+    write_reports(
+        (row for result in results for row in _report_rows(result)),
+        os.path.join(output_dir, "book_mismatches"),
+        formats,
+    )
+
+    wall_time = time.perf_counter() - started
+    total_words = sum(r["word_count"] for r in results)
+    summary = {
+        "chapters": len(results),
+        "failed": failures,
+        "workers": workers or os.cpu_count(),
+        "wall_time": round(wall_time, 3),
+        "words": total_words,
+        "words_per_second": round(total_words / wall_time, 1) if wall_time else None,
+        "mismatches": sum(len(r["mismatches"]) for r in results),
+        "coverage": _coverage_report(results),
+        "per_chapter": [
+            {
+                "chapter": r["chapter"],
+                "docx_path": r["docx_path"],
+                "json_path": r["json_path"],
+                "audio_path": r["audio_path"],
+                "words": r["word_count"],
+                "mismatches": len(r["mismatches"]),
+                "location": r["location"],
+                "restored": r.get("restored", False),
+                "verification": r["verification"],
+                "audio_issues": (
+                    _count_audio_issues(r["audio_issues"])
+                    if r["audio_issues"] is not None
+                    else None
+                ),
+                "timings": {k: round(v, 4) for k, v in r["timings"].items()},
+            }
+            for r in results
+        ],
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def _coverage_report(results):
+    """
+    Checks the located chapters of each whole-book manuscript for overlaps, missing
+    chapters and manuscript text that no chapter covers.
+    """
+    by_manuscript = {}
+    for result in results:
+        if result["location"] is not None:
+            by_manuscript.setdefault(result["docx_path"], {})
+            by_manuscript[result["docx_path"]][result["chapter"]] = result["location"]
+
+    report = {}
+    for docx_path, spans in by_manuscript.items():
+        token_count = next(
+            r["token_count"] for r in results if r["docx_path"] == docx_path
+        )
+        issues = find_coverage_issues(spans, token_count)
+        for chapter in issues["missing"]:
+            logging.warning(f"Chapter '{chapter}' was not found in {docx_path}.")
+        for first, second, tokens in issues["overlaps"]:
+            logging.warning(
+                f"Chapters '{first}' and '{second}' overlap by {tokens} tokens in {docx_path}."
+            )
+        for start, end in issues["uncovered"]:
+            logging.warning(
+                f"Manuscript tokens {start}-{end} of {docx_path} are not covered by any chapter."
+            )
+        report[docx_path] = issues
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless batch validation of audiobook chapters."
+    )
+    parser.add_argument(
+        "--manuscripts", default="manuscripts", help="Directory of DOCX manuscripts."
+    )
+    parser.add_argument(
+        "--jsons", default="jsons", help="Directory of _timestamps.json files."
+    )
+    parser.add_argument(
+        "--narrations", default="narrations", help="Directory of narration MP3 files."
+    )
+    parser.add_argument(
+        "--output", default="reports", help="Directory for the reports."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: all cores).",
+    )
+    parser.add_argument("--aligner", choices=sorted(ALIGNERS), default=DEFAULT_ALIGNER)
+    parser.add_argument(
+        "--formats",
+        default="csv,jsonl",
+        help="Comma-separated report formats to write (csv, jsonl).",
+    )
+    parser.add_argument(
+        "--verify",
+        choices=sorted(BACKENDS),
+        default=None,
+        help="Re-transcribe the audio around mismatches with this backend.",
+    )
+    parser.add_argument(
+        "--verify-model",
+        default=DEFAULT_VERIFY_MODEL,
+        help="Model used by the verification pass.",
+    )
+    parser.add_argument(
+        "--verify-budget",
+        type=float,
+        default=DEFAULT_BUDGET_SECONDS,
+        help="Seconds of audio per chapter the verification pass may re-transcribe.",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="SQLite results database to reuse unchanged chapters from and save to "
+        "(e.g. the review app's review_results.db).",
+    )
+    parser.add_argument(
+        "--audio-checks",
+        action="store_true",
+        help="Check the narrations for dead air, clipping and mouth noise "
+        "(needs ffmpeg and numpy).",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    chapters = pair_chapters(args.manuscripts, args.jsons, args.narrations)
+    if not chapters:
+        logging.error("No chapters to validate.")
+        return 1
+    logging.info(f"Validating {len(chapters)} chapters.")
+
+    summary = run_batch(
+        chapters,
+        args.output,
+        workers=args.workers,
+        aligner=args.aligner,
+        formats=[f.strip() for f in args.formats.split(",")],
+        verify=(
+            {
+                "backend": args.verify,
+                "model": args.verify_model,
+                "budget_seconds": args.verify_budget,
+            }
+            if args.verify
+            else None
+        ),
+        store_path=args.store,
+        audio_checks=args.audio_checks,
+    )
+    print(
+        f"Validated {summary['chapters']} chapters ({summary['words']} words, "
+        f"{summary['mismatches']} mismatches) in {summary['wall_time']:.2f}s "
+        f"({summary['words_per_second']} words/s). Failed: {len(summary['failed'])}."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+"""
+Speed and accuracy benchmark for MismatchDetector.
+
+Generates synthetic manuscripts and Whisper-style word lists with known
+substitutions, deletions and insertions, runs mismatch detection and the word
+map over them with every aligner, and reports wall time, peak memory, opcode
+count and precision/recall against the injected errors. Results can be saved
+and compared with a previous run, so a slowdown or an accuracy regression shows
+up in one command.
+
+Usage:
+    python benchmark.py --sizes 1000,10000,100000,1000000 --save bench.json
+    python benchmark.py --baseline bench.json
+"""
+
+import argparse
+import bisect
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from alignment import ALIGNERS
+from manuscript import tokenize_manuscript
+from mismatch_detector import MismatchDetector
+from word_store import WordStore
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+# difflib is quadratic on long inputs; larger cases only run the other aligners.
+DIFFLIB_MAX_WORDS = 100000
+# A run is a regression when it is this much slower than the baseline, or loses
+# more than this much precision or recall.
+TIME_TOLERANCE = 1.25
+ACCURACY_TOLERANCE = 0.01
+
+
+def generate_case(
+    n_words,
+    substitution_rate=0.005,
+    deletion_rate=0.003,
+    insertion_rate=0.003,
+    max_error_words=3,
+    vocabulary_size=5000,
+    seed=0,
+):
+    """
+    Builds a synthetic chapter with known narration errors.
+
+    The manuscript is made of sentences of random words. The narration follows it,
+    except that errors of 1 to `max_error_words` words are injected at the given
+    per-word rates, always separated by at least one correctly read word.
+    Narrated words get Whisper-style timestamps and probabilities, with lower
+    probabilities on substituted and inserted words.
+
+    Returns:
+        tuple: (full_manuscript_text, manuscript_tokens, transcribed_data, injected),
+               where injected is a list of (type, i1, i2) manuscript token ranges
+               ('replace', 'delete' or 'insert', with i1 == i2 for insertions).
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"w{k}" for k in range(vocabulary_size)]
+
+    sentences = []
+    remaining = n_words
+    while remaining > 0:
+        length = min(remaining, rng.randint(5, 25))
+        words = [rng.choice(vocabulary) for _ in range(length)]
+        words[0] = words[0].capitalize()
+        sentences.append(" ".join(words) + rng.choice(".!?"))
+        remaining -= length
+    paragraphs = [" ".join(sentences[k : k + 6]) for k in range(0, len(sentences), 6)]
+    full_manuscript_text = "\n\n".join(paragraphs)
+    manuscript_tokens = tokenize_manuscript(full_manuscript_text)
+
+    transcribed_data = WordStore()
+    injected = []
+    clock = 0.0
+
+    def narrate(word, probability):
+        nonlocal clock
+        duration = rng.uniform(0.15, 0.5)
+        transcribed_data.append(f" {word}", clock, clock + duration, probability)
+        clock += duration + rng.uniform(0.0, 0.15)
+
+    def wrong_word():
+        # Never a manuscript word, so an error cannot accidentally match.
+        return f"x{rng.randrange(vocabulary_size)}"
+
+    i = 0
+    total = len(manuscript_tokens)
+    while i < total:
+        roll = rng.random()
+        size = min(rng.randint(1, max_error_words), total - i)
+        if roll < substitution_rate:
+            injected.append(("replace", i, i + size))
+            for _ in range(size):
+                narrate(wrong_word(), rng.uniform(0.3, 0.8))
+            i += size
+        elif roll < substitution_rate + deletion_rate:
+            injected.append(("delete", i, i + size))
+            i += size
+        elif roll < substitution_rate + deletion_rate + insertion_rate:
+            injected.append(("insert", i, i))
+            for _ in range(size):
+                narrate(wrong_word(), rng.uniform(0.3, 0.8))
+        else:
+            narrate(manuscript_tokens.words[i], rng.uniform(0.85, 1.0))
+            i += 1
+            continue
+        # Keep at least one correctly read word between errors.
+        if i < total:
+            narrate(manuscript_tokens.words[i], rng.uniform(0.85, 1.0))
+            i += 1
+
+    return full_manuscript_text, manuscript_tokens, transcribed_data, injected
+
+
+def _overlaps(a1, a2, b1, b2):
+    """True if two manuscript ranges overlap; an empty range touches its position."""
+    if a1 == a2 or b1 == b2:
+        return a1 <= b2 and b1 <= a2
+    return a1 < b2 and b1 < a2
+
+
+def score(mismatches, injected):
+    """
+    Scores detected mismatches against the injected errors by manuscript range.
+
+    Returns:
+        tuple: (precision, recall).
+    """
+    # Injected errors are disjoint and in manuscript order, so their ends are
+    # sorted too and the candidates for a mismatch can be found by bisection.
+    ends = [e[2] for e in injected]
+    found = set()
+    true_positives = 0
+    for mismatch in mismatches:
+        i1, i2 = mismatch["manuscript_indices"]
+        hit = False
+        position = bisect.bisect_left(ends, i1)
+        while position < len(injected) and injected[position][1] <= i2:
+            _, e1, e2 = injected[position]
+            if _overlaps(i1, i2, e1, e2):
+                found.add(position)
+                hit = True
+            position += 1
+        true_positives += hit
+    precision = true_positives / len(mismatches) if mismatches else 1.0
+    recall = len(found) / len(injected) if injected else 1.0
+    return precision, recall
+
+
+def run_case(case, aligner, measure_memory=True):
+    """
+    Runs mismatch detection and the word map once for one aligner.
+
+    Returns:
+        dict: Timings in seconds, peak memory in MB (when measured), opcode and
+              mismatch counts, precision and recall.
+    """
+    full_manuscript_text, manuscript_tokens, transcribed_data, injected = case
+
+    started = time.perf_counter()
+    detector = MismatchDetector(
+        manuscript_tokens, transcribed_data, full_manuscript_text, aligner=aligner
+    )
+    mismatches = detector.find_mismatches()
+    find_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    word_map = detector.word_map()
+    word_map_seconds = time.perf_counter() - started
+
+    peak_mb = None
+    if measure_memory:
+        # A second run under tracemalloc, which slows Python down too much to
+        # share with the timed run.
+        tracemalloc.start()
+        MismatchDetector(
+            manuscript_tokens, transcribed_data, full_manuscript_text, aligner=aligner
+        ).find_mismatches()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    precision, recall = score(mismatches, injected)
+    return {
+        "words": len(manuscript_tokens),
+        "aligner": aligner,
+        "find_mismatches_s": round(find_seconds, 4),
+        "word_map_s": round(word_map_seconds, 4),
+        "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+        "opcodes": len(detector.alignment.opcodes),
+        "mismatches": len(mismatches),
+        "injected": len(injected),
+        "mapped_words": len(word_map),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+    }
+
+
+def run_benchmark(sizes, aligners, seed=0, measure_memory=True):
+    results = []
+    for size in sizes:
+        case = generate_case(size, seed=seed)
+        for aligner in aligners:
+            if aligner == "difflib" and size > DIFFLIB_MAX_WORDS:
+                continue
+            result = run_case(case, aligner, measure_memory)
+            results.append(result)
+            print(_format_row(result), flush=True)
+    return results
+
+
+_COLUMNS = (
+    ("words", 9),
+    ("aligner", 8),
+    ("find_mismatches_s", 17),
+    ("word_map_s", 10),
+    ("peak_mb", 8),
+    ("opcodes", 8),
+    ("mismatches", 10),
+    ("injected", 8),
+    ("precision", 9),
+    ("recall", 7),
+)
+
+
+def _format_row(result):
+    return "  ".join(
+        str(result[name] if result[name] is not None else "-").rjust(width)
+        for name, width in _COLUMNS
+    )
+
+
+def compare(results, baseline):
+    """
+    Compares results with a saved baseline run.
+
+    Returns:
+        list: Human-readable regression messages (empty when there are none).
+    """
+    previous = {(r["words"], r["aligner"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["words"], result["aligner"]))
+        if old is None:
+            continue
+        name = f"{result['aligner']} @ {result['words']} words"
+        if result["find_mismatches_s"] > old["find_mismatches_s"] * TIME_TOLERANCE:
+            regressions.append(
+                f"{name}: find_mismatches {old['find_mismatches_s']}s -> {result['find_mismatches_s']}s"
+            )
+        for metric in ("precision", "recall"):
+            if result[metric] < old[metric] - ACCURACY_TOLERANCE:
+                regressions.append(
+                    f"{name}: {metric} {old[metric]} -> {result[metric]}"
+                )
+        if result["opcodes"] != old["opcodes"]:
+            print(
+                f"Note: {name}: opcode count changed {old['opcodes']} -> {result['opcodes']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Speed and accuracy benchmark for MismatchDetector."
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated manuscript sizes in words.",
+    )
+    parser.add_argument(
+        "--aligners",
+        default=",".join(sorted(ALIGNERS)),
+        help="Comma-separated aligners to benchmark.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip the tracemalloc run that measures peak memory.",
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--baseline", help="Compare with results saved by an earlier --save."
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    aligners = [aligner.strip() for aligner in args.aligners.split(",")]
+    print("  ".join(name.rjust(width) for name, width in _COLUMNS))
+    results = run_benchmark(sizes, aligners, args.seed, not args.no_memory)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
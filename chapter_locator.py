@@ -0,0 +1,176 @@
+import bisect
+import logging
+
+DEFAULT_SHINGLE_SIZE = 4
+# Shingles that occur more often than this in the manuscript (stock phrases,
+# refrains) carry no location information and are left out of the index.
+MAX_POSTINGS = 8
+# Manuscripts at least this many times longer than the transcript are treated as
+# whole-book manuscripts, and the chapter's region is located before alignment.
+LOCATE_RATIO = 1.5
+# Transcripts matching less than this fraction of their shingles are considered
+# not to be in the manuscript at all.
+MIN_SCORE = 0.2
+
+
+def shingle_keys(ids, size, base):
+    """
+    Yields (position, key) for every run of `size` consecutive word ids.
+
+    The key packs the ids into one integer in base `base`, updated in place as
+    the window slides, so it is exact and costs one multiply-add per word. Runs
+    containing an id of `base` or more (words the index has never seen) are
+    skipped.
+    """
+    top = base ** (size - 1)
+    key = 0
+    run_start = 0
+    for position, word_id in enumerate(ids):
+        if word_id >= base:
+            key = 0
+            run_start = position + 1
+            continue
+        if position - run_start >= size:
+            key -= ids[position - size] * top
+        key = key * base + word_id
+        if position + 1 - run_start >= size:
+            yield position + 1 - size, key
+
+
+class ShingleIndex:
+    """
+    An n-gram (shingle) index over a manuscript's word ids, built once per
+    manuscript and used to find where a chapter transcript lies in a whole book.
+    The transcript must be encoded with the same Vocabulary as the manuscript.
+    """
+
+    def __init__(self, words, size=DEFAULT_SHINGLE_SIZE, max_postings=MAX_POSTINGS):
+        """
+        Args:
+            words (array or list): The manuscript's vocabulary ids.
+            size (int): Number of consecutive words per shingle.
+            max_postings (int): Shingles occurring more often than this are ignored.
+        """
+        self.size = size
+        self.length = len(words)
+        # Ids added to the vocabulary later cannot occur in the manuscript.
+        self.base = max(words, default=0) + 1
+        self.postings = {}
+        for position, key in shingle_keys(words, size, self.base):
+            positions = self.postings.get(key)
+            if positions is None:
+                self.postings[key] = [position]
+            elif len(positions) <= max_postings:
+                positions.append(position)
+        for key in [k for k, v in self.postings.items() if len(v) > max_postings]:
+            del self.postings[key]
+        logging.info(
+            f"Shingle index built: {len(self.postings)} distinct {size}-word shingles "
+            f"over {self.length} manuscript tokens."
+        )
+
+    def locate(self, transcript_words, padding=50):
+        """
+        Finds the manuscript span that best matches a transcript.
+
+        Every transcript shingle found in the index votes for its manuscript
+        positions. The span is the densest run of votes no longer than the
+        transcript (plus slack for skipped text), widened by the transcript words
+        before the first and after the last matching shingle, plus padding.
+
+        Args:
+            transcript_words (array or list): The transcribed words' vocabulary ids.
+            padding (int): Extra manuscript tokens kept on both sides of the span.
+
+        Returns:
+            dict: The padded 'start'/'end' token range to align against, the
+                  unpadded 'match_start'/'match_end', 'score' (the fraction of
+                  transcript shingles found in the span) and 'hits'.
+        """
+        size = self.size
+        shingle_count = max(len(transcript_words) - size + 1, 0)
+        hits = []  # (manuscript_position, transcript_position)
+        for j, key in shingle_keys(transcript_words, size, self.base):
+            positions = self.postings.get(key)
+            if positions:
+                hits.extend((i, j) for i in positions)
+        if not hits:
+            return {
+                "start": 0,
+                "end": 0,
+                "match_start": 0,
+                "match_end": 0,
+                "score": 0.0,
+                "hits": 0,
+            }
+        hits.sort()
+
+        # Densest window of manuscript positions no wider than the chapter.
+        width = int(len(transcript_words) * 1.25) + size
+        manuscript_positions = [i for i, _ in hits]
+        best_first, best_count = 0, 0
+        for first in range(len(hits)):
+            last = bisect.bisect_right(
+                manuscript_positions, manuscript_positions[first] + width
+            )
+            if last - first > best_count:
+                best_first, best_count = first, last - first
+        window = hits[best_first : best_first + best_count]
+
+        first_i, first_j = min(window, key=lambda hit: hit[1])
+        last_i, last_j = max(window, key=lambda hit: hit[1])
+        match_start = max(0, min(window[0][0], first_i - first_j))
+        match_end = min(
+            self.length,
+            max(window[-1][0] + size, last_i + len(transcript_words) - last_j),
+        )
+        matched = len({j for _, j in window})
+        return {
+            "start": max(0, match_start - padding),
+            "end": min(self.length, match_end + padding),
+            "match_start": match_start,
+            "match_end": match_end,
+            "score": matched / shingle_count,
+            "hits": best_count,
+        }
+
+
+def find_coverage_issues(spans, manuscript_length, min_score=MIN_SCORE, min_gap=200):
+    """
+    Checks located chapter spans against each other and the whole manuscript.
+
+    Args:
+        spans (dict): Chapter name -> the dict returned by ShingleIndex.locate().
+        manuscript_length (int): Number of manuscript tokens.
+        min_score (float): Chapters scoring below this are reported as missing.
+        min_gap (int): Uncovered manuscript regions shorter than this are ignored.
+
+    Returns:
+        dict: 'missing' (chapters not found in the manuscript), 'overlaps'
+              ((chapter_a, chapter_b, overlapping_tokens) tuples) and 'uncovered'
+              ((start, end) manuscript token ranges no chapter was matched to).
+    """
+    missing = sorted(name for name, span in spans.items() if span["score"] < min_score)
+    located = sorted(
+        (span["match_start"], span["match_end"], name)
+        for name, span in spans.items()
+        if span["score"] >= min_score
+    )
+
+    overlaps = []
+    for k, (start, end, name) in enumerate(located):
+        for other_start, other_end, other_name in located[k + 1 :]:
+            if other_start >= end:
+                break
+            overlaps.append((name, other_name, min(end, other_end) - other_start))
+
+    uncovered = []
+    covered_to = 0
+    for start, end, _ in located:
+        if start - covered_to >= min_gap:
+            uncovered.append((covered_to, start))
+        covered_to = max(covered_to, end)
+    if manuscript_length - covered_to >= min_gap:
+        uncovered.append((covered_to, manuscript_length))
+
+    return {"missing": missing, "overlaps": overlaps, "uncovered": uncovered}
@@ -0,0 +1,233 @@
+import bisect
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in milliseconds.
+DEFAULT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16.7, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram of durations for a recurring hot path.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS, budget_ms=None):
+        """
+        Args:
+            buckets_ms (tuple): Sorted bucket upper bounds in milliseconds; one more
+                                bucket collects everything above the last bound.
+            budget_ms (float, optional): Observations above this are counted as
+                                         over budget.
+        """
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.budget_ms = budget_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.over_budget = 0
+
+    def observe(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if self.budget_ms is not None and ms > self.budget_ms:
+            self.over_budget += 1
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given percentile, in ms."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 4),
+            "budget_ms": self.budget_ms,
+            "over_budget": self.over_budget,
+            "buckets_ms": list(self.buckets_ms),
+            "counts": self.counts,
+        }
+
+
+class Metrics:
+    """
+    Stage timings and hot-path histograms for one review session.
+
+    Stages are one-off steps such as parsing or alignment; histograms collect
+    recurring costs such as highlight ticks. Both can be recorded from any
+    thread and are exported together as one JSON line per session, including
+    Chrome trace events for the stages (viewable in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self):
+        self.session_start = time.time()
+        self._clock_start = time.perf_counter()
+        self.stages = []
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as a named stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, started, time.perf_counter())
+
+    def record_stage(self, name, started, finished):
+        """Records a stage from perf_counter() start and end times."""
+        with self._lock:
+            self.stages.append(
+                {
+                    "name": name,
+                    "start": round(started - self._clock_start, 6),
+                    "seconds": round(finished - started, 6),
+                    "thread": threading.current_thread().name,
+                }
+            )
+        logging.info(f"Stage '{name}' took {finished - started:.3f}s.")
+
+    def histogram(self, name, **options):
+        """Returns the named histogram, creating it with `options` on first use."""
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(**options)
+            return self.histograms[name]
+
+    def observe(self, name, seconds):
+        """Adds one duration to the named histogram."""
+        histogram = self.histogram(name)
+        with self._lock:
+            histogram.observe(seconds)
+
+    def to_dict(self):
+        with self._lock:
+            threads = {}
+            trace_events = [
+                {
+                    "name": stage["name"],
+                    "ph": "X",
+                    "ts": int(stage["start"] * 1e6),
+                    "dur": int(stage["seconds"] * 1e6),
+                    "pid": os.getpid(),
+                    "tid": threads.setdefault(stage["thread"], len(threads)),
+                }
+                for stage in self.stages
+            ]
+            return {
+                "session_start": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S", time.localtime(self.session_start)
+                ),
+                "stages": list(self.stages),
+                "histograms": {
+                    name: histogram.to_dict()
+                    for name, histogram in self.histograms.items()
+                },
+                "trace_events": trace_events,
+            }
+
+    def export(self, path):
+        """Appends this session's metrics to a JSON Lines file."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+        logging.info(f"Metrics written to {path}.")
+
+    def log_summary(self):
+        for name, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            summary = (
+                f"{name}: {histogram.count} samples, "
+                f"mean {histogram.total_ms / histogram.count:.2f}ms, "
+                f"p95 <= {histogram.percentile(0.95)}ms, max {histogram.max_ms:.2f}ms"
+            )
+            if histogram.budget_ms is not None:
+                summary += f", {histogram.over_budget} over the {histogram.budget_ms:.1f}ms budget"
+            logging.info(summary + ".")
+
+
+class Profiler:
+    """
+    cProfile across threads. The main thread is profiled between start() and
+    stop(); work on other threads is profiled by running it through wrap(). All
+    profiles that collected stats are merged into one pstats file.
+
+    From Python 3.12, cProfile is built on sys.monitoring, which is process-wide:
+    only one profile can be active, and it already sees every thread. wrap() then
+    leaves functions unprofiled rather than starting a second profile.
+    """
+
+    def __init__(self, path, top=30):
+        """
+        Args:
+            path (str): Where the merged pstats file is written.
+            top (int): Number of functions, by cumulative time, logged at stop().
+        """
+        self.path = path
+        self.top = top
+        self._main = cProfile.Profile()
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._per_thread = not hasattr(sys, "monitoring")
+
+    def start(self):
+        self._main.enable()
+
+    def wrap(self, func):
+        """Returns `func` wrapped so each call is profiled on the calling thread."""
+        if not self._per_thread:
+            return func
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                logging.debug(f"Not profiling {threading.current_thread().name}: {e}")
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+
+        return profiled
+
+    def stop(self):
+        self._main.disable()
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+        stats.dump_stats(self.path)
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(self.top)
+        logging.info(f"Profile written to {self.path}.\n{report.getvalue()}")
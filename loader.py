@@ -0,0 +1,217 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import Metrics
+from manuscript import load_manuscript
+from mismatch_detector import MismatchDetector
+from mp3_index import load_seek_index
+from results_store import chapter_key
+from word_store import load_word_store
+
+# Message kinds posted by FileLoader, in the order they arrive for a successful
+# load. "error" or "cancelled" end a load early.
+PROGRESS = "progress"
+MANUSCRIPT = "manuscript"
+TRANSCRIPT = "transcript"
+ALIGNMENT = "alignment"
+SEEK_INDEX = "seek_index"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+
+class LoadCancelled(Exception):
+    """Raised inside the loader thread when the load has been cancelled."""
+
+
+class FileLoader:
+    """
+    Loads one chapter off the Tk main thread.
+
+    The DOCX and the timestamp JSON are parsed concurrently (along with the MP3
+    seek index, when an MP3 is given), then the transcript is aligned and
+    mismatches are detected. With a ResultsStore, a chapter whose files have not
+    changed is restored from it instead, review status included, and new results
+    are saved to it. Every stage posts a (kind, payload) message on
+    `messages`, which the UI drains with root.after(), so the manuscript can be
+    shown as soon as it is parsed and highlights added once alignment finishes.
+    Audio is not loaded here: pygame's mixer belongs to the main thread.
+    """
+
+    def __init__(
+        self,
+        docx_path,
+        json_path,
+        aligner=None,
+        metrics=None,
+        profiler=None,
+        audio_path=None,
+        store=None,
+    ):
+        """
+        Args:
+            docx_path (str): Path to the manuscript DOCX file.
+            json_path (str): Path to the timestamp JSON file.
+            aligner (str or object, optional): Passed to MismatchDetector.
+            metrics (Metrics, optional): Receives the timing of every stage.
+            profiler (Profiler, optional): Profiles the loader's threads.
+            audio_path (str, optional): The chapter's audio. An MP3's seek index is
+                                        built (or read from its cache) and posted
+                                        before "done".
+            store (ResultsStore, optional): Where results are looked up and saved.
+        """
+        self.docx_path = docx_path
+        self.json_path = json_path
+        self.audio_path = audio_path
+        self.store = store
+        # Set once the results are known, for saving review status later.
+        self.chapter_key = None
+        self.chapter_id = None
+        self.aligner = aligner
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profiler = profiler
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self._instrumented("load_total", self._run), daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """
+        Asks the loader to stop. It does so at the next stage boundary, and any
+        results still in flight are dropped.
+        """
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _post(self, kind, payload=None):
+        self._check_cancelled()
+        self.messages.put((kind, payload))
+
+    def _instrumented(self, stage, func):
+        """Wraps `func` so each call is timed as a stage (and profiled if enabled)."""
+
+        def run(*args):
+            with self.metrics.stage(stage):
+                return func(*args)
+
+        return self.profiler.wrap(run) if self.profiler is not None else run
+
+    def _load_stored(self):
+        """Returns the stored results of this chapter if they include an alignment."""
+        try:
+            with self.metrics.stage("store_lookup"):
+                stored = self.store.load_chapter(self.chapter_key)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not read the results store: {e}")
+            return None
+        if stored is None or stored["opcodes"] is None:
+            return None
+        logging.info(
+            f"Restored {len(stored['mismatches'])} mismatches of '{self.chapter_key['name']}' from the results store."
+        )
+        return stored
+
+    def _save(self, detector, mismatches):
+        try:
+            with self.metrics.stage("store_save"):
+                self.chapter_id = self.store.save_chapter(
+                    self.chapter_key,
+                    mismatches,
+                    opcodes=detector.alignment.opcodes,
+                    manuscript_span=detector.manuscript_span,
+                    match_span=detector.match_span,
+                    location=detector.location,
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"Could not save results to the results store: {e}")
+
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise LoadCancelled()
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self._post(PROGRESS, "Parsing manuscript and transcript...")
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                key_future = None
+                if self.store is not None:
+                    key_future = pool.submit(
+                        self._instrumented("hash_files", chapter_key),
+                        self.docx_path,
+                        self.json_path,
+                        self.audio_path,
+                        self.aligner,
+                    )
+                seek_index_future = None
+                if self.audio_path and self.audio_path.lower().endswith(".mp3"):
+                    seek_index_future = pool.submit(
+                        self._instrumented("seek_index", load_seek_index),
+                        self.audio_path,
+                    )
+                manuscript_future = pool.submit(
+                    self._instrumented("parse_docx", load_manuscript), self.docx_path
+                )
+                transcript_future = pool.submit(
+                    self._instrumented("parse_json", load_word_store), self.json_path
+                )
+                full_manuscript_text, manuscript_tokens = manuscript_future.result()
+                self._post(MANUSCRIPT, (full_manuscript_text, manuscript_tokens))
+                transcribed_data = transcript_future.result()
+                self._post(TRANSCRIPT, transcribed_data)
+
+                stored = None
+                if key_future is not None:
+                    self.chapter_key = key_future.result()
+                    stored = self._load_stored()
+
+            detector = MismatchDetector(
+                manuscript_tokens,
+                transcribed_data,
+                full_manuscript_text,
+                aligner=self.aligner,
+            )
+            if stored is not None:
+                self._post(PROGRESS, "Restoring the saved review...")
+                with self.metrics.stage("restore"):
+                    alignment = detector.restore(
+                        stored["opcodes"],
+                        stored["manuscript_span"],
+                        stored["match_span"],
+                        stored["location"],
+                    )
+                mismatches = stored["mismatches"]
+                self.chapter_id = stored["chapter_id"]
+            else:
+                self._post(PROGRESS, "Aligning manuscript and narration...")
+                with self.metrics.stage("align"):
+                    alignment = detector.align()
+                self._check_cancelled()
+                self._post(PROGRESS, "Detecting mismatches...")
+                with self.metrics.stage("find_mismatches"):
+                    mismatches = detector.find_mismatches()
+                if self.chapter_key is not None:
+                    self._save(detector, mismatches)
+            self._post(ALIGNMENT, (detector, alignment, mismatches))
+            if seek_index_future is not None:
+                try:
+                    self._post(SEEK_INDEX, seek_index_future.result())
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Could not index {self.audio_path}: {e}")
+            self._post(DONE, time.perf_counter() - started)
+        except LoadCancelled:
+            logging.info("File loading cancelled.")
+            self.messages.put((CANCELLED, None))
+        except Exception as e:
+            logging.error(f"Failed during file processing: {e}", exc_info=True)
+            self.messages.put((ERROR, e))
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+
+from tokenizer import tokenize_text
+from word_store import TokenStore
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BODY = _W + "body"
+_PARAGRAPH = _W + "p"
+_TABLE = _W + "tbl"
+_ROW = _W + "tr"
+_CELL = _W + "tc"
+_RUN = _W + "r"
+_HYPERLINK = _W + "hyperlink"
+_BREAK = _W + "br"
+_BREAK_TYPE = _W + "type"
+
+# Run children that contribute text, the same set python-docx uses for Run.text.
+_RUN_TEXT = {
+    _W + "t": None,
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+# Parsed manuscripts are cached on disk, keyed by file hash and mtime. Bump the
+# version whenever extraction or tokenization changes.
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "audiobook_validation", "manuscripts"
+)
+
+
+def extract_docx_text(path):
+    """
+    Extracts the text of a DOCX manuscript, including table cells.
+
+    `word/document.xml` is stream-parsed straight out of the zip, and each body
+    paragraph or table is dropped as soon as its text has been read. Blocks keep
+    their document order and are joined with blank lines; table cells are read
+    row by row, one block per non-empty cell.
+
+    Returns:
+        tuple: (full_manuscript_text, block_count)
+    """
+    all_text_blocks = []
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as document:
+            depth = 0
+            body = None
+            for event, element in ET.iterparse(document, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if element.tag == _BODY:
+                        body = element
+                    continue
+                depth -= 1
+                # Body children end at depth 2: document > body > block.
+                if depth != 2 or body is None:
+                    continue
+                if element.tag == _PARAGRAPH:
+                    text = _paragraph_text(element)
+                    if text.strip():
+                        all_text_blocks.append(text)
+                elif element.tag == _TABLE:
+                    logging.info("Found a table in the document. Extracting cell text.")
+                    for row in element.findall(_ROW):
+                        for cell in row.findall(_CELL):
+                            text = "\n".join(
+                                _paragraph_text(p) for p in cell.findall(_PARAGRAPH)
+                            )
+                            if text.strip():
+                                all_text_blocks.append(text)
+                body.remove(element)
+    return "\n\n".join(all_text_blocks), len(all_text_blocks)
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == _RUN:
+            _run_text(child, parts)
+        elif child.tag == _HYPERLINK:
+            for run in child.findall(_RUN):
+                _run_text(run, parts)
+    return "".join(parts)
+
+
+def _run_text(run, parts):
+    for child in run:
+        if child.tag in _RUN_TEXT:
+            replacement = _RUN_TEXT[child.tag]
+            parts.append((child.text or "") if replacement is None else replacement)
+        elif child.tag == _BREAK:
+            # Only line breaks produce text; page and column breaks do not.
+            if child.get(_BREAK_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+
+
+def tokenize_manuscript(full_manuscript_text):
+    """
+    Splits the manuscript text into word tokens with their character offsets,
+    using the tokenizer the transcribed words are split with.
+
+    Returns:
+        TokenStore: The tokens and their start/end character offsets.
+    """
+    manuscript_tokens = TokenStore()
+    for token, start, end in tokenize_text(full_manuscript_text):
+        manuscript_tokens.append(token, start, end)
+    return manuscript_tokens
+
+
+def parse_docx(path):
+    """
+    Extracts and tokenizes a DOCX manuscript, without using the cache.
+
+    Args:
+        path (str): Path to the manuscript DOCX file.
+
+    Returns:
+        tuple: (full_manuscript_text, manuscript_tokens), where the tokens are a
+               TokenStore of words and their start/end character offsets.
+    """
+    logging.info("Starting streaming DOCX parsing (including tables).")
+    full_manuscript_text, block_count = extract_docx_text(path)
+    manuscript_tokens = tokenize_manuscript(full_manuscript_text)
+    logging.info(
+        f"Parse complete. Parsed {block_count} total text blocks and {len(manuscript_tokens)} word tokens from DOCX."
+    )
+    return full_manuscript_text, manuscript_tokens
+
+
+def load_manuscript(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the tokenized manuscript, from the on-disk cache when possible.
+
+    Cache entries are keyed by the SHA-256 of the DOCX and its mtime, so an
+    unchanged manuscript is only ever parsed once.
+
+    Args:
+        path (str): Path to the manuscript DOCX file.
+        cache_dir (str, optional): Cache directory, or None to disable caching.
+
+    Returns:
+        tuple: (full_manuscript_text, manuscript_tokens) as from parse_docx().
+    """
+    if cache_dir is None:
+        return parse_docx(path)
+
+    cache_path = os.path.join(cache_dir, f"{_cache_key(path)}.json")
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        logging.info(
+            f"Loaded tokenized manuscript from cache ({len(cached[1])} word tokens)."
+        )
+        return cached
+
+    full_manuscript_text, manuscript_tokens = parse_docx(path)
+    try:
+        _write_cache(cache_path, full_manuscript_text, manuscript_tokens)
+    except OSError as e:
+        logging.warning(f"Could not write manuscript cache {cache_path}: {e}")
+    return full_manuscript_text, manuscript_tokens
+
+
+def _cache_key(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{digest.hexdigest()}-{os.stat(path).st_mtime_ns}"
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION:
+        return None
+    text = data["text"]
+    manuscript_tokens = TokenStore()
+    for start, end in zip(data["starts"], data["ends"]):
+        manuscript_tokens.append(text[start:end], start, end)
+    return text, manuscript_tokens
+
+
+def _write_cache(cache_path, full_manuscript_text, manuscript_tokens):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": CACHE_VERSION,
+                "text": full_manuscript_text,
+                "starts": manuscript_tokens.start.tolist(),
+                "ends": manuscript_tokens.end.tolist(),
+            },
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(temp_path, cache_path)
@@ -0,0 +1,208 @@
+import bisect
+import logging
+import tkinter as tk
+from tkinter import ttk
+
+from text_index import LineIndex
+
+# How much of the manuscript is materialized in the Text widget at once, and how
+# far a window edge may move to land on a line break.
+DEFAULT_WINDOW_CHARS = 30000
+SNAP_CHARS = 2000
+# When the viewport comes within this fraction of a window edge, the window is
+# re-centred on it.
+EDGE_FRACTION = 0.05
+
+
+class _RangeSet:
+    """
+    The non-overlapping (start, end) offset ranges of one tag, sorted by start.
+    """
+
+    def __init__(self):
+        self.ranges = []
+
+    def add(self, start, end):
+        position = bisect.bisect_left(self.ranges, (start, end))
+        if position < len(self.ranges) and self.ranges[position] == (start, end):
+            return False
+        self.ranges.insert(position, (start, end))
+        return True
+
+    def remove(self, start, end):
+        position = bisect.bisect_left(self.ranges, (start, end))
+        if position < len(self.ranges) and self.ranges[position] == (start, end):
+            del self.ranges[position]
+
+    def overlapping(self, start, end):
+        """Yields the ranges that overlap [start, end)."""
+        position = bisect.bisect_left(self.ranges, (start, start))
+        if position > 0 and self.ranges[position - 1][1] > start:
+            position -= 1
+        while position < len(self.ranges) and self.ranges[position][0] < end:
+            yield self.ranges[position]
+            position += 1
+
+
+class ManuscriptView:
+    """
+    A windowed view of the manuscript on top of a tk.Text widget.
+
+    Only a window of a few thousand words around the playback position or the
+    scroll viewport is inserted into the widget, so rendering, tag operations
+    and see() cost the same for a chapter and for a whole book. All positions
+    in the public API are global character offsets into the full manuscript
+    text; tags are remembered by offset and re-applied whenever the window moves.
+    """
+
+    def __init__(self, parent, window_chars=DEFAULT_WINDOW_CHARS, **text_options):
+        """
+        Args:
+            parent (tk.Widget): The frame holding the Text widget and its scrollbar.
+            window_chars (int): Number of characters materialized at once.
+            **text_options: Passed through to tk.Text.
+        """
+        self.window_chars = window_chars
+        self.text = tk.Text(parent, **text_options)
+        self.scrollbar = ttk.Scrollbar(parent, command=self._on_scrollbar)
+        self.text.config(yscrollcommand=self._on_text_scroll)
+
+        self.full_text = ""
+        self.window_start = 0
+        self.window_end = 0
+        self.line_index = LineIndex("")
+        self._tags = {}
+        self._shift_pending = False
+
+    # --- Content ---
+
+    def set_text(self, text):
+        """Replaces the manuscript text and forgets all tags."""
+        self.full_text = text
+        self._tags = {}
+        self._materialize(*self._window_around(0))
+        self.text.yview_moveto(0)
+
+    def _window_around(self, offset):
+        total = len(self.full_text)
+        start = max(0, offset - self.window_chars // 2)
+        end = min(total, start + self.window_chars)
+        start = max(0, end - self.window_chars)
+        # Prefer to cut at line breaks so the window starts at a paragraph.
+        if start > 0:
+            newline = self.full_text.rfind("\n", max(0, start - SNAP_CHARS), start)
+            if newline != -1:
+                start = newline + 1
+        if end < total:
+            newline = self.full_text.find("\n", end, end + SNAP_CHARS)
+            if newline != -1:
+                end = newline
+        return start, end
+
+    def _materialize(self, start, end):
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, self.full_text[start:end])
+        self.text.config(state=tk.DISABLED)
+        self.window_start, self.window_end = start, end
+        self.line_index = LineIndex(self.full_text[start:end])
+        for tag, ranges in self._tags.items():
+            for range_start, range_end in ranges.overlapping(start, end):
+                self._apply(self.text.tag_add, tag, range_start, range_end)
+        logging.debug(f"Manuscript view materialized characters {start}-{end}.")
+
+    def _move_window(self, offset):
+        if not self.window_start <= offset < self.window_end or self._near_edge(offset):
+            self._materialize(*self._window_around(offset))
+
+    def _near_edge(self, offset):
+        margin = (self.window_end - self.window_start) * EDGE_FRACTION * 2
+        near_start = self.window_start > 0 and offset < self.window_start + margin
+        near_end = (
+            self.window_end < len(self.full_text) and offset > self.window_end - margin
+        )
+        return near_start or near_end
+
+    # --- Offset <-> widget index ---
+
+    def to_index(self, offset):
+        """Returns the Tk index of a global offset inside the window, or None."""
+        if not self.window_start <= offset <= self.window_end:
+            return None
+        return self.line_index.to_tk(offset - self.window_start)
+
+    def offset_of(self, index):
+        """Returns the global offset of a Tk index in the widget."""
+        return self.window_start + self.line_index.from_tk(self.text.index(index))
+
+    def offset_at(self, x, y):
+        """Returns the global offset of the character at widget coordinates."""
+        return self.offset_of(f"@{x},{y}")
+
+    def selection(self):
+        """Returns the selected (start, end) global offsets, or None."""
+        ranges = self.text.tag_ranges("sel")
+        if not ranges:
+            return None
+        return self.offset_of(ranges[0]), self.offset_of(ranges[1])
+
+    # --- Tags ---
+
+    def tag_add(self, tag, start, end):
+        """Adds a tag over a global offset range, now or when it is materialized."""
+        if self._tags.setdefault(tag, _RangeSet()).add(start, end):
+            self._apply(self.text.tag_add, tag, start, end)
+
+    def tag_remove(self, tag, start, end):
+        """Removes a tag range previously added with tag_add()."""
+        if tag in self._tags:
+            self._tags[tag].remove(start, end)
+        self._apply(self.text.tag_remove, tag, start, end)
+
+    def tag_clear(self, tag):
+        """Removes a tag from the whole manuscript."""
+        self._tags.pop(tag, None)
+        self.text.tag_remove(tag, "1.0", tk.END)
+
+    def _apply(self, method, tag, start, end):
+        start = max(start, self.window_start)
+        end = min(end, self.window_end)
+        if start < end:
+            method(tag, self.to_index(start), self.to_index(end))
+
+    def see(self, offset):
+        """Scrolls a global offset into view, moving the window if needed."""
+        self._move_window(offset)
+        self.text.see(self.to_index(offset))
+
+    # --- Scrolling ---
+
+    def _on_text_scroll(self, first, last):
+        first, last = float(first), float(last)
+        total = max(len(self.full_text), 1)
+        length = self.window_end - self.window_start
+        self.scrollbar.set(
+            (self.window_start + first * length) / total,
+            (self.window_start + last * length) / total,
+        )
+        at_top = first < EDGE_FRACTION and self.window_start > 0
+        at_bottom = last > 1 - EDGE_FRACTION and self.window_end < len(self.full_text)
+        if (at_top or at_bottom) and not self._shift_pending:
+            self._shift_pending = True
+            self.text.after_idle(self._recenter_on_viewport)
+
+    def _recenter_on_viewport(self):
+        self._shift_pending = False
+        top = self.offset_at(0, 0)
+        self._materialize(*self._window_around(top))
+        self.text.yview(self.to_index(top))
+
+    def _on_scrollbar(self, *args):
+        if args[0] != "moveto":
+            self.text.yview(*args)
+            return
+        target = int(float(args[1]) * len(self.full_text))
+        target = max(0, min(target, len(self.full_text)))
+        if not self.window_start <= target < self.window_end:
+            self._materialize(*self._window_around(target))
+        self.text.yview(self.to_index(target))
@@ -1,12 +1,78 @@
-import difflib
+import bisect
 import re
 import time
 import logging
+from array import array
 
+from alignment import (
+    Alignment,
+    StreamingAlignment,
+    align,
+    get_aligner,
+    realign,
+    word_range,
+)
+from chapter_locator import LOCATE_RATIO, MIN_SCORE, ShingleIndex
+from text_index import SentenceIndex
+from tokenizer import split_words
+from vocabulary import ID_TYPECODE, Vocabulary
+from word_store import WordStore, as_token_store, as_word_store, splice_transcript
 
-def normalize_word(word):
-    """A consistent normalization function used for comparison."""
-    return word.lower().strip(".,;:!?\"'()[]{} ")
+# Mismatch fields set by the reviewer, the verification pass or lazily, rather
+# than computed from the alignment; they survive re-validation.
+REVIEW_FIELDS = ("status", "context", "verification")
+# Transcript tokens collected before a streamed chapter is located in a
+# whole-book manuscript.
+STREAM_LOCATE_TOKENS = 400
+
+
+def changed_transcript_range(old_words, new_words):
+    """
+    Returns the (start, old_end, new_end) range where two transcripts differ,
+    found by trimming their common prefix and suffix.
+    """
+    start = 0
+    limit = min(len(old_words), len(new_words))
+    while start < limit and old_words[start] == new_words[start]:
+        start += 1
+    old_end, new_end = len(old_words), len(new_words)
+    while (
+        old_end > start
+        and new_end > start
+        and old_words[old_end - 1] == new_words[new_end - 1]
+    ):
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def iter_queue(source, sentinel=None):
+    """
+    Yields the items put on a queue.Queue until `sentinel` arrives, so a
+    transcription running on another thread can feed detect_stream().
+    """
+    while True:
+        item = source.get()
+        if item is sentinel:
+            return
+        yield item
+
+
+def _word_batches(items):
+    """Yields lists of word dicts from a stream of Whisper segments or words."""
+    for item in items:
+        if "words" in item:
+            if item["words"]:
+                yield item["words"]
+        else:
+            yield [item]
+
+
+def _first_token(token_to_word, word_index):
+    """Returns the index of the first transcript token at or after a word."""
+    if token_to_word is None:
+        return word_index
+    return bisect.bisect_left(token_to_word, word_index)
 
 
 class MismatchDetector:
@@ -14,143 +80,487 @@ class MismatchDetector:
     Analyzes manuscript and transcription data to find and categorize differences.
     """
 
-    def __init__(self, manuscript_tokens, transcribed_data, full_manuscript_text):
+    def __init__(
+        self,
+        manuscript_tokens,
+        transcribed_data,
+        full_manuscript_text,
+        aligner=None,
+        manuscript_span=None,
+        vocabulary=None,
+    ):
         """
         Initializes the detector with the necessary data.
 
         Args:
-            manuscript_tokens (list): A list of token dicts from the manuscript,
-                                      including {'word': str, 'start': int, 'end': int}.
-            transcribed_data (list): The list of word dicts from the JSON file.
+            manuscript_tokens (TokenStore or list): The manuscript tokens, either as a
+                                      TokenStore or as token dicts including
+                                      {'word': str, 'start': int, 'end': int}.
+            transcribed_data (WordStore or list): The transcribed words, either as a
+                                      WordStore or as the word dicts from the JSON file.
             full_manuscript_text (str): The complete manuscript text for context extraction.
+            aligner (str or object, optional): The alignment engine, either a name from
+                                               alignment.ALIGNERS ('anchor', 'difflib')
+                                               or an aligner instance. Defaults to 'anchor'.
+            manuscript_span (tuple, optional): The (start, end) manuscript token range
+                                      the transcription covers. When omitted and the
+                                      manuscript is much longer than the transcription
+                                      (a whole-book DOCX), it is located automatically.
+            vocabulary (Vocabulary, optional): The word ids to encode both sides with.
+                                      Pass the one a shared ShingleIndex was built
+                                      with; a new one is created when omitted.
         """
-        self.manuscript_tokens = manuscript_tokens
-        self.transcribed_data = transcribed_data
+        self.manuscript_tokens = as_token_store(manuscript_tokens)
+        self.transcribed_data = as_word_store(transcribed_data)
         self.full_manuscript_text = full_manuscript_text
-        logging.info("MismatchDetector initialized.")
+        self.aligner = get_aligner(aligner)
+        self.manuscript_span = manuscript_span
+        self.match_span = None
+        self.location = None
+        self.alignment = None
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self._manuscript_ids = None
+        self._transcribed_ids = None
+        self._token_to_word = None
+        self._sentence_index = None
+        logging.info(
+            f"MismatchDetector initialized with {type(self.aligner).__name__}."
+        )
 
-    def find_mismatches(self):
+    def align(self):
         """
-        Performs the core comparison and returns a list of mismatch objects.
+        Aligns the manuscript with the transcription once and caches the result.
 
         Returns:
-            list: A list of dictionaries, where each dictionary represents a single mismatch.
+            Alignment: The shared alignment (opcodes plus index mappings both ways).
         """
-        logging.info("Starting mismatch detection process.")
-        mismatches = []
+        if self.alignment is None:
+            whole_book = len(self.manuscript_tokens) > LOCATE_RATIO * len(
+                self.transcribed_data
+            )
+            if whole_book and self.manuscript_span is None and self.location is None:
+                self.locate_chapter()
+            self.alignment = align(
+                self.manuscript_ids(),
+                self.transcribed_ids(),
+                aligner=self.aligner,
+                manuscript_span=self.manuscript_span,
+                match_span=self.match_span,
+                token_to_word=self._token_to_word,
+            )
+            logging.info(
+                f"{type(self.aligner).__name__} found {len(self.alignment.opcodes)} opcodes."
+            )
+        return self.alignment
 
-        manuscript_normalized = [
-            normalize_word(token["word"]) for token in self.manuscript_tokens
-        ]
-        transcribed_normalized = [
-            normalize_word(item["word"]) for item in self.transcribed_data
-        ]
+    def restore(self, opcodes, manuscript_span=None, match_span=None, location=None):
+        """
+        Reuses a stored alignment of this manuscript and transcription instead of
+        computing it again.
 
-        matcher = difflib.SequenceMatcher(
-            None, manuscript_normalized, transcribed_normalized, autojunk=False
+        Args:
+            opcodes (list): The stored Alignment.opcodes.
+            manuscript_span (tuple, optional): The stored manuscript_span.
+            match_span (tuple, optional): The stored match_span.
+            location (dict, optional): The stored location.
+
+        Returns:
+            Alignment: The restored alignment.
+        """
+        self.manuscript_span = manuscript_span
+        self.match_span = match_span
+        self.location = location
+        transcribed_ids = self.transcribed_ids()
+        self.alignment = Alignment(
+            opcodes,
+            len(self.manuscript_tokens),
+            len(transcribed_ids),
+            self._token_to_word,
         )
+        return self.alignment
 
-        opcodes = matcher.get_opcodes()
-        logging.info(f"SequenceMatcher found {len(opcodes)} opcodes.")
+    def detect_stream(self, words, locate=False, shingle_index=None):
+        """
+        Finds mismatches while the transcription is still being produced.
+
+        Words are aligned as they arrive (see alignment.StreamingAlignment), and
+        each mismatch is yielded as soon as the alignment around it is final, so
+        the opening of a chapter can be reviewed while the rest is transcribed.
+        When the stream ends, the detector holds the complete transcription and
+        alignment, as after find_mismatches().
+
+        Args:
+            words (iterable): Whisper segments ({'words': [...]}) or word dicts, e.g.
+                              from a generator, or from iter_queue() over a queue.
+            locate (bool): The manuscript is a whole book: the chapter is located
+                           from its first words, and manuscript text after its
+                           last word is not reported as skipped.
+            shingle_index (ShingleIndex, optional): See locate_chapter().
+
+        Yields:
+            list: The mismatches that became final, in transcript order.
+        """
+        self.transcribed_data = WordStore()
+        self.alignment = None
+        token_to_word = array("l")
+        one_to_one = True
+        stream = StreamingAlignment(
+            self.manuscript_ids(),
+            aligner=self.aligner,
+            manuscript_span=self.manuscript_span,
+            token_to_word=token_to_word,
+            typecode=ID_TYPECODE,
+        )
+        unlocated = array(ID_TYPECODE) if locate else None
 
-        for tag, i1, i2, j1, j2 in opcodes:
-            if tag == "equal":
-                continue
+        for batch in _word_batches(words):
+            data = self.transcribed_data
+            first_word = len(data)
+            for item in batch:
+                data.append(
+                    item["word"],
+                    item["start"],
+                    item["end"],
+                    item.get("probability", 0.0),
+                )
+            tokens, mapping = split_words(data.words[first_word:])
+            if mapping is None:
+                token_to_word.extend(range(first_word, len(data)))
+            else:
+                one_to_one = False
+                token_to_word.extend(index + first_word for index in mapping)
+            ids = self.vocabulary.encode(tokens)
+            if unlocated is not None:
+                unlocated.extend(ids)
+                if len(unlocated) < STREAM_LOCATE_TOKENS:
+                    continue
+                self._locate_stream(stream, unlocated, shingle_index)
+                ids, unlocated = unlocated, None
+            opcodes = stream.extend(ids)
+            if opcodes:
+                mismatches = self._stream_mismatches(opcodes, token_to_word)
+                if mismatches:
+                    yield mismatches
 
-            # --- Data Extraction from Slices ---
-            manuscript_slice_tokens = self.manuscript_tokens[i1:i2]
-            narrated_slice_data = self.transcribed_data[j1:j2]
+        if unlocated is not None:
+            self._locate_stream(stream, unlocated, shingle_index)
+            stream.extend(unlocated)
+        opcodes = stream.finish(clip_end=locate)
+        mismatches = self._stream_mismatches(opcodes, token_to_word)
 
-            manuscript_text = " ".join(
-                token["word"] for token in manuscript_slice_tokens
+        self._transcribed_ids = stream.transcript
+        self._token_to_word = None if one_to_one else token_to_word
+        self.alignment = Alignment(
+            stream.opcodes,
+            len(self.manuscript_tokens),
+            len(stream.transcript),
+            self._token_to_word,
+        )
+        if locate and stream.opcodes:
+            self.manuscript_span = (stream.start, stream.opcodes[-1][2])
+            self.match_span = self.manuscript_span
+        logging.info(
+            f"Streamed {len(self.transcribed_data)} transcribed words into {len(stream.opcodes)} opcodes."
+        )
+        if mismatches:
+            yield mismatches
+
+    def _locate_stream(self, stream, ids, shingle_index):
+        if shingle_index is None:
+            shingle_index = ShingleIndex(self.manuscript_ids())
+        self.location = shingle_index.locate(ids)
+        if self.location["score"] < MIN_SCORE:
+            logging.warning(
+                f"Transcription not found in the manuscript (score {self.location['score']:.2f}). Aligning from the start of the manuscript."
             )
-            narrated_text = " ".join(item["word"] for item in narrated_slice_data)
-
-            # --- Confidence Score Calculation ---
-            confidence = 1.0  # Default confidence (especially for deletions)
-            if narrated_slice_data:
-                probs = [item.get("probability", 0.0) for item in narrated_slice_data]
-                if probs:
-                    confidence = sum(probs) / len(probs)
-
-            # --- Timestamp Calculation ---
-            # For insertions/replacements, use the start time of the first narrated word.
-            # For deletions, estimate from the end time of the previous word.
-            start_time = None
-            if narrated_slice_data:
-                start_time = narrated_slice_data[0]["start"]
-            elif j1 > 0:
-                start_time = self.transcribed_data[j1 - 1]["end"]
-
-            # --- Context Sentence Extraction ---
-            # Get the character index of the start of the mismatch in the manuscript
-            context_char_index = -1
-            if manuscript_slice_tokens:
-                context_char_index = manuscript_slice_tokens[0]["start"]
-            # If it's an pure insertion, find the context of the word *after* the insertion
-            elif self.manuscript_tokens and i1 < len(self.manuscript_tokens):
-                context_char_index = self.manuscript_tokens[i1]["start"]
-
-            context_sentence = self._get_context_sentence(context_char_index)
-
-            mismatches.append(
-                {
-                    "type": tag,  # 'replace', 'delete', 'insert'
-                    "manuscript_text": manuscript_text,
-                    "narrated_text": narrated_text,
-                    "start_time": start_time,
-                    "confidence": confidence,
-                    "manuscript_indices": (
-                        i1,
-                        i2,
-                    ),  # For mapping back to the manuscript tokens
-                    "status": "unconfirmed",  # 'confirmed' or 'ignored'
-                    "context": context_sentence,
-                    "tooltip_text": (
-                        f"Type: {tag.capitalize()}\n"
-                        f"Confidence: {confidence:.2%}\n"
-                        f"Manuscript: '{manuscript_text}'\n"
-                        f"Narrated: '{narrated_text}'"
-                    ),
-                }
+            return
+        stream.seek(self.location["match_start"])
+        logging.info(
+            f"Transcription starts at manuscript token {self.location['match_start']} (score {self.location['score']:.2f})."
+        )
+
+    def _stream_mismatches(self, opcodes, token_to_word):
+        word_count = len(self.transcribed_data)
+        return [
+            self._build_mismatch(
+                tag, i1, i2, *word_range(token_to_word, j1, j2, word_count)
+            )
+            for tag, i1, i2, j1, j2 in opcodes
+            if tag != "equal"
+        ]
+
+    def manuscript_ids(self):
+        """Returns the manuscript tokens encoded as vocabulary ids, computed once."""
+        if self._manuscript_ids is None:
+            self._manuscript_ids = self.vocabulary.encode(self.manuscript_tokens.words)
+        return self._manuscript_ids
+
+    def transcribed_ids(self):
+        """
+        Returns the transcribed words, split into the manuscript's tokens and
+        encoded as vocabulary ids, computed once.
+        """
+        if self._transcribed_ids is None:
+            tokens, self._token_to_word = split_words(self.transcribed_data.words)
+            self._transcribed_ids = self.vocabulary.encode(tokens)
+        return self._transcribed_ids
+
+    def locate_chapter(self, shingle_index=None):
+        """
+        Finds the region of a whole-book manuscript that the transcription covers,
+        and restricts alignment to it.
+
+        Args:
+            shingle_index (ShingleIndex, optional): A prebuilt index of this
+                                      manuscript's ids, to share between the chapters
+                                      of one book together with its vocabulary.
+                                      Built on demand when omitted.
+
+        Returns:
+            dict: The location as returned by ShingleIndex.locate(). When its score
+                  is too low the whole manuscript is aligned instead.
+        """
+        if shingle_index is None:
+            shingle_index = ShingleIndex(self.manuscript_ids())
+        self.location = shingle_index.locate(self.transcribed_ids())
+        if self.location["score"] < MIN_SCORE:
+            logging.warning(
+                f"Transcription not found in the manuscript (score {self.location['score']:.2f}). Aligning against the whole manuscript."
             )
+            self.manuscript_span = self.match_span = None
+        else:
+            self.manuscript_span = (self.location["start"], self.location["end"])
+            self.match_span = (
+                self.location["match_start"],
+                self.location["match_end"],
+            )
+            logging.info(
+                f"Transcription located at manuscript tokens {self.location['start']}-{self.location['end']} (score {self.location['score']:.2f})."
+            )
+        self.alignment = None
+        return self.location
+
+    def word_map(self):
+        """
+        Maps every aligned transcribed word to its manuscript token's characters.
+        A word split into several tokens ("well-known") spans all of them.
+
+        Returns:
+            dict: Transcribed word index -> (start_char, end_char) in the manuscript.
+        """
+        starts, ends = self.manuscript_tokens.start, self.manuscript_tokens.end
+        alignment = self.align()
+        if alignment.token_to_word is None:
+            return {
+                whisper_index: (starts[manuscript_index], ends[manuscript_index])
+                for manuscript_index, whisper_index in alignment.pairs()
+            }
+        word_map = {}
+        for manuscript_index, whisper_index in alignment.pairs():
+            span = word_map.get(whisper_index)
+            if span is None:
+                word_map[whisper_index] = (
+                    starts[manuscript_index],
+                    ends[manuscript_index],
+                )
+            else:
+                word_map[whisper_index] = (span[0], ends[manuscript_index])
+        return word_map
+
+    def find_mismatches(self):
+        """
+        Performs the core comparison and returns a list of mismatch objects.
+
+        Returns:
+            list: A list of dictionaries, where each dictionary represents a single mismatch.
+        """
+        logging.info("Starting mismatch detection process.")
+        mismatches = []
+
+        word_count = len(self.transcribed_data)
+        for tag, i1, i2, j1, j2 in self.align().word_opcodes(word_count, True):
+            mismatches.append(self._build_mismatch(tag, i1, i2, j1, j2))
 
         logging.info(
             f"Mismatch detection complete. Found {len(mismatches)} potential mismatches."
         )
         return mismatches
 
-    def _get_context_sentence(self, char_index):
+    def _build_mismatch(self, tag, i1, i2, j1, j2):
+        # --- Data Extraction from Slices ---
+        manuscript_text = " ".join(self.manuscript_tokens.words[i1:i2])
+        narrated_text = " ".join(self.transcribed_data.words[j1:j2])
+
+        # --- Confidence Score Calculation ---
+        confidence = 1.0  # Default confidence (especially for deletions)
+        if j2 > j1:
+            probs = self.transcribed_data.probability[j1:j2]
+            confidence = sum(probs) / len(probs)
+
+        # --- Timestamp Calculation ---
+        # For insertions/replacements, use the start time of the first narrated word.
+        # For deletions, estimate from the end time of the previous word.
+        start_time = None
+        if j2 > j1:
+            start_time = self.transcribed_data.start[j1]
+        elif j1 > 0:
+            start_time = self.transcribed_data.end[j1 - 1]
+
+        return {
+            "type": tag,  # 'replace', 'delete', 'insert'
+            "manuscript_text": manuscript_text,
+            "narrated_text": narrated_text,
+            "start_time": start_time,
+            "confidence": confidence,
+            "manuscript_indices": (
+                i1,
+                i2,
+            ),  # For mapping back to the manuscript tokens
+            "transcript_indices": (j1, j2),  # The narrated words involved
+            "status": "unconfirmed",  # 'confirmed' or 'ignored'
+            "context": None,  # Filled in lazily by get_context()
+            "tooltip_text": (
+                f"Type: {tag.capitalize()}\n"
+                f"Confidence: {confidence:.2%}\n"
+                f"Manuscript: '{manuscript_text}'\n"
+                f"Narrated: '{narrated_text}'"
+            ),
+        }
+
+    def revalidate(self, new_transcribed_data, mismatches, changed_range=None):
         """
-        Finds the full sentence that contains the character at a given index.
+        Re-validates a chapter after pickups or a partial re-record.
+
+        The new words are spliced into the existing alignment and only the
+        manuscript region whose narration changed is re-aligned. Mismatches found
+        again, i.e. everything outside that region and any identical mismatch
+        inside it, keep their review status.
+
+        Args:
+            new_transcribed_data (WordStore or list): The complete new transcription.
+            mismatches (list): The current mismatches, as returned by
+                               find_mismatches() or a previous revalidate().
+            changed_range (tuple, optional): The (start, old_end, new_end) range of
+                                      transcript words that changed. Found by
+                                      comparing the old and new words when omitted.
+
+        Returns:
+            list: The updated mismatches. Timings and confidences come from the new
+                  transcription.
         """
-        if char_index == -1 or not self.full_manuscript_text:
-            return "N/A"
+        alignment = self.align()
+        old_token_to_word = self._token_to_word
+        new_data = as_word_store(new_transcribed_data)
+        new_tokens, new_token_to_word = split_words(new_data.words)
+        new_ids = self.vocabulary.encode(new_tokens)
+        if changed_range is None:
+            changed_range = changed_transcript_range(
+                self.transcribed_data.words, new_data.words
+            )
+        start, old_end, new_end = changed_range
+        shift = new_end - old_end
+
+        self.alignment, region = realign(
+            alignment,
+            self.manuscript_ids(),
+            new_ids,
+            (
+                _first_token(old_token_to_word, start),
+                _first_token(old_token_to_word, old_end),
+                _first_token(new_token_to_word, new_end),
+            ),
+            aligner=self.aligner,
+            token_to_word=new_token_to_word,
+        )
+        self.transcribed_data = new_data
+        self._transcribed_ids = new_ids
+        self._token_to_word = new_token_to_word
+
+        # Index the old mismatches by where they would sit in the new transcript,
+        # and those in the re-aligned region by what was said as well.
+        by_position = {}
+        by_text = {}
+        for mismatch in mismatches:
+            i1, i2 = mismatch["manuscript_indices"]
+            j1, j2 = mismatch["transcript_indices"]
+            if j1 >= old_end:
+                j1, j2 = j1 + shift, j2 + shift
+            by_position[(mismatch["type"], i1, i2, j1, j2)] = mismatch
+            key = (mismatch["type"], i1, i2, mismatch["narrated_text"])
+            by_text[key] = mismatch
+
+        updated = []
+        kept = 0
+        for tag, i1, i2, j1, j2 in self.alignment.word_opcodes(len(new_data), True):
+            mismatch = self._build_mismatch(tag, i1, i2, j1, j2)
+            previous = by_position.get((tag, i1, i2, j1, j2))
+            if previous is None:
+                previous = by_text.get((tag, i1, i2, mismatch["narrated_text"]))
+            if previous is not None:
+                for field in REVIEW_FIELDS:
+                    if field in previous:
+                        mismatch[field] = previous[field]
+                kept += 1
+            updated.append(mismatch)
 
-        # Find the start of the sentence (search backwards for . ! ?)
-        sentence_start = self.full_manuscript_text.rfind(".", 0, char_index)
-        sentence_start = max(
-            sentence_start, self.full_manuscript_text.rfind("!", 0, char_index)
+        i_lo, i_hi, j_lo, _, j_hi = region
+        logging.info(
+            f"Re-validated manuscript tokens {i_lo}-{i_hi} against transcript tokens {j_lo}-{j_hi}: "
+            f"{len(updated)} mismatches, {kept} kept from the previous review."
         )
-        sentence_start = max(
-            sentence_start, self.full_manuscript_text.rfind("?", 0, char_index)
+        return updated
+
+    def revalidate_time_range(
+        self, start_time, end_time, replacement, mismatches, shift=0.0
+    ):
+        """
+        Re-validates after replacing the words of one time range with a pickup.
+
+        Args:
+            start_time (float): Start of the re-recorded range, in seconds.
+            end_time (float): End of the re-recorded range, in seconds.
+            replacement (WordStore or list): The transcribed words of the pickup.
+            mismatches (list): The current mismatches.
+            shift (float): Seconds added to the words after the range.
+
+        Returns:
+            list: The updated mismatches, as from revalidate().
+        """
+        new_data, changed_range = splice_transcript(
+            self.transcribed_data, start_time, end_time, replacement, shift
         )
+        return self.revalidate(new_data, mismatches, changed_range)
+
+    def get_context(self, mismatch):
+        """
+        Returns the manuscript sentence around a mismatch, extracting it on first use.
 
-        # Find the end of the sentence (search forwards)
-        sentence_end = self.full_manuscript_text.find(".", char_index)
-        if sentence_end == -1:
-            sentence_end = len(self.full_manuscript_text)
+        Context is only needed for mismatches that are displayed or exported, so it
+        is not computed by find_mismatches().
 
-        exclamation_end = self.full_manuscript_text.find("!", char_index)
-        if exclamation_end != -1:
-            sentence_end = min(sentence_end, exclamation_end)
+        Args:
+            mismatch (dict): A mismatch returned by find_mismatches().
+
+        Returns:
+            str: The context sentence, or "N/A" when it cannot be determined.
+        """
+        if mismatch.get("context") is None:
+            # Use the first token of the mismatch; for a pure insertion this is the
+            # word *after* the insertion.
+            i1 = mismatch["manuscript_indices"][0]
+            context_char_index = -1
+            if i1 < len(self.manuscript_tokens):
+                context_char_index = self.manuscript_tokens.start[i1]
+            mismatch["context"] = self._get_context_sentence(context_char_index)
+        return mismatch["context"]
 
-        question_end = self.full_manuscript_text.find("?", char_index)
-        if question_end != -1:
-            sentence_end = min(sentence_end, question_end)
+    def _get_context_sentence(self, char_index):
+        """
+        Finds the full sentence that contains the character at a given index.
+        """
+        if char_index == -1 or not self.full_manuscript_text:
+            return "N/A"
 
-        # Extract and clean up the sentence
-        context = self.full_manuscript_text[
-            sentence_start + 1 : sentence_end + 1
-        ].strip()
-        return context
+        if self._sentence_index is None:
+            self._sentence_index = SentenceIndex(self.full_manuscript_text)
+        return self._sentence_index.sentence_at(char_index)
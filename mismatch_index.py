@@ -0,0 +1,165 @@
+import bisect
+
+# Filtered views kept at once; a slider sweep would otherwise leave one per stop.
+MAX_CACHED_VIEWS = 8
+
+
+def _start_time(mismatch):
+    # A deletion before the first narrated word has no time; it plays at 0.
+    return mismatch["start_time"] if mismatch["start_time"] is not None else 0.0
+
+
+def _time_key(mismatch):
+    # Ties (a deletion right before a substitution) are broken by position, so
+    # every mismatch has its own place in the order.
+    return (
+        _start_time(mismatch),
+        mismatch["manuscript_indices"][0],
+        mismatch["transcript_indices"][0],
+    )
+
+
+class MismatchView:
+    """
+    The mismatches that pass one filter, in playback order.
+
+    Stepping to the next or previous mismatch from a playback time or from the
+    current mismatch, and listing the mismatches in a time range, are bisects.
+    """
+
+    def __init__(self, mismatches):
+        """
+        Args:
+            mismatches (list): Mismatch dicts, sorted by _time_key().
+        """
+        self.mismatches = mismatches
+        self.keys = [_time_key(m) for m in mismatches]
+        self.times = [key[0] for key in self.keys]
+
+    def __len__(self):
+        return len(self.mismatches)
+
+    def __getitem__(self, position):
+        return self.mismatches[position]
+
+    def position_of(self, mismatch):
+        """Returns the position of a mismatch in this view, or None."""
+        position = bisect.bisect_left(self.keys, _time_key(mismatch))
+        if position < len(self.mismatches) and self.mismatches[position] is mismatch:
+            return position
+        return None
+
+    def next_after(self, time_in_seconds, current=None):
+        """
+        Returns the first mismatch after a playback time, or None.
+
+        Args:
+            time_in_seconds (float): The playback position.
+            current (dict, optional): The mismatch last jumped to. When given, the
+                                      mismatch following it is returned instead,
+                                      so mismatches sharing a timestamp are not
+                                      skipped.
+        """
+        if current is not None:
+            position = bisect.bisect_right(self.keys, _time_key(current))
+        else:
+            position = bisect.bisect_right(self.times, time_in_seconds)
+        return self.mismatches[position] if position < len(self.mismatches) else None
+
+    def previous_before(self, time_in_seconds, current=None):
+        """
+        Returns the last mismatch before a playback time (or before `current`),
+        or None. See next_after().
+        """
+        if current is not None:
+            position = bisect.bisect_left(self.keys, _time_key(current)) - 1
+        else:
+            position = bisect.bisect_left(self.times, time_in_seconds) - 1
+        return self.mismatches[position] if position >= 0 else None
+
+    def in_time_range(self, start, end):
+        """Returns the mismatches starting in [start, end) seconds."""
+        first = bisect.bisect_left(self.times, start)
+        last = bisect.bisect_left(self.times, end)
+        return self.mismatches[first:last]
+
+
+class MismatchIndex:
+    """
+    A chapter's mismatches ordered by playback time and by manuscript position.
+
+    Views filtered by type, confidence threshold and review status are built on
+    first use and cached until invalidate(), so navigation stays logarithmic
+    while the filter is unchanged. Mismatch dicts are shared, not copied, so
+    status changes made through the review app are seen by every view.
+    """
+
+    def __init__(self, mismatches):
+        """
+        Args:
+            mismatches (list): Mismatch dicts from MismatchDetector.
+        """
+        self.by_time = sorted(mismatches, key=_time_key)
+        # Mismatches covering manuscript text (substitutions and deletions) never
+        # overlap there, so sorting by start orders them completely.
+        self.by_manuscript = sorted(
+            (
+                m
+                for m in mismatches
+                if m["manuscript_indices"][0] < m["manuscript_indices"][1]
+            ),
+            key=lambda m: m["manuscript_indices"][0],
+        )
+        self._manuscript_starts = [
+            m["manuscript_indices"][0] for m in self.by_manuscript
+        ]
+        self._views = {}
+
+    def __len__(self):
+        return len(self.by_time)
+
+    def invalidate(self):
+        """Forgets the cached views, e.g. after a mismatch's status changed."""
+        self._views.clear()
+
+    def view(self, types=None, min_confidence=0.0, include_ignored=False):
+        """
+        Returns the mismatches passing a filter, as a MismatchView.
+
+        Args:
+            types (iterable, optional): Mismatch types to include ('replace',
+                                        'delete', 'insert'). All when None.
+            min_confidence (float): Lowest confidence to include.
+            include_ignored (bool): Whether ignored mismatches are included.
+        """
+        key = (frozenset(types) if types else None, min_confidence, include_ignored)
+        view = self._views.get(key)
+        if view is None:
+            if len(self._views) >= MAX_CACHED_VIEWS:
+                self._views.clear()
+            view = self._views[key] = MismatchView(
+                [
+                    m
+                    for m in self.by_time
+                    if (key[0] is None or m["type"] in key[0])
+                    and m["confidence"] >= min_confidence
+                    and (include_ignored or m["status"] != "ignored")
+                ]
+            )
+        return view
+
+    def at_token(self, token_index):
+        """Returns the mismatch covering a manuscript token, or None."""
+        position = bisect.bisect_right(self._manuscript_starts, token_index) - 1
+        if position < 0:
+            return None
+        mismatch = self.by_manuscript[position]
+        if token_index < mismatch["manuscript_indices"][1]:
+            return mismatch
+        return None
+
+    def in_manuscript_range(self, first_token, last_token):
+        """Returns the mismatches starting at manuscript tokens [first, last)."""
+        first = bisect.bisect_left(self._manuscript_starts, first_token)
+        last = bisect.bisect_left(self._manuscript_starts, last_token)
+        return self.by_manuscript[first:last]
@@ -0,0 +1,247 @@
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+from array import array
+
+# Seek indexes are cached on disk next to the parsed manuscripts. Bump the version
+# whenever the index format or the frame parsing changes.
+SEEK_INDEX_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "audiobook_validation", "seek_indexes"
+)
+
+# Bitrates in kbps by (MPEG-1, layer) and (MPEG-2/2.5, layer), for bitrate
+# indexes 1-14. Index 0 (free format) and 15 (invalid) are not supported.
+_BITRATES = {
+    (True, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by the header's version bits: 0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1.
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def _frame_info(b1, b2):
+    """
+    Decodes the second and third bytes of a frame header.
+
+    Returns:
+        tuple: (frame_length, samples_per_frame, sample_rate), or None if the
+               header is invalid.
+    """
+    version = (b1 >> 3) & 3
+    layer = 4 - ((b1 >> 1) & 3)  # the header stores 3 for Layer I, 1 for Layer III
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index - 1] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    samples = 1152 if mpeg1 or layer == 2 else 576
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate
+
+
+def _id3v2_size(data):
+    """Returns the size of an ID3v2 tag at the start of the file, or 0."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(data, offset, length):
+    """True for the Xing/Info/VBRI header frame, which holds no audio."""
+    head = data[offset : offset + min(length, 64)]
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+
+class Mp3SeekIndex:
+    """
+    The byte offset and first sample of every audio frame of an MP3 file.
+
+    Built by reading only the frame headers, so seeking to any time is a bisect
+    and a file seek, with no decoding, however long the file and whatever its
+    bitrate mode.
+    """
+
+    def __init__(self, offsets, sample_starts, sample_rate, total_samples):
+        """
+        Args:
+            offsets (array): Byte offset of every frame.
+            sample_starts (array): Index of every frame's first sample.
+            sample_rate (int): Samples per second.
+            total_samples (int): Samples in the whole file.
+        """
+        self.offsets = offsets
+        self.sample_starts = sample_starts
+        self.sample_rate = sample_rate
+        self.total_samples = total_samples
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self):
+        """Length of the audio in seconds."""
+        return self.total_samples / self.sample_rate if self.sample_rate else 0.0
+
+    def frame_at(self, time_in_seconds):
+        """
+        Returns (byte_offset, frame_start_time) of the frame playing at a time.
+
+        Times past the end map to the last frame, and negative times to the first.
+        """
+        if not self.offsets:
+            return 0, 0.0
+        sample = int(time_in_seconds * self.sample_rate)
+        k = max(0, bisect.bisect_right(self.sample_starts, sample) - 1)
+        return self.offsets[k], self.sample_starts[k] / self.sample_rate
+
+    @classmethod
+    def build(cls, path):
+        """
+        Scans an MP3 file's frame headers.
+
+        Args:
+            path (str): Path to the MP3 file.
+
+        Returns:
+            Mp3SeekIndex: The index. Raises ValueError if no frames are found.
+        """
+        offsets = array("q")
+        sample_starts = array("q")
+        sample_rate = 0
+        total_samples = 0
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{path} is empty.")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                size = len(data)
+                position = _id3v2_size(data)
+                headers = {}  # (b1, b2) -> _frame_info(), decoded once per kind
+                synced = False
+                while position + 4 <= size:
+                    if data[position] != 0xFF or data[position + 1] & 0xE0 != 0xE0:
+                        info = None
+                    else:
+                        key = (data[position + 1], data[position + 2])
+                        info = headers.get(key)
+                        if info is None and key not in headers:
+                            info = headers[key] = _frame_info(*key)
+                    if info is not None and not synced:
+                        # After a gap (or at the start) a header only counts if
+                        # another one follows it, so stray 0xFF bytes are skipped.
+                        following = position + info[0]
+                        synced = following + 2 > size or (
+                            data[following] == 0xFF
+                            and data[following + 1] & 0xE0 == 0xE0
+                        )
+                        if synced and not offsets and _is_info_frame(
+                            data, position, info[0]
+                        ):
+                            position = following
+                            continue
+                    if info is None or not synced:
+                        synced = False
+                        position = data.find(b"\xff", position + 1)
+                        if position < 0:
+                            break
+                        continue
+                    length, samples, sample_rate = info
+                    if position + length > size:
+                        break
+                    offsets.append(position)
+                    sample_starts.append(total_samples)
+                    total_samples += samples
+                    position += length
+        if not offsets:
+            raise ValueError(f"No MP3 frames found in {path}.")
+        return cls(offsets, sample_starts, sample_rate, total_samples)
+
+    def save(self, path):
+        """Writes the index as a JSON header line followed by the raw arrays."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = {
+            "version": SEEK_INDEX_VERSION,
+            "frames": len(self.offsets),
+            "sample_rate": self.sample_rate,
+            "total_samples": self.total_samples,
+            "itemsize": self.offsets.itemsize,
+        }
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            self.offsets.tofile(f)
+            self.sample_starts.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save(), or returns None if it is unusable."""
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                if (
+                    header.get("version") != SEEK_INDEX_VERSION
+                    or header.get("itemsize") != array("q").itemsize
+                ):
+                    return None
+                offsets = array("q")
+                sample_starts = array("q")
+                offsets.fromfile(f, header["frames"])
+                sample_starts.fromfile(f, header["frames"])
+        except (OSError, ValueError, EOFError):
+            return None
+        return cls(offsets, sample_starts, header["sample_rate"], header["total_samples"])
+
+
+def _cache_key(path):
+    # Hashing hours of audio would cost more than indexing it, so the key is the
+    # file's identity (path, size and mtime) rather than its content.
+    stat = os.stat(path)
+    identity = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def load_seek_index(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the seek index of an MP3 file, from the on-disk cache when possible.
+
+    Args:
+        path (str): Path to the MP3 file.
+        cache_dir (str, optional): Cache directory, or None to disable caching.
+
+    Returns:
+        Mp3SeekIndex: The index. Raises ValueError if the file has no MP3 frames.
+    """
+    if cache_dir is None:
+        return Mp3SeekIndex.build(path)
+
+    cache_path = os.path.join(cache_dir, f"{_cache_key(path)}.idx")
+    index = Mp3SeekIndex.load(cache_path)
+    if index is not None:
+        logging.info(f"Loaded MP3 seek index from cache ({len(index)} frames).")
+        return index
+
+    index = Mp3SeekIndex.build(path)
+    logging.info(
+        f"Built MP3 seek index: {len(index)} frames, {index.duration:.1f}s at {index.sample_rate} Hz."
+    )
+    try:
+        index.save(cache_path)
+    except OSError as e:
+        logging.warning(f"Could not write seek index cache {cache_path}: {e}")
+    return index
@@ -0,0 +1,480 @@
+"""
+Persistent store of chapter results and review state.
+
+Alignments, mismatches and each mismatch's review status are kept in an SQLite
+database, keyed by the content hashes of the chapter's manuscript, transcript and
+audio. Reopening a chapter that has not changed is then an indexed read instead
+of a fresh parse and alignment, and reviewers' Confirm/Ignore decisions survive
+restarts. The same database answers questions across the whole book.
+
+Usage:
+    python results_store.py --type delete --status unconfirmed --min-confidence 0.8
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from alignment import DEFAULT_ALIGNER
+
+DEFAULT_STORE_PATH = "review_results.db"
+TIMESTAMP_SUFFIX = "_timestamps.json"
+# Bump whenever tokenization, alignment or mismatch detection changes, so results
+# computed by older code are recomputed instead of reused.
+DETECTOR_VERSION = 1
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    manuscript_hash TEXT NOT NULL,
+    transcript_hash TEXT NOT NULL,
+    audio_hash TEXT NOT NULL,
+    aligner TEXT NOT NULL,
+    detector_version INTEGER NOT NULL,
+    manuscript_span TEXT,
+    match_span TEXT,
+    location TEXT,
+    opcodes TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (manuscript_hash, transcript_hash, audio_hash, aligner, detector_version)
+);
+CREATE INDEX IF NOT EXISTS chapters_name ON chapters (name, updated_at);
+CREATE TABLE IF NOT EXISTS mismatches (
+    id INTEGER PRIMARY KEY,
+    chapter_id INTEGER NOT NULL REFERENCES chapters (id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    manuscript_start INTEGER NOT NULL,
+    manuscript_end INTEGER NOT NULL,
+    transcript_start INTEGER NOT NULL,
+    transcript_end INTEGER NOT NULL,
+    start_time REAL,
+    confidence REAL NOT NULL,
+    manuscript_text TEXT NOT NULL,
+    narrated_text TEXT NOT NULL,
+    context TEXT,
+    tooltip_text TEXT,
+    status TEXT NOT NULL,
+    verification TEXT
+);
+CREATE INDEX IF NOT EXISTS mismatches_chapter
+    ON mismatches (chapter_id, type, manuscript_start, transcript_start);
+CREATE INDEX IF NOT EXISTS mismatches_type ON mismatches (type, status, confidence);
+CREATE INDEX IF NOT EXISTS mismatches_confidence ON mismatches (confidence);
+CREATE INDEX IF NOT EXISTS mismatches_start_time ON mismatches (chapter_id, start_time);
+"""
+
+_MISMATCH_COLUMNS = (
+    "type",
+    "manuscript_start",
+    "manuscript_end",
+    "transcript_start",
+    "transcript_end",
+    "start_time",
+    "confidence",
+    "manuscript_text",
+    "narrated_text",
+    "context",
+    "tooltip_text",
+    "status",
+    "verification",
+)
+
+
+def file_hash(path):
+    """Returns the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chapter_name(json_path):
+    """Returns the chapter name of a `<name>_timestamps.json` file."""
+    name = os.path.basename(json_path)
+    if name.endswith(TIMESTAMP_SUFFIX):
+        return name[: -len(TIMESTAMP_SUFFIX)]
+    return os.path.splitext(name)[0]
+
+
+def chapter_key(docx_path, json_path, audio_path=None, aligner=None, name=None):
+    """
+    Returns the key results are stored under: the chapter's name plus the content
+    hashes of its files and the aligner used.
+
+    Args:
+        docx_path (str): The manuscript DOCX.
+        json_path (str): The timestamp JSON.
+        audio_path (str, optional): The narration audio.
+        aligner (str or object, optional): The aligner, by name or instance.
+        name (str, optional): The chapter name. Defaults to the JSON's stem.
+    """
+    if aligner is None or isinstance(aligner, str):
+        aligner_name = aligner or DEFAULT_ALIGNER
+    else:
+        aligner_name = getattr(aligner, "name", type(aligner).__name__)
+    return {
+        "name": name or chapter_name(json_path),
+        "manuscript_hash": file_hash(docx_path),
+        "transcript_hash": file_hash(json_path),
+        "audio_hash": file_hash(audio_path) if audio_path else "",
+        "aligner": aligner_name,
+    }
+
+
+def _dump(value):
+    return json.dumps(value) if value is not None else None
+
+
+def _load(text):
+    return json.loads(text) if text is not None else None
+
+
+def _span(text):
+    value = _load(text)
+    return tuple(value) if value is not None else None
+
+
+def _mismatch_identity(mismatch):
+    return (
+        mismatch["type"],
+        *mismatch["manuscript_indices"],
+        *mismatch["transcript_indices"],
+    )
+
+
+class ResultsStore:
+    """
+    The SQLite database of chapter results.
+
+    One connection is shared by the threads of a process and serialized with a
+    lock. Only one process should write at a time; others (batch workers) open
+    the database read-only.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, read_only=False):
+        """
+        Args:
+            path (str): The database file, created if needed.
+            read_only (bool): Open an existing database for lookups only.
+        """
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only:
+            uri = f"file:{os.path.abspath(path)}?mode=ro"
+            self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        if read_only:
+            return
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(
+                    f"{path} has schema version {version}; expected {SCHEMA_VERSION}."
+                )
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _chapter_id(self, key):
+        row = self._connection.execute(
+            "SELECT id FROM chapters WHERE manuscript_hash = ? AND transcript_hash = ? "
+            "AND audio_hash = ? AND aligner = ? AND detector_version = ?",
+            (
+                key["manuscript_hash"],
+                key["transcript_hash"],
+                key["audio_hash"],
+                key["aligner"],
+                DETECTOR_VERSION,
+            ),
+        ).fetchone()
+        return row["id"] if row else None
+
+    def load_chapter(self, key):
+        """
+        Returns the stored results of a chapter, or None if there are none.
+
+        Returns:
+            dict: 'chapter_id', 'opcodes' (None if only mismatches were stored),
+                  'manuscript_span', 'match_span', 'location' and 'mismatches',
+                  in the form MismatchDetector produces them.
+        """
+        with self._lock, self._connection:
+            chapter_id = self._chapter_id(key)
+            if chapter_id is None:
+                return None
+            if not self.read_only:
+                # Reopening makes this the chapter's current version for query().
+                self._connection.execute(
+                    "UPDATE chapters SET name = ?, updated_at = ? WHERE id = ?",
+                    (key["name"], time.time(), chapter_id),
+                )
+            chapter = self._connection.execute(
+                "SELECT * FROM chapters WHERE id = ?", (chapter_id,)
+            ).fetchone()
+            rows = self._connection.execute(
+                "SELECT * FROM mismatches WHERE chapter_id = ? ORDER BY id",
+                (chapter_id,),
+            ).fetchall()
+        opcodes = _load(chapter["opcodes"])
+        return {
+            "chapter_id": chapter_id,
+            "opcodes": [tuple(op) for op in opcodes] if opcodes is not None else None,
+            "manuscript_span": _span(chapter["manuscript_span"]),
+            "match_span": _span(chapter["match_span"]),
+            "location": _load(chapter["location"]),
+            "mismatches": [self._row_to_mismatch(row) for row in rows],
+        }
+
+    def save_chapter(
+        self,
+        key,
+        mismatches,
+        opcodes=None,
+        manuscript_span=None,
+        match_span=None,
+        location=None,
+    ):
+        """
+        Stores a chapter's results, replacing any stored under the same key.
+
+        Review state already stored for an identical mismatch is kept unless the
+        new mismatch has been reviewed itself.
+
+        Returns:
+            int: The chapter's id, for set_status().
+        """
+        with self._lock, self._connection:
+            chapter_id = self._chapter_id(key)
+            previous = {}
+            if chapter_id is not None:
+                for row in self._connection.execute(
+                    "SELECT * FROM mismatches WHERE chapter_id = ?", (chapter_id,)
+                ):
+                    mismatch = self._row_to_mismatch(row)
+                    previous[_mismatch_identity(mismatch)] = mismatch
+                self._connection.execute(
+                    "DELETE FROM mismatches WHERE chapter_id = ?", (chapter_id,)
+                )
+                self._connection.execute(
+                    "UPDATE chapters SET name = ?, manuscript_span = ?, match_span = ?, "
+                    "location = ?, opcodes = ?, updated_at = ? WHERE id = ?",
+                    (
+                        key["name"],
+                        _dump(manuscript_span),
+                        _dump(match_span),
+                        _dump(location),
+                        _dump(opcodes),
+                        time.time(),
+                        chapter_id,
+                    ),
+                )
+            else:
+                chapter_id = self._connection.execute(
+                    "INSERT INTO chapters (name, manuscript_hash, transcript_hash, "
+                    "audio_hash, aligner, detector_version, manuscript_span, "
+                    "match_span, location, opcodes, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key["name"],
+                        key["manuscript_hash"],
+                        key["transcript_hash"],
+                        key["audio_hash"],
+                        key["aligner"],
+                        DETECTOR_VERSION,
+                        _dump(manuscript_span),
+                        _dump(match_span),
+                        _dump(location),
+                        _dump(opcodes),
+                        time.time(),
+                    ),
+                ).lastrowid
+            rows = []
+            for mismatch in mismatches:
+                stored = previous.get(_mismatch_identity(mismatch))
+                if stored is not None and mismatch["status"] == "unconfirmed":
+                    mismatch["status"] = stored["status"]
+                    if "verification" not in mismatch and "verification" in stored:
+                        mismatch["verification"] = stored["verification"]
+                rows.append((chapter_id,) + self._mismatch_values(mismatch))
+            self._connection.executemany(
+                f"INSERT INTO mismatches (chapter_id, {', '.join(_MISMATCH_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_MISMATCH_COLUMNS) + 1))})",
+                rows,
+            )
+        return chapter_id
+
+    def set_status(self, chapter_id, mismatch):
+        """Saves the review status of one mismatch of a stored chapter."""
+        mismatch_type, i1, i2, j1, j2 = _mismatch_identity(mismatch)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE mismatches SET status = ? WHERE chapter_id = ? AND type = ? "
+                "AND manuscript_start = ? AND manuscript_end = ? "
+                "AND transcript_start = ? AND transcript_end = ?",
+                (mismatch["status"], chapter_id, mismatch_type, i1, i2, j1, j2),
+            )
+
+    def query(
+        self,
+        mismatch_type=None,
+        status=None,
+        min_confidence=None,
+        max_confidence=None,
+        chapter=None,
+        latest_only=True,
+    ):
+        """
+        Finds mismatches across all stored chapters.
+
+        Args:
+            mismatch_type (str, optional): 'replace', 'delete' or 'insert'.
+            status (str, optional): 'unconfirmed', 'confirmed' or 'ignored'.
+            min_confidence (float, optional): Lowest confidence to include.
+            max_confidence (float, optional): Highest confidence to include.
+            chapter (str, optional): Only this chapter.
+            latest_only (bool): Only the most recently opened version of each
+                                chapter, ignoring results of replaced recordings.
+
+        Returns:
+            list: Mismatch dicts with an extra 'chapter' name, ordered by chapter
+                  and start time.
+        """
+        conditions = []
+        parameters = []
+        for column, operator, value in (
+            ("m.type", "=", mismatch_type),
+            ("m.status", "=", status),
+            ("m.confidence", ">=", min_confidence),
+            ("m.confidence", "<=", max_confidence),
+            ("c.name", "=", chapter),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(value)
+        if latest_only:
+            conditions.append(
+                "c.updated_at = (SELECT MAX(updated_at) FROM chapters WHERE name = c.name)"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT m.*, c.name AS chapter FROM mismatches m "
+                f"JOIN chapters c ON c.id = m.chapter_id {where} "
+                "ORDER BY c.name, m.start_time",
+                parameters,
+            ).fetchall()
+        results = []
+        for row in rows:
+            mismatch = self._row_to_mismatch(row)
+            mismatch["chapter"] = row["chapter"]
+            results.append(mismatch)
+        return results
+
+    @staticmethod
+    def _mismatch_values(mismatch):
+        i1, i2 = mismatch["manuscript_indices"]
+        j1, j2 = mismatch["transcript_indices"]
+        return (
+            mismatch["type"],
+            i1,
+            i2,
+            j1,
+            j2,
+            mismatch["start_time"],
+            mismatch["confidence"],
+            mismatch["manuscript_text"],
+            mismatch["narrated_text"],
+            mismatch.get("context"),
+            mismatch.get("tooltip_text"),
+            mismatch["status"],
+            _dump(mismatch.get("verification")),
+        )
+
+    @staticmethod
+    def _row_to_mismatch(row):
+        mismatch = {
+            "type": row["type"],
+            "manuscript_text": row["manuscript_text"],
+            "narrated_text": row["narrated_text"],
+            "start_time": row["start_time"],
+            "confidence": row["confidence"],
+            "manuscript_indices": (row["manuscript_start"], row["manuscript_end"]),
+            "transcript_indices": (row["transcript_start"], row["transcript_end"]),
+            "status": row["status"],
+            "context": row["context"],
+            "tooltip_text": row["tooltip_text"],
+        }
+        if row["verification"] is not None:
+            mismatch["verification"] = _load(row["verification"])
+        return mismatch
+
+
+_QUERY_FIELDS = [
+    "chapter",
+    "type",
+    "start_time",
+    "confidence",
+    "status",
+    "manuscript_text",
+    "narrated_text",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Query stored mismatches across all reviewed chapters."
+    )
+    parser.add_argument(
+        "--db", default=DEFAULT_STORE_PATH, help="The results database."
+    )
+    parser.add_argument("--type", choices=("replace", "delete", "insert"))
+    parser.add_argument("--status", choices=("unconfirmed", "confirmed", "ignored"))
+    parser.add_argument("--min-confidence", type=float, default=None)
+    parser.add_argument("--max-confidence", type=float, default=None)
+    parser.add_argument("--chapter", default=None)
+    parser.add_argument(
+        "--all-versions",
+        action="store_true",
+        help="Include results of older recordings of a chapter.",
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No results database at {args.db}.", file=sys.stderr)
+        return 1
+    store = ResultsStore(args.db)
+    mismatches = store.query(
+        mismatch_type=args.type,
+        status=args.status,
+        min_confidence=args.min_confidence,
+        max_confidence=args.max_confidence,
+        chapter=args.chapter,
+        latest_only=not args.all_versions,
+    )
+    store.close()
+    writer = csv.DictWriter(sys.stdout, fieldnames=_QUERY_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(mismatches)
+    print(f"{len(mismatches)} mismatches.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,56 +1,144 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import json
-import docx
 import pygame
-import difflib
 import csv
 import os
 import threading
 import time
 import logging
-import re
 import argparse
-from mismatch_detector import MismatchDetector
+import bisect
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import loader
+from alignment import ALIGNERS, DEFAULT_ALIGNER
+from audio_envelope import analyze, envelope_path_for, load_envelope, snap_word_starts
+from audio_engine import AudioEngine
+from instrumentation import Metrics, Profiler
+from manuscript_view import ManuscriptView
+from mismatch_index import MismatchIndex, MismatchView
+from results_store import DEFAULT_STORE_PATH, ResultsStore, file_hash
+from virtual_list import VirtualList
+from word_store import TokenStore, WordStore, load_word_store
 
 # --- Setup Logging ---
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
     filename="review_app.log",
-    filemode="w",
+    filemode="a",
 )
-logging.info("Application starting up.")
+logging.info("=" * 20 + " Application starting up. " + "=" * 20)
 
-
-def normalize_word(word):
-    return word.lower().strip(".,;:!?\"'()[]{} ")
+# Karaoke highlighter timing: ticks are scheduled for the next word boundary,
+# clamped to this range, and each tick should cost less than one frame.
+MIN_HIGHLIGHT_TICK_MS = 15
+MAX_HIGHLIGHT_TICK_MS = 100
+HIGHLIGHT_FRAME_BUDGET = 1 / 60
+DEFAULT_METRICS_PATH = "review_metrics.jsonl"
+# Slider motion is coalesced into one highlight update after this pause.
+THRESHOLD_DEBOUNCE_MS = 120
+# Mismatch navigation (F8 / Shift+F8): the types each "Jump to" choice steps
+# through, and how far playback may drift from the mismatch last jumped to before
+# the next jump starts from the playback position instead.
+NAVIGATION_TYPES = {
+    "All": None,
+    "Substitutions": ("replace",),
+    "Deletions": ("delete",),
+    "Insertions": ("insert",),
+}
+NAVIGATION_TOLERANCE = 1.0
+INSERTION_LIST_ROWS = 12
+# How often the background loader's message queue is drained, and the loader
+# messages that advance the progress bar.
+LOADER_POLL_MS = 50
+LOAD_STAGES = (loader.MANUSCRIPT, loader.TRANSCRIPT, loader.ALIGNMENT, loader.DONE)
+# How often a running audio analysis (see audio_envelope) is checked for results.
+ANALYSIS_POLL_MS = 200
+AUDIO_ISSUE_NAMES = (
+    ("dead_air", "dead air"),
+    ("clipping", "clipping"),
+    ("mouth_noise", "mouth noise"),
+)
 
 
 class AudiobookReviewApp:
-    def __init__(self, root, docx_path=None, json_path=None, audio_path=None):
+    def __init__(
+        self,
+        root,
+        docx_path=None,
+        json_path=None,
+        audio_path=None,
+        aligner=None,
+        metrics_path=DEFAULT_METRICS_PATH,
+        profiler=None,
+        store_path=DEFAULT_STORE_PATH,
+    ):
         self.root = root
         self.root.title("Audiobook Narrator Review Tool")
         self.root.geometry("1000x700")
 
         pygame.init()
         pygame.mixer.init()
+        self.audio = AudioEngine()
 
         self.initial_docx_path = docx_path
         self.initial_json_path = json_path
         self.initial_audio_path = audio_path
+        self.aligner = aligner
+        # Stage timings and hot-path histograms, appended to metrics_path on exit.
+        self.metrics = Metrics()
+        self.metrics.histogram(
+            "highlight_tick", budget_ms=HIGHLIGHT_FRAME_BUDGET * 1000
+        )
+        self.metrics_path = metrics_path
+        self.profiler = profiler
+        # Results and review status of every opened chapter, so reopening one is
+        # a lookup and Confirm/Ignore decisions survive restarts.
+        self.store = None
+        if store_path:
+            try:
+                self.store = ResultsStore(store_path)
+            except (sqlite3.Error, ValueError) as e:
+                logging.warning(f"Results store {store_path} unavailable: {e}")
+        self.chapter_key = None
+        self.chapter_id = None
 
         self.audio_file_path = None
-        self.transcribed_data = []
+        self.transcribed_data = WordStore()
         self.is_playing = False
-        self.playback_offset = 0
         self.full_manuscript_text = ""
-        self.manuscript_tokens = []
+        self.manuscript_tokens = TokenStore()
+        self.alignment = None
+        self.detector = None
         self.word_map = {}
-        self.tk_index_map = {}
         self.last_highlighted_word_index = -1
+        self.current_word_range = None
         self.after_id = None
         self.mismatches = []
+        self.highlightable_mismatches = []
+        self.mismatches_by_confidence = []
+        self.sorted_confidences = []
+        self.mismatch_index = None
+        self.current_mismatch = None
+        self.listed_insertions = MismatchView([])
+        self.applied_threshold = None
+        self.threshold_after_id = None
+        self.file_loader = None
+        self.loader_after_id = None
+        self.pending_audio_path = None
+        self.pending_seek_index = None
+        self.lock_after_load = False
+        # The audio envelope is built (or read from its cache) and analysed on a
+        # worker thread once the chapter is loaded; see _start_audio_analysis().
+        self.analysis_pool = ThreadPoolExecutor(max_workers=1)
+        self.analysis_future = None
+        self.analysis_after_id = None
+        self.audio_issues = []
+        # Word starts snapped to speech onsets. Only seeking and highlighting use
+        # them; the transcript and mismatches keep Whisper's times.
+        self.playback_starts = None
 
         self._setup_ui()
 
@@ -66,6 +154,21 @@ class AudiobookReviewApp:
             top_frame, text="Load Files...", command=self.load_files
         )
         self.load_button.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(
+            top_frame, text="Cancel", command=self.cancel_loading, state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=(5, 0))
+        self.pickups_button = ttk.Button(
+            top_frame,
+            text="Apply Pickups...",
+            command=self.apply_pickups,
+            state=tk.DISABLED,
+        )
+        self.pickups_button.pack(side=tk.LEFT, padx=(5, 0))
+        self.progress_bar = ttk.Progressbar(
+            top_frame, length=120, maximum=len(LOAD_STAGES), mode="determinate"
+        )
+        self.progress_bar.pack(side=tk.RIGHT)
         self.loaded_files_label = ttk.Label(
             top_frame, text="Please load Manuscript, JSON, and Audio files."
         )
@@ -73,19 +176,18 @@ class AudiobookReviewApp:
 
         text_frame = ttk.Frame(self.root, padding="10")
         text_frame.pack(expand=True, fill=tk.BOTH)
-        self.text_widget = tk.Text(
+        # Only a window of the manuscript is materialized in the Text widget; all
+        # positions passed to the view are global character offsets.
+        self.view = ManuscriptView(
             text_frame,
             wrap=tk.WORD,
             font=("Helvetica", 14),
             spacing1=5,
             spacing3=10,
-            undo=True,
         )
+        self.text_widget = self.view.text
         self.text_widget.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
-
-        scrollbar = ttk.Scrollbar(text_frame, command=self.text_widget.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.text_widget.config(yscrollcommand=scrollbar.set)
+        self.view.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.text_widget.tag_configure("current_word", background="lightblue")
         self.text_widget.tag_configure(
@@ -98,6 +200,7 @@ class AudiobookReviewApp:
         # --- CHANGE: Remapped timestamp feature to Ctrl+Click to resolve conflict ---
         self.text_widget.bind("<Control-Button-1>", self.show_timestamp_info)
         self.text_widget.bind("<Double-Button-1>", self.double_click_to_seek)
+        self.text_widget.bind("<Button-3>", self.show_mismatch_menu)
 
         ### --- NEW: Right panel with sensitivity slider ---
         right_panel = ttk.Frame(self.root, width=200, padding="10")
@@ -111,12 +214,65 @@ class AudiobookReviewApp:
             from_=0,
             to=100,
             orient=tk.HORIZONTAL,
-            # ### CHANGE: The command now calls our new function ###
-            command=lambda event: self._apply_mismatch_highlights(),
+            command=self._on_threshold_change,
         )
         self.sensitivity_slider.set(70)  # Default to 70% confidence
         self.sensitivity_slider.pack(fill=tk.X, pady=5, anchor="n")
 
+        ttk.Label(right_panel, text="Jump to:", font=("Helvetica", 10, "bold")).pack(
+            pady=(10, 5), anchor="w"
+        )
+        self.navigation_type = tk.StringVar(value="All")
+        ttk.Combobox(
+            right_panel,
+            textvariable=self.navigation_type,
+            values=list(NAVIGATION_TYPES),
+            state="readonly",
+        ).pack(fill=tk.X)
+        navigation_frame = ttk.Frame(right_panel)
+        navigation_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(
+            navigation_frame,
+            text="◀ Previous",
+            command=lambda: self.jump_to_mismatch(-1),
+        ).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(
+            navigation_frame, text="Next ▶", command=lambda: self.jump_to_mismatch(1)
+        ).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.navigation_label = ttk.Label(right_panel, text="", wraplength=260)
+        self.navigation_label.pack(fill=tk.X, anchor="w")
+        self.root.bind("<F8>", lambda event: self.jump_to_mismatch(1))
+        self.root.bind("<Shift-F8>", lambda event: self.jump_to_mismatch(-1))
+
+        # Insertions have no manuscript text to highlight, so they are listed
+        # here instead. Only the visible rows exist as widgets.
+        ttk.Label(right_panel, text="Insertions:", font=("Helvetica", 10, "bold")).pack(
+            pady=(10, 5), anchor="w"
+        )
+        insertion_frame = ttk.Frame(right_panel)
+        insertion_frame.pack(expand=True, fill=tk.BOTH)
+        self.insertion_list = VirtualList(
+            insertion_frame,
+            columns=[
+                ("time", "Time", 90),
+                ("confidence", "Conf.", 50),
+                ("status", "Status", 80),
+                ("narrated", "Narrated", 120),
+            ],
+            row_values=self._insertion_row,
+            height=INSERTION_LIST_ROWS,
+            on_activate=lambda index: self.show_mismatch(self.listed_insertions[index]),
+            on_menu=lambda index, x, y: self._popup_mismatch_menu(
+                self.listed_insertions[index], x, y
+            ),
+        )
+        self.insertion_list.tree.pack(expand=True, fill=tk.BOTH, side=tk.LEFT)
+        self.insertion_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.audio_issues_label = ttk.Label(
+            right_panel, text="", wraplength=250, justify=tk.LEFT
+        )
+        self.audio_issues_label.pack(fill=tk.X, anchor="w", pady=(5, 0))
+
         control_frame = ttk.Frame(self.root, padding="10")
         control_frame.pack(fill=tk.X)
         self.play_pause_button = ttk.Button(
@@ -131,37 +287,39 @@ class AudiobookReviewApp:
         )
 
     def fast_forward(self, seconds=15.0):
-        current_pos = (pygame.mixer.music.get_pos() / 1000.0) + self.playback_offset
+        current_pos = self.audio.position()
         new_start = current_pos + seconds
         logging.info(f"Fast-forwarding from {current_pos:.2f}s to {new_start:.2f}s.")
         self.seek_to(new_start)
 
     def double_click_to_seek(self, event):
         logging.info("Double-click detected, attempting to seek.")
-        click_index = self.text_widget.index(f"@{event.x},{event.y}")
-        word_start_index = self.text_widget.index(f"{click_index} wordstart")
-        whisper_idx = self.tk_index_map.get(word_start_index)
+        click_offset = self.view.offset_at(event.x, event.y)
+        whisper_idx = self._whisper_index_at(click_offset)
         if whisper_idx is not None:
-            start_time = self.transcribed_data[whisper_idx]["start"]
+            start_time = self._word_start(whisper_idx)
             logging.info(
-                f"User double-clicked word '{self.transcribed_data[whisper_idx]['word']}', seeking to {start_time:.2f}s"
+                f"User double-clicked word '{self.transcribed_data.words[whisper_idx]}', seeking to {start_time:.2f}s"
             )
             self.seek_to(start_time)
         else:
             logging.warning(
-                f"Could not find a mapped timestamp for the word at {word_start_index}."
+                f"Could not find a mapped timestamp for the word at offset {click_offset}."
             )
 
     def rewind(self, seconds=5.0):
-        current_pos = (pygame.mixer.music.get_pos() / 1000.0) + self.playback_offset
+        current_pos = self.audio.position()
         new_start = max(0, current_pos - seconds)
         logging.info(f"Rewinding from {current_pos:.2f}s to {new_start:.2f}s.")
         self.seek_to(new_start)
 
     def seek_to(self, time_in_seconds):
+        if self.file_loader is not None:
+            return
+        seek_start = time.perf_counter()
         self.reset_highlighter_state()
-        pygame.mixer.music.play(start=time_in_seconds)
-        self.playback_offset = time_in_seconds
+        self.audio.play(start=time_in_seconds)
+        self.metrics.observe("seek", time.perf_counter() - seek_start)
         if not self.is_playing:
             self.is_playing = True
             self.play_pause_button.config(text="⏸ Pause")
@@ -170,25 +328,13 @@ class AudiobookReviewApp:
     def _auto_load_files(self):
         logging.info("CLI arguments provided. Attempting to auto-load files.")
         self.loaded_files_label.config(text="Auto-loading files from command line...")
-        self.root.update()
-        try:
-            self.audio_file_path = self.initial_audio_path
-            self._process_files(
-                self.initial_docx_path, self.initial_json_path, self.initial_audio_path
-            )
-            self.loaded_files_label.config(
-                text=f"Ready to review: {os.path.basename(self.initial_docx_path)}"
-            )
-            self.load_button.config(state=tk.DISABLED)
-        except Exception as e:
-            logging.error(f"Failed to auto-load files from CLI: {e}", exc_info=True)
-            messagebox.showerror(
-                "Auto-load Error",
-                f"Failed to load files from command line: {e}\n\nPlease use the 'Load Files...' button manually.\nSee review_app.log for details.",
-            )
-            self.loaded_files_label.config(
-                text="Auto-load failed. Please load files manually."
-            )
+        self.audio_file_path = self.initial_audio_path
+        self._process_files(
+            self.initial_docx_path,
+            self.initial_json_path,
+            self.initial_audio_path,
+            lock_after_load=True,
+        )
 
     def load_files(self):
         docx_path = filedialog.askopenfilename(
@@ -208,98 +354,346 @@ class AudiobookReviewApp:
         if not self.audio_file_path:
             return
         self.loaded_files_label.config(text="Files loaded. Processing...")
-        self.root.update()
         self._process_files(docx_path, json_path, self.audio_file_path)
 
-    def _process_files(self, docx_path, json_path, audio_path):
-        try:
-            logging.info(f"Processing DOCX: {docx_path}")
-            self._parse_docx(docx_path)
-            logging.info(f"Processing JSON: {json_path}")
-            self._parse_json(json_path)
-            # Create the detector and find mismatches
-            detector = MismatchDetector(
-                self.manuscript_tokens, self.transcribed_data, self.full_manuscript_text
-            )
-            self.mismatches = (
-                detector.find_mismatches()
-            )  # This will be our new list of mismatch objects
+    def _process_files(self, docx_path, json_path, audio_path, lock_after_load=False):
+        """
+        Starts loading a chapter on a background thread. The window stays
+        responsive; _poll_loader() applies each stage as it completes.
+
+        Args:
+            lock_after_load (bool): Disable "Load Files..." once the load succeeds,
+                                    as for files given on the command line.
+        """
+        self.cancel_loading()
+        self._stop_playback()
+        self._reset_loaded_state()
+        logging.info(f"Processing DOCX: {docx_path}")
+        logging.info(f"Processing JSON: {json_path}")
+        self.pending_audio_path = audio_path
+        self.pending_seek_index = None
+        self.lock_after_load = lock_after_load
+        self.file_loader = loader.FileLoader(
+            docx_path,
+            json_path,
+            aligner=self.aligner,
+            metrics=self.metrics,
+            profiler=self.profiler,
+            audio_path=audio_path,
+            store=self.store,
+        )
+        self.load_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0)
+        self.file_loader.start()
+        self.loader_after_id = self.root.after(LOADER_POLL_MS, self._poll_loader)
+
+    def cancel_loading(self):
+        """Cancels a load in progress; its remaining results are discarded."""
+        if self.file_loader is None:
+            return
+        self.file_loader.cancel()
+        self._finish_loading()
+        self.loaded_files_label.config(text="Loading cancelled.")
+
+    def _poll_loader(self):
+        self.loader_after_id = None
+        file_loader = self.file_loader
+        if file_loader is None:
+            return
+        while True:
+            try:
+                kind, payload = file_loader.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind in LOAD_STAGES:
+                self.progress_bar.config(value=LOAD_STAGES.index(kind) + 1)
+            if not self._handle_load_message(kind, payload):
+                self._finish_loading()
+                return
+        self.loader_after_id = self.root.after(LOADER_POLL_MS, self._poll_loader)
+
+    def _handle_load_message(self, kind, payload):
+        """
+        Applies one message from the background loader.
 
-            # The rest of the processing continues...
+        Returns:
+            bool: False once the load has finished, failed or been cancelled.
+        """
+        if kind == loader.PROGRESS:
+            self.loaded_files_label.config(text=payload)
+        elif kind == loader.MANUSCRIPT:
+            # Show the text right away; highlights follow after alignment.
+            self.full_manuscript_text, self.manuscript_tokens = payload
             self.display_full_text()
-            # The _create_word_map() for the karaoke highlighter is still needed and separate.
+        elif kind == loader.TRANSCRIPT:
+            self.transcribed_data = payload
+        elif kind == loader.ALIGNMENT:
+            self.detector, self.alignment, self.mismatches = payload
+            self.chapter_key = self.file_loader.chapter_key
+            self.chapter_id = self.file_loader.chapter_id
             self._create_word_map()
-            # We will then add a new function to apply the visual highlights
             self._apply_mismatch_highlights()
+            if self.detector.manuscript_span is not None:
+                # A whole-book manuscript: open it at the located chapter.
+                span_start = self.detector.manuscript_span[0]
+                self.view.see(self.manuscript_tokens.start[span_start])
+            self.pickups_button.config(state=tk.NORMAL)
+        elif kind == loader.SEEK_INDEX:
+            self.pending_seek_index = payload
+        elif kind == loader.DONE:
+            docx_path = self.file_loader.docx_path
+            json_path = self.file_loader.json_path
+            self._finish_loading()
+            if self._load_audio(docx_path, payload):
+                self._start_audio_analysis(self.pending_audio_path, json_path)
+            return False
+        elif kind == loader.ERROR:
+            messagebox.showerror(
+                "Error",
+                f"Failed to process files: {payload}\n\nSee review_app.log for details.",
+            )
+            self.loaded_files_label.config(
+                text="Loading failed. Please load files manually."
+            )
+            return False
+        elif kind == loader.CANCELLED:
+            self.loaded_files_label.config(text="Loading cancelled.")
+            return False
+        return True
+
+    def _load_audio(self, docx_path, load_seconds):
+        # pygame's mixer is only used from the main thread.
+        audio_path = self.pending_audio_path
+        try:
             logging.info(f"Loading audio: {audio_path}")
-            pygame.mixer.music.load(audio_path)
-            logging.info("Processing complete. Ready for playback.")
+            with self.metrics.stage("audio_load"):
+                self.audio.load(audio_path, seek_index=self.pending_seek_index)
         except Exception as e:
-            logging.error(f"Failed during file processing: {e}", exc_info=True)
+            logging.error(f"Failed to load audio: {e}", exc_info=True)
             messagebox.showerror(
                 "Error",
-                f"Failed to process files: {e}\n\nSee review_app.log for details.",
+                f"Failed to load audio: {e}\n\nSee review_app.log for details.",
             )
+            self.loaded_files_label.config(text="Audio could not be loaded.")
+            return False
+        logging.info(f"Processing complete in {load_seconds:.2f}s. Ready for playback.")
+        self.loaded_files_label.config(
+            text=f"Ready to review: {os.path.basename(docx_path)}"
+        )
+        if self.lock_after_load:
+            self.load_button.config(state=tk.DISABLED)
+        return True
 
-    def _parse_docx(self, path):
-        logging.info("Starting advanced DOCX parsing (including tables).")
-        doc = docx.Document(path)
-        all_text_blocks = []
-        for block in doc._body._element.iterchildren():
-            if isinstance(block, docx.oxml.text.paragraph.CT_P):
-                para = docx.text.paragraph.Paragraph(block, doc._body)
-                if para.text.strip():
-                    all_text_blocks.append(para.text)
-            elif isinstance(block, docx.oxml.table.CT_Tbl):
-                logging.info("Found a table in the document. Extracting cell text.")
-                table = docx.table.Table(block, doc._body)
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            all_text_blocks.append(cell.text)
-        self.full_manuscript_text = "\n\n".join(all_text_blocks)
-        self.manuscript_tokens = []
-        for match in re.finditer(r"\b\w+\b", self.full_manuscript_text):
-            self.manuscript_tokens.append(
-                {"word": match.group(0), "start": match.start(), "end": match.end()}
-            )
-        logging.info(
-            f"Advanced parse complete. Parsed {len(all_text_blocks)} total text blocks and {len(self.manuscript_tokens)} word tokens from DOCX."
+    def _start_audio_analysis(self, audio_path, json_path):
+        """
+        Checks the chapter's audio for dead air, clipping and mouth noise, and
+        snaps word starts to the speech onsets, on a worker thread.
+
+        The envelope is cached next to the timestamp JSON, so only the first
+        opening of a recording pays for decoding it. Reviewing can start right
+        away; _poll_audio_analysis() applies the results when they are ready.
+        """
+        self._cancel_audio_analysis()
+        self.audio_issues_label.config(text="Audio: analysing...")
+        self.analysis_future = self.analysis_pool.submit(
+            self._analyze_audio, audio_path, json_path, self.transcribed_data
+        )
+        self.analysis_after_id = self.root.after(
+            ANALYSIS_POLL_MS, self._poll_audio_analysis
         )
 
-    def _parse_json(self, path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.transcribed_data = data["words"]
-        logging.info(
-            f"Loaded {len(self.transcribed_data)} transcribed words from JSON."
+    def _analyze_audio(self, audio_path, json_path, words):
+        # Runs on the worker thread; only reads `words`. Nothing reads the
+        # envelope afterwards, so it is unmapped here, whether or not the result
+        # is still wanted.
+        with self.metrics.stage("audio_envelope"):
+            envelope = load_envelope(audio_path, envelope_path_for(json_path))
+        try:
+            with self.metrics.stage("audio_analysis"):
+                issues = analyze(envelope, words)
+                starts, moved = snap_word_starts(envelope, words)
+        finally:
+            envelope.close()
+        return words, issues, starts, moved
+
+    def _poll_audio_analysis(self):
+        self.analysis_after_id = None
+        future = self.analysis_future
+        if future is None:
+            return
+        if not future.done():
+            self.analysis_after_id = self.root.after(
+                ANALYSIS_POLL_MS, self._poll_audio_analysis
+            )
+            return
+        self.analysis_future = None
+        try:
+            words, issues, starts, moved = future.result()
+        except Exception as e:
+            # ffmpeg or numpy missing, or an undecodable file: review without it.
+            logging.warning(f"Audio analysis skipped: {e}")
+            self.audio_issues_label.config(text="Audio checks unavailable.")
+            return
+        if words is not self.transcribed_data:
+            # Pickups replaced the words while the analysis ran.
+            return
+        self.audio_issues = issues
+        self._apply_snapped_starts(starts, moved)
+        for issue in issues:
+            logging.info(
+                f"Audio issue: {issue['type']} at {issue['start']:.2f}-{issue['end']:.2f}s"
+            )
+        counts = [
+            f"{sum(1 for issue in issues if issue['type'] == kind)} {name}"
+            for kind, name in AUDIO_ISSUE_NAMES
+        ]
+        self.audio_issues_label.config(text="Audio: " + ", ".join(counts))
+
+    def _apply_snapped_starts(self, starts, moved):
+        """Seeks and highlights with the snapped word starts from now on."""
+        self.playback_starts = starts
+        logging.info(f"Snapped {moved} word starts to speech onsets.")
+
+    def _word_start(self, whisper_idx):
+        """Returns where playback of a transcribed word starts."""
+        if self.playback_starts is not None:
+            return self.playback_starts[whisper_idx]
+        return self.transcribed_data.start[whisper_idx]
+
+    def _mismatch_start(self, mismatch):
+        """Returns where playback of a mismatch starts."""
+        j1, j2 = mismatch["transcript_indices"]
+        if self.playback_starts is not None and j2 > j1:
+            return self.playback_starts[j1]
+        return mismatch["start_time"] or 0.0
+
+    def _cancel_audio_analysis(self):
+        # A running analysis finishes on its own; its result is dropped.
+        if self.analysis_after_id:
+            self.root.after_cancel(self.analysis_after_id)
+            self.analysis_after_id = None
+        if self.analysis_future is not None:
+            self.analysis_future.cancel()
+            self.analysis_future = None
+        self.audio_issues = []
+        self.playback_starts = None
+        self.audio_issues_label.config(text="")
+
+    def _finish_loading(self):
+        if self.loader_after_id:
+            self.root.after_cancel(self.loader_after_id)
+            self.loader_after_id = None
+        if self.file_loader is not None:
+            self.load_button.config(state=tk.NORMAL)
+        self.file_loader = None
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def _stop_playback(self):
+        if self.is_playing:
+            self.toggle_play_pause()
+        self.audio.stop()
+        self.reset_highlighter_state()
+
+    def _reset_loaded_state(self):
+        """Forgets the previous chapter so nothing acts on half-loaded data."""
+        self.alignment = None
+        self.detector = None
+        self.chapter_key = None
+        self.chapter_id = None
+        self.pickups_button.config(state=tk.DISABLED)
+        self.word_map = {}
+        self.mismatches = []
+        self.highlightable_mismatches = []
+        self.mismatches_by_confidence = []
+        self.sorted_confidences = []
+        self.mismatch_index = None
+        self.current_mismatch = None
+        self._refresh_insertion_list()
+        self.applied_threshold = None
+        self._cancel_audio_analysis()
+        # A transcript opened from a binary timestamp file keeps it mapped.
+        self.transcribed_data.close()
+        self.transcribed_data = WordStore()
+
+    def apply_pickups(self):
+        """
+        Re-validates the loaded chapter against the transcription of a patched
+        recording (pickups or a partial re-record). Only the changed region is
+        re-aligned, and unchanged mismatches keep their Confirm/Ignore status.
+        """
+        if self.detector is None or self.file_loader is not None:
+            return
+        json_path = filedialog.askopenfilename(
+            title="1. Select the new Timestamp JSON file",
+            filetypes=[("JSON file", "*.json")],
+        )
+        if not json_path:
+            return
+        audio_path = filedialog.askopenfilename(
+            title="2. Select the new Audio MP3 file (Cancel keeps the current audio)",
+            filetypes=[("MP3 Audio", "*.mp3")],
         )
+        self._stop_playback()
+        try:
+            logging.info(f"Applying pickups from {json_path}")
+            with self.metrics.stage("parse_json"):
+                new_data = load_word_store(json_path)
+            with self.metrics.stage("revalidate"):
+                self.mismatches = self.detector.revalidate(new_data, self.mismatches)
+            if self.transcribed_data is not self.detector.transcribed_data:
+                self.transcribed_data.close()
+            self.transcribed_data = self.detector.transcribed_data
+            self.alignment = self.detector.alignment
+            if audio_path:
+                logging.info(f"Loading audio: {audio_path}")
+                with self.metrics.stage("audio_load"):
+                    self.audio.load(audio_path)
+                self.audio_file_path = audio_path
+            self._save_pickups(json_path, audio_path)
+        except Exception as e:
+            logging.error(f"Failed to apply pickups: {e}", exc_info=True)
+            messagebox.showerror(
+                "Error",
+                f"Failed to apply pickups: {e}\n\nSee review_app.log for details.",
+            )
+            return
+        self._create_word_map()
+        self._apply_mismatch_highlights()
+        self.loaded_files_label.config(
+            text=f"Pickups applied: {os.path.basename(json_path)}"
+        )
+        # The new timestamps need their own snapping, and new audio its own checks.
+        self._start_audio_analysis(self.audio_file_path, json_path)
+
+    def _save_pickups(self, json_path, audio_path):
+        """Stores the re-validated results under the patched recording's hashes."""
+        if self.store is None or self.chapter_key is None:
+            return
+        key = dict(self.chapter_key, transcript_hash=file_hash(json_path))
+        if audio_path:
+            key["audio_hash"] = file_hash(audio_path)
+        try:
+            with self.metrics.stage("store_save"):
+                self.chapter_id = self.store.save_chapter(
+                    key,
+                    self.mismatches,
+                    opcodes=self.alignment.opcodes,
+                    manuscript_span=self.detector.manuscript_span,
+                    match_span=self.detector.match_span,
+                    location=self.detector.location,
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"Could not save results to the results store: {e}")
+            return
+        self.chapter_key = key
 
     def _create_word_map(self):
-        logging.info("Starting alignment to create word map.")
-        self.word_map = {}
-        self.tk_index_map = {}
-        manuscript_normalized = [
-            normalize_word(token["word"]) for token in self.manuscript_tokens
-        ]
-        transcribed_normalized = [
-            normalize_word(item["word"]) for item in self.transcribed_data
-        ]
-        matcher = difflib.SequenceMatcher(
-            None, manuscript_normalized, transcribed_normalized, autojunk=False
-        )
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == "equal" or tag == "replace":
-                for i in range(i2 - i1):
-                    manuscript_index = i1 + i
-                    whisper_index = j1 + i
-                    token = self.manuscript_tokens[manuscript_index]
-                    start_char, end_char = token["start"], token["end"]
-                    tk_start_str = f"1.0 + {start_char} chars"
-                    tk_end_str = f"1.0 + {end_char} chars"
-                    self.word_map[whisper_index] = (tk_start_str, tk_end_str)
-                    canonical_start_index = self.text_widget.index(tk_start_str)
-                    self.tk_index_map[canonical_start_index] = whisper_index
+        logging.info("Creating word map from the shared alignment.")
+        # The map holds global character offsets; the view converts them to Tk
+        # indices. Clicks are resolved the other way through _whisper_index_at().
+        with self.metrics.stage("create_word_map"):
+            self.word_map = self.detector.word_map()
         logging.info(
             f"Word map created. Mapped {len(self.word_map)} of {len(self.transcribed_data)} transcribed words."
         )
@@ -313,30 +707,36 @@ class AudiobookReviewApp:
     def show_timestamp_info(self, event):
         start_time, end_time = None, None
         display_text = "No timestamp available for this word."
-        if self.text_widget.tag_ranges("sel"):
-            sel_start, sel_end = self.text_widget.tag_ranges("sel")
-            start_word_index = self.text_widget.index(f"{sel_start} wordstart")
-            end_word_index = self.text_widget.index(f"{sel_end} wordend")
-            start_whisper_idx = self.tk_index_map.get(start_word_index)
-            end_whisper_idx = self.tk_index_map.get(
-                self.text_widget.index(f"{end_word_index} wordstart")
-            )
+        selection = self.view.selection()
+        if selection:
+            first_token, last_token = self.manuscript_tokens.indices_between(*selection)
+            start_whisper_idx = end_whisper_idx = None
+            if first_token < last_token:
+                start_whisper_idx = self.alignment.transcript_index(first_token)
+                end_whisper_idx = self.alignment.transcript_index(last_token - 1)
             if start_whisper_idx is not None:
-                start_time = self.transcribed_data[start_whisper_idx]["start"]
+                start_time = self.transcribed_data.start[start_whisper_idx]
             if end_whisper_idx is not None:
-                end_time = self.transcribed_data[end_whisper_idx]["end"]
+                end_time = self.transcribed_data.end[end_whisper_idx]
             display_text = f"Selection Start: {self._format_time(start_time)}\nSelection End:    {self._format_time(end_time)}"
         else:
-            click_index = self.text_widget.index(f"@{event.x},{event.y}")
-            word_start_index = self.text_widget.index(f"{click_index} wordstart")
-            whisper_idx = self.tk_index_map.get(word_start_index)
+            whisper_idx = self._whisper_index_at(self.view.offset_at(event.x, event.y))
             if whisper_idx is not None:
-                word_data = self.transcribed_data[whisper_idx]
-                start_time = word_data["start"]
-                end_time = word_data["end"]
+                start_time = self.transcribed_data.start[whisper_idx]
+                end_time = self.transcribed_data.end[whisper_idx]
                 display_text = f"Word Start: {self._format_time(start_time)}\nWord End:   {self._format_time(end_time)}"
         self._create_timestamp_popup(display_text)
 
+    def _whisper_index_at(self, char_offset):
+        """
+        Returns the transcribed word aligned with the manuscript token at a character
+        offset, or None.
+        """
+        token_index = self.manuscript_tokens.index_at(char_offset)
+        if token_index is None or self.alignment is None:
+            return None
+        return self.alignment.transcript_index(token_index)
+
     def _create_timestamp_popup(self, text_to_display):
         popup = tk.Toplevel(self.root)
         popup.title("Timestamp Info")
@@ -370,25 +770,23 @@ class AudiobookReviewApp:
         self.root.wait_window(popup)
 
     def display_full_text(self):
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.delete(1.0, tk.END)
-        self.text_widget.insert(tk.END, self.full_manuscript_text)
-        self.text_widget.config(state=tk.DISABLED)
+        self.view.set_text(self.full_manuscript_text)
 
     def toggle_play_pause(self):
+        if self.file_loader is not None:
+            return
         if self.is_playing:
-            pygame.mixer.music.pause()
+            self.audio.pause()
             self.is_playing = False
             self.play_pause_button.config(text="▶ Play")
             if self.after_id:
                 self.root.after_cancel(self.after_id)
             logging.info("Playback paused.")
+            self.metrics.log_summary()
         else:
-            if self.playback_offset > 0:
-                pygame.mixer.music.unpause()
-            else:
+            if not self.audio.started:
                 self.reset_highlighter_state()
-                pygame.mixer.music.play()
+            self.audio.resume()
             self.is_playing = True
             self.play_pause_button.config(text="⏸ Pause")
             logging.info("Playback started/resumed.")
@@ -396,33 +794,56 @@ class AudiobookReviewApp:
 
     def reset_highlighter_state(self):
         self.last_highlighted_word_index = -1
-        self.text_widget.tag_remove("current_word", "1.0", tk.END)
+        if self.current_word_range:
+            self.view.tag_remove("current_word", *self.current_word_range)
+            self.current_word_range = None
 
     def update_highlight(self):
         if not self.is_playing:
             return
-        current_time = (pygame.mixer.music.get_pos() / 1000.0) + self.playback_offset
-        for i in range(
-            self.last_highlighted_word_index + 1, len(self.transcribed_data)
-        ):
-            word_data = self.transcribed_data[i]
-            if word_data["start"] <= current_time < word_data["end"]:
-                if i == self.last_highlighted_word_index:
-                    break
-                self.text_widget.config(state=tk.NORMAL)
-                self.text_widget.tag_remove("current_word", "1.0", tk.END)
-                indices = self.word_map.get(i)
-                if indices:
-                    tk_start, tk_end = indices
-                    self.text_widget.tag_add("current_word", tk_start, tk_end)
-                    self.text_widget.see(tk_start)
-                self.last_highlighted_word_index = i
-                self.text_widget.config(state=tk.DISABLED)
-                break
-        self.after_id = self.root.after(100, self.update_highlight)
+        tick_start = time.perf_counter()
+        current_time = self.audio.position()
+        i = self.transcribed_data.index_at(current_time, self.playback_starts)
+        if i is not None and i != self.last_highlighted_word_index:
+            # Only the previous and the current word ranges are touched.
+            if self.current_word_range:
+                self.view.tag_remove("current_word", *self.current_word_range)
+                self.current_word_range = None
+            indices = self.word_map.get(i)
+            if indices:
+                start_char, end_char = indices
+                self.view.tag_add("current_word", start_char, end_char)
+                self.view.see(start_char)
+                self.current_word_range = indices
+            self.last_highlighted_word_index = i
+
+        # Wake up at the next word boundary instead of polling at a fixed rate.
+        delay_ms = MAX_HIGHLIGHT_TICK_MS
+        next_change = self.transcribed_data.next_change_after(
+            current_time, self.playback_starts
+        )
+        if next_change is not None:
+            delay_ms = int((next_change - current_time) * 1000)
+            delay_ms = max(MIN_HIGHLIGHT_TICK_MS, min(MAX_HIGHLIGHT_TICK_MS, delay_ms))
+        self.metrics.observe("highlight_tick", time.perf_counter() - tick_start)
+        self.after_id = self.root.after(delay_ms, self.update_highlight)
 
     def on_closing(self):
         logging.info("Application shutting down.")
+        self.cancel_loading()
+        self.metrics.log_summary()
+        try:
+            self.metrics.export(self.metrics_path)
+        except OSError as e:
+            logging.warning(f"Could not write metrics to {self.metrics_path}: {e}")
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.audio.close()
+        self._cancel_audio_analysis()
+        self.analysis_pool.shutdown(wait=False)
+        self.transcribed_data.close()
+        if self.store is not None:
+            self.store.close()
         pygame.mixer.quit()
         pygame.quit()
         if self.after_id:
@@ -433,58 +854,234 @@ class AudiobookReviewApp:
         """
         Clears existing mismatch highlights and reapplies them based on the
         current sensitivity slider value and mismatch status.
+
+        This full pass only runs after loading; slider moves and status changes
+        are applied incrementally.
         """
-        if not self.mismatches:
-            return
+        with self.metrics.stage("apply_mismatch_highlights"):
+            self._reapply_mismatch_highlights()
+
+    def _reapply_mismatch_highlights(self):
+        # Clear all existing mismatch tags from the text widget
+        for tag in ["substitution", "deletion"]:
+            self.view.tag_clear(tag)
 
         logging.info("Applying mismatch highlights.")
         threshold = self.sensitivity_slider.get() / 100.0
 
-        self.text_widget.config(state=tk.NORMAL)
+        # Only substitutions and deletions can be highlighted, as they map directly
+        # to text that exists in the manuscript widget. Insertions are shown in
+        # the insertion list instead; see _refresh_insertion_list().
+        self.highlightable_mismatches = [
+            mismatch
+            for mismatch in self.mismatches
+            if self._mismatch_tag_range(mismatch)
+        ]
 
-        # Clear all existing mismatch tags from the text widget
-        for tag in ["substitution", "deletion"]:
-            self.text_widget.tag_remove(tag, "1.0", tk.END)
+        # Kept sorted by confidence so a threshold change only touches the
+        # mismatches between the old and the new threshold.
+        self.mismatches_by_confidence = sorted(
+            self.highlightable_mismatches, key=lambda m: m["confidence"]
+        )
+        self.sorted_confidences = [
+            m["confidence"] for m in self.mismatches_by_confidence
+        ]
+        self.mismatch_index = MismatchIndex(self.mismatches)
+        self.current_mismatch = None
+
+        for mismatch in self.highlightable_mismatches:
+            if mismatch["status"] != "ignored" and mismatch["confidence"] >= threshold:
+                self._add_mismatch_tag(mismatch)
+        self.applied_threshold = threshold
+        self._refresh_insertion_list()
+
+    def _on_threshold_change(self, value):
+        """
+        Coalesces slider motion events: highlights are only updated once the
+        slider has been still for a moment.
+        """
+        if self.threshold_after_id:
+            self.root.after_cancel(self.threshold_after_id)
+        self.threshold_after_id = self.root.after(
+            THRESHOLD_DEBOUNCE_MS, self._update_threshold_highlights
+        )
+
+    def _update_threshold_highlights(self):
+        """
+        Adds or removes tags only for mismatches whose confidence lies between the
+        previously applied threshold and the current one.
+        """
+        self.threshold_after_id = None
+        if self.applied_threshold is None:
+            return
+        update_start = time.perf_counter()
+        old_threshold = self.applied_threshold
+        new_threshold = self.sensitivity_slider.get() / 100.0
+        if new_threshold == old_threshold:
+            return
 
-        # Loop through all found mismatches and apply tags if they meet the criteria
-        for mismatch in self.mismatches:
-            # Skip if the user has ignored this mismatch
+        low, high = sorted((old_threshold, new_threshold))
+        first = bisect.bisect_left(self.sorted_confidences, low)
+        last = bisect.bisect_left(self.sorted_confidences, high)
+        show = new_threshold < old_threshold
+        for mismatch in self.mismatches_by_confidence[first:last]:
             if mismatch["status"] == "ignored":
                 continue
+            if show:
+                self._add_mismatch_tag(mismatch)
+            else:
+                self._remove_mismatch_tag(mismatch)
+        self.applied_threshold = new_threshold
+        self._refresh_insertion_list()
+        self.metrics.observe("threshold_update", time.perf_counter() - update_start)
+        logging.info(
+            f"Confidence threshold {old_threshold:.0%} -> {new_threshold:.0%}: "
+            f"updated {last - first} mismatch highlights."
+        )
 
-            # Skip if the mismatch confidence is below the slider's threshold
-            if mismatch["confidence"] < threshold:
-                continue
+    def set_mismatch_status(self, mismatch, status):
+        """
+        Sets a mismatch's status ('unconfirmed', 'confirmed' or 'ignored') and
+        refreshes only that mismatch's highlight.
+        """
+        mismatch["status"] = status
+        logging.info(f"Mismatch '{mismatch['manuscript_text']}' marked as {status}.")
+        if self.store is not None and self.chapter_id is not None:
+            try:
+                self.store.set_status(self.chapter_id, mismatch)
+            except sqlite3.Error as e:
+                logging.warning(f"Could not save the review status: {e}")
+        if self.mismatch_index is not None:
+            self.mismatch_index.invalidate()
+        if mismatch["type"] == "insert":
+            self.insertion_list.refresh()
+        if self.applied_threshold is None or not self._mismatch_tag_range(mismatch):
+            return
+        self._remove_mismatch_tag(mismatch)
+        if status != "ignored" and mismatch["confidence"] >= self.applied_threshold:
+            self._add_mismatch_tag(mismatch)
 
-            # We can only visually highlight substitutions and deletions as they
-            # map directly to text that exists in the manuscript widget.
-            if mismatch["type"] == "replace" or mismatch["type"] == "delete":
-                start_token_idx, end_token_idx = mismatch["manuscript_indices"]
-
-                # Ensure the indices are valid and there's something to highlight
-                if start_token_idx < end_token_idx:
-                    start_char = self.manuscript_tokens[start_token_idx]["start"]
-                    # The end token index is exclusive, so we use the token before it
-                    end_char = self.manuscript_tokens[end_token_idx - 1]["end"]
-
-                    tk_start = f"1.0 + {start_char} chars"
-                    tk_end = f"1.0 + {end_char} chars"
-
-                    tag_name = (
-                        "substitution" if mismatch["type"] == "replace" else "deletion"
-                    )
-                    self.text_widget.tag_add(tag_name, tk_start, tk_end)
-
-            elif mismatch["type"] == "insert":
-                # As discussed, visually showing an insertion is complex because it means
-                # adding text that isn't in the original manuscript, which would break our
-                # coordinate system. For now, we log it. A future feature could be a separate
-                # list view for insertions.
-                logging.debug(
-                    f"Skipping visual highlight for insertion: '{mismatch['narrated_text']}'"
-                )
+    def _mismatch_at(self, char_offset):
+        """
+        Returns the highlightable mismatch covering a character offset, or None.
+        """
+        token_index = self.manuscript_tokens.index_at(char_offset)
+        if token_index is None or self.mismatch_index is None:
+            return None
+        return self.mismatch_index.at_token(token_index)
 
-        self.text_widget.config(state=tk.DISABLED)
+    def show_mismatch_menu(self, event):
+        mismatch = self._mismatch_at(self.view.offset_at(event.x, event.y))
+        if mismatch is None:
+            return
+        self._popup_mismatch_menu(mismatch, event.x_root, event.y_root)
+
+    def _popup_mismatch_menu(self, mismatch, x_root, y_root):
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(
+            label="Confirm Error",
+            command=lambda: self.set_mismatch_status(mismatch, "confirmed"),
+        )
+        menu.add_command(
+            label="Ignore",
+            command=lambda: self.set_mismatch_status(mismatch, "ignored"),
+        )
+        menu.add_command(
+            label="Reset",
+            command=lambda: self.set_mismatch_status(mismatch, "unconfirmed"),
+        )
+        menu.tk_popup(x_root, y_root)
+
+    def jump_to_mismatch(self, step):
+        """
+        Seeks to the next (step > 0) or previous mismatch of the chosen type that
+        is shown at the current threshold, counting from the playback position.
+        """
+        if self.mismatch_index is None or self.file_loader is not None:
+            return
+        view = self.mismatch_index.view(
+            NAVIGATION_TYPES[self.navigation_type.get()], self.applied_threshold or 0.0
+        )
+        position = self.audio.position()
+        current = self.current_mismatch
+        # Step from the mismatch last jumped to while playback is still near it,
+        # so mismatches sharing a timestamp are not skipped.
+        if current is not None and (
+            abs(position - self._mismatch_start(current)) > NAVIGATION_TOLERANCE
+        ):
+            current = None
+        if step > 0:
+            mismatch = view.next_after(position, current)
+        else:
+            mismatch = view.previous_before(position, current)
+        if mismatch is None:
+            self.navigation_label.config(
+                text="No next mismatch." if step > 0 else "No previous mismatch."
+            )
+            return
+        self.show_mismatch(mismatch, view)
+
+    def show_mismatch(self, mismatch, view=None):
+        """Scrolls the manuscript to a mismatch and plays the audio from it."""
+        self.current_mismatch = mismatch
+        i1 = mismatch["manuscript_indices"][0]
+        if len(self.manuscript_tokens):
+            self.view.see(
+                self.manuscript_tokens.start[min(i1, len(self.manuscript_tokens) - 1)]
+            )
+        if mismatch["type"] == "insert":
+            row = self.listed_insertions.position_of(mismatch)
+            if row is not None:
+                self.insertion_list.see(row)
+        text = (
+            f"{mismatch['type'].capitalize()} at {self._format_time(mismatch['start_time'])}: "
+            f"'{mismatch['manuscript_text']}' / '{mismatch['narrated_text']}'"
+        )
+        position = view.position_of(mismatch) if view is not None else None
+        if position is not None:
+            text = f"{position + 1} of {len(view)}. {text}"
+        self.navigation_label.config(text=text)
+        logging.info(f"Jumped to mismatch: {text}")
+        self.seek_to(self._mismatch_start(mismatch))
+
+    def _refresh_insertion_list(self):
+        """Lists the insertions shown at the current threshold, ignored ones included."""
+        self.listed_insertions = MismatchView([])
+        if self.mismatch_index is not None and self.applied_threshold is not None:
+            self.listed_insertions = self.mismatch_index.view(
+                ("insert",), self.applied_threshold, include_ignored=True
+            )
+        self.insertion_list.set_count(len(self.listed_insertions))
+
+    def _insertion_row(self, index):
+        mismatch = self.listed_insertions[index]
+        return (
+            self._format_time(mismatch["start_time"]),
+            f"{mismatch['confidence']:.0%}",
+            mismatch["status"],
+            mismatch["narrated_text"],
+        )
+
+    def _mismatch_tag_range(self, mismatch):
+        """
+        Returns (tag_name, start_char, end_char) for a substitution or deletion, or None.
+        """
+        if mismatch["type"] != "replace" and mismatch["type"] != "delete":
+            return None
+        start_token_idx, end_token_idx = mismatch["manuscript_indices"]
+        if start_token_idx >= end_token_idx:
+            return None
+        start_char = self.manuscript_tokens.start[start_token_idx]
+        # The end token index is exclusive, so we use the token before it
+        end_char = self.manuscript_tokens.end[end_token_idx - 1]
+        tag_name = "substitution" if mismatch["type"] == "replace" else "deletion"
+        return tag_name, start_char, end_char
+
+    def _add_mismatch_tag(self, mismatch):
+        self.view.tag_add(*self._mismatch_tag_range(mismatch))
+
+    def _remove_mismatch_tag(self, mismatch):
+        self.view.tag_remove(*self._mismatch_tag_range(mismatch))
 
 
 if __name__ == "__main__":
@@ -492,10 +1089,43 @@ if __name__ == "__main__":
     parser.add_argument("--docx", type=str, help="Path to the manuscript DOCX file.")
     parser.add_argument("--json", type=str, help="Path to the timestamp JSON file.")
     parser.add_argument("--audio", type=str, help="Path to the narration MP3 file.")
+    parser.add_argument(
+        "--aligner",
+        choices=sorted(ALIGNERS),
+        default=DEFAULT_ALIGNER,
+        help="Alignment engine used for mismatch detection ('difflib' is the original, slower path).",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=DEFAULT_METRICS_PATH,
+        help="JSON Lines file the session's stage timings and histograms are appended to.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PSTATS_FILE",
+        default=None,
+        help="Run under cProfile (including the loader threads) and write the stats here.",
+    )
+    parser.add_argument(
+        "--store",
+        default=DEFAULT_STORE_PATH,
+        help="SQLite database of chapter results and review status ('' disables it).",
+    )
     args = parser.parse_args()
+    profiler = None
+    if args.profile:
+        profiler = Profiler(args.profile)
+        profiler.start()
     root = tk.Tk()
     app = AudiobookReviewApp(
-        root, docx_path=args.docx, json_path=args.json, audio_path=args.audio
+        root,
+        docx_path=args.docx,
+        json_path=args.json,
+        audio_path=args.audio,
+        aligner=args.aligner,
+        metrics_path=args.metrics,
+        profiler=profiler,
+        store_path=args.store,
     )
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
@@ -0,0 +1,84 @@
+import bisect
+import re
+from array import array
+
+# A run of sentence-ending punctuation (including ellipses), optionally followed by
+# closing quotes or brackets, that is followed by whitespace or the end of the text.
+# Line breaks (the "\n\n" paragraph joins and cell breaks) always end a sentence.
+_BOUNDARY_RE = re.compile(r"(?P<term>(?:[.!?…])+[\"'”’)\]]*)(?=\s|$)|\n+")
+_NEXT_CHAR_RE = re.compile(r"\s*(\S)")
+
+
+class SentenceIndex:
+    """
+    Sentence boundaries of a manuscript, precomputed once as a sorted offset array.
+
+    Looking up the sentence around a character offset is then a bisect instead of
+    a scan over the whole text.
+    """
+
+    def __init__(self, text):
+        """
+        Args:
+            text (str): The full manuscript text.
+        """
+        self.text = text
+        self.starts = [0]
+        for match in _BOUNDARY_RE.finditer(text):
+            if match.group("term"):
+                # An ellipsis or other terminator followed by a lowercase word is a
+                # pause inside the sentence, not the end of it.
+                following = _NEXT_CHAR_RE.match(text, match.end())
+                if following and following.group(1).islower():
+                    continue
+            if match.end() > self.starts[-1]:
+                self.starts.append(match.end())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sentence_span(self, char_index):
+        """
+        Returns the (start, end) character offsets of the sentence containing char_index.
+        """
+        position = bisect.bisect_right(self.starts, char_index) - 1
+        start = self.starts[max(position, 0)]
+        if position + 1 < len(self.starts):
+            end = self.starts[position + 1]
+        else:
+            end = len(self.text)
+        return start, end
+
+    def sentence_at(self, char_index):
+        """
+        Returns the stripped sentence containing the character at char_index.
+        """
+        start, end = self.sentence_span(char_index)
+        return self.text[start:end].strip()
+
+
+class LineIndex:
+    """
+    Line start offsets of a text, for converting between character offsets and Tk
+    "line.col" indices in Python instead of asking the Text widget each time.
+    """
+
+    def __init__(self, text):
+        """
+        Args:
+            text (str): The text exactly as inserted into the Text widget.
+        """
+        self.text_length = len(text)
+        self.line_starts = array("l", [0])
+        self.line_starts.extend(match.end() for match in re.finditer("\n", text))
+
+    def to_tk(self, offset):
+        """Converts a character offset into a Tk "line.col" index string."""
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        return f"{line + 1}.{offset - self.line_starts[line]}"
+
+    def from_tk(self, index):
+        """Converts a canonical Tk "line.col" index string into a character offset."""
+        line, column = index.split(".")
+        line = min(max(int(line), 1), len(self.line_starts)) - 1
+        return min(self.line_starts[line] + int(column), self.text_length)
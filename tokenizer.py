@@ -0,0 +1,47 @@
+import re
+from array import array
+
+# One word token: a number with its thousands or decimal separators ("1,000",
+# "3.5"), or a run of word characters, either followed by apostrophe-joined parts
+# so contractions and possessives ("don't", "John's", "rock'n'roll") stay whole.
+# Hyphens and dashes always split, so "well-known" is two tokens whether the
+# text or Whisper wrote it with a hyphen or a space.
+TOKEN_RE = re.compile(r"(?:\d+(?:[.,]\d+)+|\w+)(?:['’]\w+)*")
+
+
+def tokenize_text(text):
+    """
+    Yields (token, start, end) for every word token in a text, with character
+    offsets into it.
+    """
+    for match in TOKEN_RE.finditer(text):
+        yield match.group(0), match.start(), match.end()
+
+
+def split_words(words):
+    """
+    Splits transcribed words into the same tokens as the manuscript.
+
+    Whisper usually produces exactly one token per word, but a word can hold
+    several ("well-known") or none (a lone dash or ellipsis).
+
+    Args:
+        words (list): The raw transcribed words.
+
+    Returns:
+        tuple: (tokens, token_to_word), where token_to_word is an array giving the
+               word index of every token, or None when every word is exactly one
+               token.
+    """
+    parts = {word: TOKEN_RE.findall(word) for word in set(words)}
+    if all(len(word_parts) == 1 for word_parts in parts.values()):
+        single = {word: word_parts[0] for word, word_parts in parts.items()}
+        return list(map(single.__getitem__, words)), None
+
+    tokens = []
+    token_to_word = array("l")
+    for index, word in enumerate(words):
+        word_parts = parts[word]
+        tokens.extend(word_parts)
+        token_to_word.extend([index] * len(word_parts))
+    return tokens, token_to_word
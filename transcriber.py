@@ -0,0 +1,553 @@
+"""
+Resumable batch transcription of audiobook chapters.
+
+This is the Step 5 loop of `audiobook_validation.ipynb` as a module and CLI. Every
+finished chapter is recorded in a manifest keyed by the SHA-256 of its audio, so
+an interrupted run picks up where it stopped and unchanged chapters are never
+transcribed twice. While one chapter is transcribed, the next one's audio is
+already being decoded, and chapters can be spread over several worker
+processes, one per device. Every `_timestamps.json` gets a binary sidecar (see
+word_store) that the review tools open without parsing.
+
+Usage:
+    python transcriber.py --dir narrations --template "{num} - ADP.mp3" --start 1 --end 5
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from word_store import WordStore, word_file_path, write_word_file
+
+TIMESTAMP_SUFFIX = "_timestamps.json"
+MANIFEST_NAME = "transcription_manifest.json"
+MANIFEST_VERSION = 1
+
+
+class WhisperBackend:
+    """
+    Transcribes with OpenAI's Whisper, as the Colab notebook does.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model="medium", device=None):
+        """
+        Args:
+            model (str): Whisper model name.
+            device (str, optional): Torch device, e.g. 'cuda:1'. Defaults to CUDA
+                                    when available, else the CPU.
+        """
+        try:
+            import torch
+            import whisper
+        except ImportError:
+            raise RuntimeError(
+                "The whisper backend needs openai-whisper: pip install -U openai-whisper"
+            )
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "cpu":
+            logging.warning("GPU not found. Using CPU. Processing will be very slow.")
+        logging.info(f"Loading Whisper '{model}' model on {device}...")
+        self._whisper = whisper
+        self.model = whisper.load_model(model, device=device)
+        self.model_name = model
+
+    def load_audio(self, path):
+        """Decodes an audio file (via ffmpeg) into Whisper's 16 kHz sample array."""
+        return self._whisper.load_audio(path)
+
+    def load_clip(self, path, start_time, end_time):
+        """
+        Decodes only [start_time, end_time) of an audio file, letting ffmpeg seek
+        instead of decoding the whole chapter.
+        """
+        import numpy
+
+        cmd = [
+            "ffmpeg",
+            "-nostdin",
+            "-ss",
+            f"{start_time:.3f}",
+            "-t",
+            f"{end_time - start_time:.3f}",
+            "-i",
+            path,
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-acodec",
+            "pcm_s16le",
+            "-ar",
+            str(self._whisper.audio.SAMPLE_RATE),
+            "-",
+        ]
+        output = subprocess.run(cmd, capture_output=True, check=True).stdout
+        return numpy.frombuffer(output, numpy.int16).astype(numpy.float32) / 32768.0
+
+    def transcribe(self, audio):
+        """Returns Whisper's result dict for decoded audio, with word timestamps."""
+        return self.model.transcribe(audio, word_timestamps=True)
+
+
+class StubBackend:
+    """
+    A deterministic stand-in for Whisper, for tests and dry runs without a GPU.
+
+    If a `<audio stem>.txt` file sits next to the audio, its words are "heard";
+    otherwise words are derived from the audio file's hash. Words are spaced
+    evenly at `words_per_second`.
+    """
+
+    name = "stub"
+
+    _VOCABULARY = (
+        "the and a to of in was he she it that said for on with as his her they at "
+        "but had not be from by one all there were when which what"
+    ).split()
+
+    def __init__(self, model=None, device=None, words_per_second=2.5):
+        self.model_name = "stub"
+        self.words_per_second = words_per_second
+
+    def load_audio(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        text_path = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(text_path):
+            with open(text_path, "r", encoding="utf-8") as f:
+                return f.read().split()
+        digest = hashlib.sha256(data).digest()
+        count = 50 + digest[0]
+        return [
+            self._VOCABULARY[digest[k % len(digest)] % len(self._VOCABULARY)]
+            for k in range(count)
+        ]
+
+    def load_clip(self, path, start_time, end_time):
+        step = 1.0 / self.words_per_second
+        return [
+            word
+            for k, word in enumerate(self.load_audio(path))
+            if start_time <= k * step < end_time
+        ]
+
+    def transcribe(self, audio):
+        step = 1.0 / self.words_per_second
+        words = [
+            {
+                "word": f" {word}",
+                "start": round(k * step, 3),
+                "end": round(k * step + step * 0.8, 3),
+                "probability": 1.0,
+            }
+            for k, word in enumerate(audio)
+        ]
+        return {
+            "language": "en",
+            "text": " ".join(audio),
+            "segments": [{"words": words}],
+        }
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, StubBackend)}
+DEFAULT_BACKEND = WhisperBackend.name
+
+
+def build_output(result):
+    """
+    Reformats a Whisper result into the `_timestamps.json` structure.
+
+    Returns:
+        dict: {'language', 'transcription_text', 'words'}.
+    """
+    final_output = {
+        "language": result.get("language", "N/A"),
+        "transcription_text": result["text"],
+        "words": [],
+    }
+    # Gracefully handle cases where segments might not have words
+    for segment in result.get("segments", []):
+        for word_info in segment.get("words", []):
+            final_output["words"].append(word_info)
+    return final_output
+
+
+def audio_hash(path):
+    """Returns the SHA-256 of an audio file, the manifest key for its chapter."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def output_path_for(audio_path, output_dir=None):
+    """Returns where the `_timestamps.json` of an audio file is written."""
+    stem = os.path.splitext(os.path.basename(audio_path))[0]
+    directory = output_dir or os.path.dirname(audio_path)
+    return os.path.join(directory, stem + TIMESTAMP_SUFFIX)
+
+
+def _write_json_atomic(path, data, indent=None):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _write_sidecar(json_path, words):
+    """Writes the binary timestamp file the review tools open instead of the JSON."""
+    try:
+        write_word_file(
+            word_file_path(json_path),
+            WordStore.from_dicts(words),
+            source_path=json_path,
+        )
+    except (OSError, ValueError, KeyError) as e:
+        # The JSON is complete on its own; the tools fall back to parsing it.
+        logging.warning(f"Could not write the binary timestamps of {json_path}: {e}")
+
+
+class Manifest:
+    """
+    The record of finished chapters, keyed by audio hash and saved after every
+    chapter so a crash loses at most the chapter in progress.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.entries = data["entries"]
+
+    def is_done(self, digest, json_path):
+        entry = self.entries.get(digest)
+        return (
+            entry is not None
+            and entry["json_path"] == json_path
+            and os.path.exists(json_path)
+        )
+
+    def has_output(self, json_path):
+        """Returns True if some recorded chapter (possibly older audio) wrote json_path."""
+        return any(entry["json_path"] == json_path for entry in self.entries.values())
+
+    def record(self, digest, entry):
+        self.entries[digest] = entry
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        _write_json_atomic(
+            self.path, {"version": MANIFEST_VERSION, "entries": self.entries}, indent=2
+        )
+
+
+def plan_jobs(audio_paths, manifest, output_dir=None, force=False):
+    """
+    Splits the audio files into chapters still to transcribe and chapters done.
+
+    A `_timestamps.json` that already exists but is not in the manifest (e.g. from
+    a notebook run) is adopted as done, unless `force` is set. One the manifest
+    recorded for different audio is stale and is transcribed again.
+
+    Returns:
+        tuple: (jobs, skipped), lists of {'audio_path', 'json_path', 'hash'} dicts.
+    """
+    jobs, skipped = [], []
+    for audio_path in audio_paths:
+        job = {
+            "audio_path": audio_path,
+            "json_path": output_path_for(audio_path, output_dir),
+            "hash": audio_hash(audio_path),
+        }
+        if not force and manifest.is_done(job["hash"], job["json_path"]):
+            skipped.append(job)
+        elif (
+            not force
+            and os.path.exists(job["json_path"])
+            and not manifest.has_output(job["json_path"])
+        ):
+            logging.info(
+                f"Found an existing transcript for {audio_path}; recording it in the manifest."
+            )
+            manifest.record(job["hash"], _manifest_entry(job, backend="unknown"))
+            skipped.append(job)
+        else:
+            jobs.append(job)
+    return jobs, skipped
+
+
+def _manifest_entry(job, backend, model=None, words=None, seconds=None):
+    return {
+        "audio_path": job["audio_path"],
+        "json_path": job["json_path"],
+        "backend": backend,
+        "model": model,
+        "words": words,
+        "seconds": seconds,
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+class _InlineProgress:
+    """Hands progress messages straight to a callback instead of queueing them."""
+
+    def __init__(self, callback):
+        self.put = callback
+
+
+def _transcribe_shard(backend_name, model, device, jobs, progress):
+    """
+    Transcribes a list of chapters with one backend instance, decoding the next
+    chapter's audio on a helper thread while the current one is transcribed.
+
+    Each finished or failed chapter is reported as soon as it is done, by
+    calling `progress.put` with ('done', job, entry) or ('failed', job,
+    error_message). `progress` is a queue in worker processes and an
+    _InlineProgress in the single-worker path.
+    """
+    try:
+        backend = BACKENDS[backend_name](model=model, device=device)
+    except Exception as e:
+        logging.error(f"Could not start the {backend_name} backend: {e}", exc_info=True)
+        for job in jobs:
+            progress.put(("failed", job, str(e)))
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetcher.submit(backend.load_audio, jobs[0]["audio_path"])
+        for position, job in enumerate(jobs):
+            started = time.perf_counter()
+            try:
+                audio = pending.result()
+            except Exception as e:
+                audio, error = None, e
+            if position + 1 < len(jobs):
+                pending = prefetcher.submit(
+                    backend.load_audio, jobs[position + 1]["audio_path"]
+                )
+            if audio is None:
+                progress.put(("failed", job, f"Could not decode audio: {error}"))
+                continue
+            try:
+                logging.info(f"Transcribing: {os.path.basename(job['audio_path'])}...")
+                final_output = build_output(backend.transcribe(audio))
+                _write_json_atomic(job["json_path"], final_output, indent=2)
+                _write_sidecar(job["json_path"], final_output["words"])
+            except Exception as e:
+                logging.error(
+                    f"ERROR processing {job['audio_path']}: {e}", exc_info=True
+                )
+                progress.put(("failed", job, str(e)))
+                continue
+            entry = _manifest_entry(
+                job,
+                backend=backend_name,
+                model=backend.model_name,
+                words=len(final_output["words"]),
+                seconds=round(time.perf_counter() - started, 3),
+            )
+            progress.put(("done", job, entry))
+
+
+def transcribe_chapters(
+    audio_paths,
+    output_dir=None,
+    backend=DEFAULT_BACKEND,
+    model="medium",
+    devices=None,
+    workers=1,
+    force=False,
+):
+    """
+    Transcribes chapters that are not done yet, resuming from the manifest.
+
+    Args:
+        audio_paths (list): Chapter audio files, in processing order.
+        output_dir (str, optional): Where `_timestamps.json` files and the manifest
+                                    go. Defaults to next to the audio.
+        backend (str): A key of BACKENDS.
+        model (str): Model name passed to the backend.
+        devices (list, optional): One worker process is started per device.
+        workers (int): Number of worker processes when no devices are given.
+        force (bool): Re-transcribe chapters even if they are already done.
+
+    Returns:
+        dict: {'processed', 'skipped', 'failed'} lists of chapter results.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}"
+        )
+    if not audio_paths:
+        return {"processed": [], "skipped": [], "failed": []}
+    manifest_dir = output_dir or os.path.dirname(audio_paths[0])
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(manifest_dir, MANIFEST_NAME))
+    jobs, skipped = plan_jobs(audio_paths, manifest, output_dir, force)
+    for job in skipped:
+        logging.info(f"SKIPPED (already transcribed): {job['audio_path']}")
+    summary = {"processed": [], "skipped": skipped, "failed": []}
+    if not jobs:
+        return summary
+
+    devices = list(devices or [None] * max(1, workers))
+    shards = [jobs[k :: len(devices)] for k in range(len(devices))]
+    shards = [(device, shard) for device, shard in zip(devices, shards) if shard]
+
+    def handle(message):
+        kind, job, payload = message
+        if kind == "done":
+            manifest.record(job["hash"], payload)
+            logging.info(f"Timestamp file saved to: {job['json_path']}")
+            summary["processed"].append(payload)
+        else:
+            summary["failed"].append(
+                {"audio_path": job["audio_path"], "error": payload}
+            )
+
+    if len(shards) == 1:
+        # Handled as each chapter finishes, so the manifest is saved after every
+        # chapter rather than once the whole book is done.
+        device, shard = shards[0]
+        _transcribe_shard(backend, model, device, shard, _InlineProgress(handle))
+        return summary
+
+    # CUDA cannot be used in forked processes, so workers are spawned.
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        progress = manager.Queue()
+        processes = [
+            context.Process(
+                target=_transcribe_shard,
+                args=(backend, model, device, shard, progress),
+            )
+            for device, shard in shards
+        ]
+        for process in processes:
+            process.start()
+        remaining = len(jobs)
+        while remaining:
+            try:
+                handle(progress.get(timeout=1.0))
+                remaining -= 1
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+        for process in processes:
+            process.join()
+    reported = {r["audio_path"] for r in summary["processed"] + summary["failed"]}
+    for job in jobs:
+        if job["audio_path"] not in reported:
+            summary["failed"].append(
+                {"audio_path": job["audio_path"], "error": "Worker exited early."}
+            )
+    return summary
+
+
+def chapter_paths(directory, template, start, end):
+    """
+    Expands the notebook's `{num}` file name template over a chapter range.
+
+    Missing files are logged and left out.
+    """
+    if "{num}" not in template:
+        raise ValueError("The file name template must include the placeholder {num}.")
+    if start > end:
+        raise ValueError(
+            f"Start chapter ({start}) cannot be greater than end chapter ({end})."
+        )
+    paths = []
+    for chap_num in range(start, end + 1):
+        audio_file_path = os.path.join(directory, template.format(num=chap_num))
+        if os.path.exists(audio_file_path):
+            paths.append(audio_file_path)
+        else:
+            logging.warning(f"SKIPPED: File not found at '{audio_file_path}'")
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Resumable batch transcription of audiobook chapters."
+    )
+    parser.add_argument(
+        "--dir", required=True, help="Directory containing the audio chapters."
+    )
+    parser.add_argument(
+        "--template",
+        default="{num} - ADP.mp3",
+        help="File name pattern, with {num} for the chapter number.",
+    )
+    parser.add_argument("--start", type=int, default=1, help="First chapter number.")
+    parser.add_argument("--end", type=int, default=1, help="Last chapter number.")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Directory for the _timestamps.json files (default: next to the audio).",
+    )
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument("--model", default="medium", help="Whisper model name.")
+    parser.add_argument(
+        "--devices",
+        default=None,
+        help="Comma-separated devices, one worker each (e.g. cuda:0,cuda:1).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes when --devices is not given.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-transcribe chapters that are already done.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    if not os.path.isdir(args.dir):
+        logging.error(f"The directory was not found: {args.dir}")
+        return 1
+    try:
+        audio_paths = chapter_paths(args.dir, args.template, args.start, args.end)
+    except ValueError as e:
+        logging.error(str(e))
+        return 1
+
+    devices = [d.strip() for d in args.devices.split(",")] if args.devices else None
+    summary = transcribe_chapters(
+        audio_paths,
+        output_dir=args.output,
+        backend=args.backend,
+        model=args.model,
+        devices=devices,
+        workers=args.workers,
+        force=args.force,
+    )
+    print(
+        f"Successfully processed: {len(summary['processed'])} files. "
+        f"Already done: {len(summary['skipped'])}. Failed: {len(summary['failed'])}."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
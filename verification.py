@@ -0,0 +1,218 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import transcriber
+from alignment import get_aligner
+from tokenizer import split_words
+
+# Transcribed words of context kept on each side of a mismatch in its clip, and
+# the manuscript tokens it is compared against.
+CONTEXT_WORDS = 3
+CONTEXT_TOKENS = 5
+# Extra audio around the context words, in seconds.
+CLIP_PADDING = 0.3
+DEFAULT_VERIFY_MODEL = "large-v3"
+DEFAULT_BUDGET_SECONDS = 600.0
+
+
+def clip_window(mismatch, transcribed_data, context_words=CONTEXT_WORDS):
+    """
+    Returns the (start_time, end_time) of the audio around a mismatch, from the
+    timestamps of the narrated words next to it, or None if there are none.
+    """
+    j1, j2 = mismatch["transcript_indices"]
+    first = max(0, j1 - context_words)
+    last = min(len(transcribed_data), j2 + context_words)
+    if first >= last:
+        return None
+    start_time = max(0.0, transcribed_data.start[first] - CLIP_PADDING)
+    return start_time, transcribed_data.end[last - 1] + CLIP_PADDING
+
+
+def plan_verification(mismatches, transcribed_data, budget_seconds, max_confidence=1.0):
+    """
+    Chooses the mismatches to verify within an audio budget.
+
+    Unreviewed mismatches are taken lowest-confidence first, since those are the
+    most likely to be transcription errors, until their clips add up to
+    `budget_seconds` of audio.
+
+    Returns:
+        list: (mismatch, start_time, end_time) tuples.
+    """
+    candidates = sorted(
+        (
+            m
+            for m in mismatches
+            if m["status"] == "unconfirmed" and m["confidence"] <= max_confidence
+        ),
+        key=lambda m: m["confidence"],
+    )
+    plan = []
+    spent = 0.0
+    for mismatch in candidates:
+        window = clip_window(mismatch, transcribed_data)
+        if window is None:
+            continue
+        duration = window[1] - window[0]
+        if spent + duration > budget_seconds:
+            break
+        spent += duration
+        plan.append((mismatch, window[0], window[1]))
+    return plan
+
+
+class Verifier:
+    """
+    Second-pass check of flagged mismatches with a slower, stronger backend.
+
+    Only short clips around the selected mismatches are decoded and transcribed,
+    so the cost follows the number of mismatches, not the length of the chapter.
+    """
+
+    def __init__(
+        self,
+        backend=transcriber.DEFAULT_BACKEND,
+        model=DEFAULT_VERIFY_MODEL,
+        device=None,
+        aligner=None,
+    ):
+        """
+        Args:
+            backend (str): A key of transcriber.BACKENDS.
+            model (str): Model name for the backend, normally larger than the one
+                         used for the first transcription.
+            device (str, optional): Device for the backend.
+            aligner (str or object, optional): Aligner used to compare each clip
+                                               with the manuscript.
+        """
+        if backend not in transcriber.BACKENDS:
+            raise ValueError(
+                f"Unknown backend '{backend}'. Choose from: {', '.join(transcriber.BACKENDS)}"
+            )
+        self.backend_name = backend
+        self.backend = transcriber.BACKENDS[backend](model=model, device=device)
+        self.aligner = get_aligner(aligner)
+
+    def verify(
+        self,
+        detector,
+        mismatches,
+        audio_path,
+        budget_seconds=DEFAULT_BUDGET_SECONDS,
+        max_confidence=1.0,
+    ):
+        """
+        Re-transcribes the audio around mismatches and updates them in place.
+
+        A mismatch whose manuscript text the second pass hears as written is
+        dismissed (status 'ignored'); otherwise its narrated text and confidence
+        are replaced with the second pass's. Either way the result is kept under
+        mismatch['verification'].
+
+        Args:
+            detector (MismatchDetector): The detector that produced the mismatches.
+            mismatches (list): Mismatches from the detector.
+            audio_path (str): The chapter's narration audio.
+            budget_seconds (float): Maximum seconds of audio to re-transcribe.
+            max_confidence (float): Mismatches more confident than this are not
+                                    verified.
+
+        Returns:
+            dict: Counts of 'verified', 'dismissed' and 'unverified' mismatches
+                  plus the 'audio_seconds' transcribed and 'seconds' taken.
+        """
+        started = time.perf_counter()
+        plan = plan_verification(
+            mismatches, detector.transcribed_data, budget_seconds, max_confidence
+        )
+        counts = {"verified": 0, "dismissed": 0, "unverified": len(mismatches)}
+        audio_seconds = 0.0
+        if plan:
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                # Cut the next clip while the current one is transcribed.
+                pending = prefetcher.submit(
+                    self.backend.load_clip, audio_path, plan[0][1], plan[0][2]
+                )
+                for position, (mismatch, start_time, end_time) in enumerate(plan):
+                    clip = pending.result()
+                    if position + 1 < len(plan):
+                        _, next_start, next_end = plan[position + 1]
+                        pending = prefetcher.submit(
+                            self.backend.load_clip, audio_path, next_start, next_end
+                        )
+                    result = transcriber.build_output(self.backend.transcribe(clip))
+                    verdict = self._apply(detector, mismatch, result["words"])
+                    mismatch["verification"]["clip"] = (
+                        round(start_time, 3),
+                        round(end_time, 3),
+                    )
+                    audio_seconds += end_time - start_time
+                    counts["verified"] += 1
+                    counts["unverified"] -= 1
+                    if verdict == "dismissed":
+                        counts["dismissed"] += 1
+
+        counts["audio_seconds"] = round(audio_seconds, 3)
+        counts["seconds"] = round(time.perf_counter() - started, 3)
+        logging.info(
+            f"Verified {counts['verified']} of {len(mismatches)} mismatches with "
+            f"{self.backend_name} ({counts['audio_seconds']:.1f}s of audio): "
+            f"{counts['dismissed']} dismissed."
+        )
+        return counts
+
+    def _apply(self, detector, mismatch, clip_words):
+        """Compares one clip with the manuscript and records the verdict."""
+        i1, i2 = mismatch["manuscript_indices"]
+        lo = max(0, i1 - CONTEXT_TOKENS)
+        hi = min(len(detector.manuscript_tokens), i2 + CONTEXT_TOKENS)
+        expected = detector.manuscript_ids()[lo:hi]
+        tokens, token_to_word = split_words([word["word"] for word in clip_words])
+        heard = detector.vocabulary.encode(tokens)
+
+        # Differences in the context around the mismatch are ignored: the clip
+        # edges may cut words in half.
+        a, b = i1 - lo, i2 - lo
+        still_differs = False
+        differing_words = set()
+        for tag, oi1, oi2, oj1, oj2 in self.aligner.get_opcodes(expected, heard):
+            if tag == "equal":
+                continue
+            if a == b:
+                touches = oi1 <= a <= oi2
+            else:
+                touches = oi1 < b and oi2 > a or (oi1 == oi2 and a < oi1 < b)
+            if touches:
+                still_differs = True
+                if token_to_word is not None and oj2 > oj1:
+                    oj1, oj2 = token_to_word[oj1], token_to_word[oj2 - 1] + 1
+                differing_words.update(range(oj1, oj2))
+        differing = [clip_words[k] for k in sorted(differing_words)]
+
+        if not still_differs:
+            verdict = "dismissed"
+            mismatch["status"] = "ignored"
+        else:
+            verdict = "confirmed"
+            if mismatch["type"] in ("replace", "insert"):
+                # Deletions have no narrated words of their own.
+                mismatch["narrated_text"] = " ".join(
+                    w["word"].strip() for w in differing
+                )
+            if differing:
+                probabilities = [w.get("probability", 0.0) for w in differing]
+                mismatch["confidence"] = sum(probabilities) / len(probabilities)
+            mismatch["tooltip_text"] = (
+                f"Type: {mismatch['type'].capitalize()}\n"
+                f"Confidence: {mismatch['confidence']:.2%}\n"
+                f"Manuscript: '{mismatch['manuscript_text']}'\n"
+                f"Narrated: '{mismatch['narrated_text']}'"
+            )
+        mismatch["verification"] = {
+            "verdict": verdict,
+            "backend": self.backend_name,
+            "heard": " ".join(w["word"].strip() for w in clip_words),
+        }
+        return verdict
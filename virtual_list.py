@@ -0,0 +1,165 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualList:
+    """
+    A list of any length on top of a ttk.Treeview that only holds the rows in
+    sight.
+
+    The tree keeps a fixed number of items that are refilled from a callback as
+    the list scrolls, so a list of thousands of entries is as quick to show,
+    scroll and refresh as a screenful. Positions in the public API are indexes
+    into the whole list.
+    """
+
+    def __init__(
+        self, parent, columns, row_values, height=12, on_activate=None, on_menu=None
+    ):
+        """
+        Args:
+            parent (tk.Widget): The frame holding the tree and its scrollbar.
+            columns (list): (name, heading, width) of every column.
+            row_values (callable): Returns the column values of the row at an index.
+            height (int): Rows in sight.
+            on_activate (callable, optional): Called with the index of a row that is
+                                              double-clicked or activated with Enter.
+            on_menu (callable, optional): Called with (index, x_root, y_root) when a
+                                          row is right-clicked.
+        """
+        self.row_values = row_values
+        self.height = height
+        self.on_activate = on_activate
+        self.on_menu = on_menu
+        self.count = 0
+        self.first = 0
+        self.selected = None
+        self._items = []
+
+        names = [name for name, _, _ in columns]
+        self.tree = ttk.Treeview(
+            parent, columns=names, show="headings", height=height, selectmode="browse"
+        )
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, stretch=name == names[-1])
+        self.scrollbar = ttk.Scrollbar(parent, command=self._on_scrollbar)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self.height))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self.height))
+        self.tree.bind("<Double-Button-1>", self._on_double_click)
+        self.tree.bind("<Return>", self._on_return)
+        self.tree.bind("<Button-3>", self._on_right_click)
+
+    def set_count(self, count):
+        """Sets the number of rows and redraws the ones in sight."""
+        self.count = count
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.first = max(0, min(self.first, count - self.height))
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the rows in sight, e.g. after their values changed."""
+        visible = max(0, min(self.height, self.count - self.first))
+        while len(self._items) < visible:
+            self._items.append(self.tree.insert("", tk.END))
+        while len(self._items) > visible:
+            self.tree.delete(self._items.pop())
+        for offset, item in enumerate(self._items):
+            self.tree.item(item, values=self.row_values(self.first + offset))
+
+        item = self._item(self.selected)
+        if item is not None:
+            self.tree.selection_set(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if self.count:
+            self.scrollbar.set(
+                self.first / self.count, (self.first + visible) / self.count
+            )
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        first = max(0, min(self.first + rows, self.count - self.height))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+        return "break"
+
+    def see(self, index, select=True):
+        """Scrolls a row into sight, and optionally selects it."""
+        if not 0 <= index < self.count:
+            return
+        if select:
+            self.selected = index
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.height:
+            self.first = index - self.height + 1
+        self.refresh()
+
+    def index_at(self, y):
+        """Returns the index of the row at a y coordinate of the tree, or None."""
+        item = self.tree.identify_row(y)
+        if not item or item not in self._items:
+            return None
+        return self.first + self._items.index(item)
+
+    def _item(self, index):
+        if index is None or not self.first <= index < self.first + len(self._items):
+            return None
+        return self._items[index - self.first]
+
+    def _move_selection(self, rows):
+        if self.count:
+            current = self.selected if self.selected is not None else self.first - 1
+            self.see(max(0, min(current + rows, self.count - 1)))
+        return "break"
+
+    def _on_select(self, event):
+        # Also fired by refresh(); a selection scrolled out of sight is kept.
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            self.selected = self.first + self._items.index(selection[0])
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.first = max(
+                0, min(int(float(args[1]) * self.count), self.count - self.height)
+            )
+            self.refresh()
+        elif args[0] == "scroll":
+            rows = int(args[1]) * (self.height if args[2] == "pages" else 1)
+            self.scroll(rows)
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas.
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-3 * steps)
+
+    def _on_double_click(self, event):
+        index = self.index_at(event.y)
+        if index is not None and self.on_activate is not None:
+            self.see(index)
+            self.on_activate(index)
+        return "break"
+
+    def _on_return(self, event):
+        if self.selected is not None and self.on_activate is not None:
+            self.on_activate(self.selected)
+        return "break"
+
+    def _on_right_click(self, event):
+        index = self.index_at(event.y)
+        if index is not None and self.on_menu is not None:
+            self.see(index)
+            self.on_menu(index, event.x_root, event.y_root)
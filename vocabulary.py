@@ -0,0 +1,63 @@
+from array import array
+
+# Integer ids are stored as C ints, half the size of the alignment's index arrays.
+ID_TYPECODE = "i"
+
+
+def normalize_word(word):
+    """A consistent normalization function used for comparison."""
+    return word.lower().replace("’", "'").strip(".,;:!?\"'()[]{} ")
+
+
+class Vocabulary:
+    """
+    Maps normalized words to small integer ids, shared by the manuscript and the
+    transcription so both can be aligned as integer arrays.
+
+    Each distinct raw spelling is normalized only once; encoding a sequence is
+    then one dict lookup per word. Ids are assigned in first-seen order, so the
+    manuscript's words, encoded first, get the lowest ids.
+    """
+
+    def __init__(self):
+        self.words = []  # normalized word by id
+        self._ids = {}  # normalized word -> id
+        self._raw_ids = {}  # raw word -> id
+
+    def __len__(self):
+        return len(self.words)
+
+    def id_of(self, word):
+        """Returns the id of a raw word, adding it to the vocabulary if needed."""
+        word_id = self._raw_ids.get(word)
+        if word_id is None:
+            word_id = self._add(word)
+        return word_id
+
+    def encode(self, words):
+        """
+        Encodes raw words as an array of ids.
+
+        Args:
+            words (list): Raw manuscript tokens or transcribed words.
+
+        Returns:
+            array: One id per word, equal ids meaning equal normalized words.
+        """
+        raw_ids = self._raw_ids
+        for word in set(words).difference(raw_ids):
+            self._add(word)
+        return array(ID_TYPECODE, map(raw_ids.__getitem__, words))
+
+    def decode(self, ids):
+        """Returns the normalized words of a sequence of ids."""
+        return [self.words[word_id] for word_id in ids]
+
+    def _add(self, word):
+        normalized = normalize_word(word)
+        word_id = self._ids.get(normalized)
+        if word_id is None:
+            word_id = self._ids[normalized] = len(self.words)
+            self.words.append(normalized)
+        self._raw_ids[word] = word_id
+        return word_id
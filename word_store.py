@@ -0,0 +1,555 @@
+"""
+Columnar storage for transcribed words and manuscript tokens, and the readers
+for timestamp files.
+
+A `_timestamps.json` can have a binary sidecar, `_timestamps.bin`, holding the
+same words as a table of distinct word strings plus fixed-width start, end,
+probability and word-id columns. The transcriber writes one next to every JSON;
+older JSON files can be converted with this module. load_word_store() prefers an
+up-to-date sidecar, which opens without parsing: the columns are read straight
+from a memory map and word strings are only decoded when used. The map stays
+open until the store is closed.
+
+Usage:
+    python word_store.py jsons
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+
+# Rebuild sidecars whenever the binary format changes.
+WORD_FILE_VERSION = 1
+WORD_FILE_SUFFIX = ".bin"
+# The JSON header is padded to a fixed size so the columns start aligned.
+WORD_FILE_HEADER_SIZE = 256
+
+
+class WordStore:
+    """
+    Columnar storage for transcribed words.
+
+    Instead of one Whisper dict per word, the words are kept as a list of interned
+    strings plus typed arrays for the start/end times and probabilities, so a long
+    book costs a few bytes per word instead of a few hundred.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.start = array("d")
+        self.end = array("d")
+        self.probability = array("d")
+        # (mmap, views) of a store opened from a binary timestamp file.
+        self._mapping = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def close(self):
+        """
+        Unmaps a store opened from a binary timestamp file, after which it must
+        not be used. Other stores hold nothing to release.
+        """
+        if self._mapping is None:
+            return
+        buffer, views = self._mapping
+        self._mapping = None
+        # Every view of the map has to be released before it can be closed.
+        for view in reversed(views):
+            view.release()
+        try:
+            buffer.close()
+        except BufferError:
+            # A slice of a column is still referenced; the map is closed with it.
+            logging.debug("Binary timestamp file still in use; not unmapped yet.")
+
+    def append(self, word, start, end, probability=0.0):
+        self.words.append(sys.intern(word))
+        self.start.append(start)
+        self.end.append(end)
+        self.probability.append(probability)
+
+    def index_at(self, time_in_seconds, starts=None):
+        """
+        Returns the index of the word being spoken at a given time, or None.
+
+        Uses a bisect over the start-time column, so it is O(log n) from any
+        position (e.g. right after a seek). `starts` replaces that column, e.g.
+        with starts snapped to speech onsets.
+        """
+        if starts is None:
+            starts = self.start
+        index = bisect.bisect_right(starts, time_in_seconds) - 1
+        if index >= 0 and time_in_seconds < self.end[index]:
+            return index
+        return None
+
+    def next_change_after(self, time_in_seconds, starts=None):
+        """
+        Returns the next time after `time_in_seconds` at which a word starts or ends.
+        `starts` replaces the start column, as in index_at().
+        """
+        if starts is None:
+            starts = self.start
+        index = bisect.bisect_right(starts, time_in_seconds)
+        candidates = []
+        if index < len(starts):
+            candidates.append(starts[index])
+        if index > 0 and self.end[index - 1] > time_in_seconds:
+            candidates.append(self.end[index - 1])
+        return min(candidates) if candidates else None
+
+    @classmethod
+    def from_dicts(cls, items):
+        """
+        Builds a store from Whisper-style word dicts ({'word', 'start', 'end', ...}).
+        """
+        store = cls()
+        for item in items:
+            store.append(
+                item["word"], item["start"], item["end"], item.get("probability", 0.0)
+            )
+        return store
+
+
+class TokenStore:
+    """
+    Columnar storage for manuscript tokens: word strings plus character offsets.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.start = array("l")
+        self.end = array("l")
+
+    def __len__(self):
+        return len(self.words)
+
+    def append(self, word, start, end):
+        self.words.append(sys.intern(word))
+        self.start.append(start)
+        self.end.append(end)
+
+    def index_at(self, char_offset):
+        """
+        Returns the index of the token containing a character offset, or None.
+        """
+        index = bisect.bisect_right(self.start, char_offset) - 1
+        if index >= 0 and char_offset < self.end[index]:
+            return index
+        return None
+
+    def indices_between(self, start_offset, end_offset):
+        """
+        Returns the (first, last + 1) indices of the tokens overlapping a character range.
+        """
+        first = bisect.bisect_right(self.end, start_offset)
+        last = bisect.bisect_left(self.start, end_offset)
+        return first, max(first, last)
+
+    @classmethod
+    def from_dicts(cls, items):
+        """
+        Builds a store from token dicts ({'word': str, 'start': int, 'end': int}).
+        """
+        store = cls()
+        for item in items:
+            store.append(item["word"], item["start"], item["end"])
+        return store
+
+
+def as_word_store(data):
+    """Returns `data` as a WordStore, converting a list of word dicts if needed."""
+    return data if isinstance(data, WordStore) else WordStore.from_dicts(data)
+
+
+def as_token_store(data):
+    """Returns `data` as a TokenStore, converting a list of token dicts if needed."""
+    return data if isinstance(data, TokenStore) else TokenStore.from_dicts(data)
+
+
+def splice_transcript(transcribed_data, start_time, end_time, replacement, shift=0.0):
+    """
+    Replaces the words of a time range with a re-transcribed pickup.
+
+    Args:
+        transcribed_data (WordStore): The current transcription.
+        start_time (float): Start of the replaced range, in seconds.
+        end_time (float): End of the replaced range, in seconds.
+        replacement (WordStore or list): The words of the new recording, with
+                                         times in the new audio.
+        shift (float): Seconds added to the words after the range, when the new
+                       recording is longer or shorter than the part it replaces.
+
+    Returns:
+        tuple: (new_store, changed_range), where changed_range is the
+               (start, old_end, new_end) word range for MismatchDetector.revalidate().
+    """
+    replacement = as_word_store(replacement)
+    first = bisect.bisect_left(transcribed_data.start, start_time)
+    last = bisect.bisect_left(transcribed_data.start, end_time)
+    store = WordStore()
+    store.words = transcribed_data.words[:first] + list(replacement.words)
+    store.start = array("d", transcribed_data.start[:first]) + replacement.start
+    store.end = array("d", transcribed_data.end[:first]) + replacement.end
+    store.probability = (
+        array("d", transcribed_data.probability[:first]) + replacement.probability
+    )
+    store.words.extend(transcribed_data.words[last:])
+    store.start.extend(t + shift for t in transcribed_data.start[last:])
+    store.end.extend(t + shift for t in transcribed_data.end[last:])
+    store.probability.extend(transcribed_data.probability[last:])
+    return store, (first, last, first + len(replacement))
+
+
+class WordTable(Sequence):
+    """
+    The words of a binary timestamp file, decoded on first access.
+
+    Each word is an id into a table of distinct strings kept in the memory-mapped
+    file. A string is decoded (and interned) the first time any word using it is
+    read, so opening a file costs nothing per word.
+    """
+
+    def __init__(self, ids, offsets, blob):
+        """
+        Args:
+            ids (memoryview): The string id of every word.
+            offsets (memoryview): Start of every string in `blob`, plus its end.
+            blob (memoryview): The UTF-8 strings, back to back.
+        """
+        self._ids = ids
+        self._offsets = offsets
+        self._blob = blob
+        self._strings = [None] * (len(offsets) - 1)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._string(string_id) for string_id in self._ids[index]]
+        return self._string(self._ids[index])
+
+    def __iter__(self):
+        return map(self._string, self._ids)
+
+    def _string(self, string_id):
+        string = self._strings[string_id]
+        if string is None:
+            start, end = self._offsets[string_id], self._offsets[string_id + 1]
+            string = sys.intern(str(self._blob[start:end], "utf-8"))
+            self._strings[string_id] = string
+        return string
+
+
+def word_file_path(json_path):
+    """Returns where the binary sidecar of a timestamp JSON file is kept."""
+    return os.path.splitext(json_path)[0] + WORD_FILE_SUFFIX
+
+
+def _source_identity(path):
+    # The sidecar belongs to one version of its JSON; size and mtime tell them apart.
+    stat = os.stat(path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def write_word_file(path, store, source_path=None):
+    """
+    Writes a WordStore as a binary timestamp file.
+
+    The file is a padded JSON header followed by the start, end and probability
+    columns, the string offsets, the word ids and the UTF-8 string table.
+
+    Args:
+        path (str): The file to write.
+        store (WordStore): The words.
+        source_path (str, optional): The JSON the words came from. The file is
+                                     then only used while that JSON is unchanged.
+    """
+    string_ids = {}
+    ids = array(
+        "I", (string_ids.setdefault(word, len(string_ids)) for word in store.words)
+    )
+    offsets = array("Q", [0])
+    blob = bytearray()
+    for string in string_ids:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    header = {
+        "version": WORD_FILE_VERSION,
+        "byteorder": sys.byteorder,
+        "id_itemsize": ids.itemsize,
+        "words": len(ids),
+        "strings": len(string_ids),
+        "blob": len(blob),
+    }
+    if source_path is not None:
+        header.update(_source_identity(source_path))
+    encoded = json.dumps(header).encode("utf-8")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(encoded.ljust(WORD_FILE_HEADER_SIZE - 1) + b"\n")
+        array("d", store.start).tofile(f)
+        array("d", store.end).tofile(f)
+        array("d", store.probability).tofile(f)
+        offsets.tofile(f)
+        ids.tofile(f)
+        f.write(blob)
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        # Windows cannot replace a file that is mapped, e.g. by an open review app.
+        os.remove(temp_path)
+        raise
+
+
+def open_word_file(path, source_path=None):
+    """
+    Opens a binary timestamp file written by write_word_file().
+
+    Args:
+        path (str): The binary file.
+        source_path (str, optional): The JSON it must have been written from; a
+                                     file of another version counts as missing.
+
+    Returns:
+        WordStore: The words, or None if the file is missing, stale or unusable.
+                   Its columns are read-only views of the mapped file, and its
+                   words a WordTable; close() it to unmap the file.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.read(WORD_FILE_HEADER_SIZE))
+            if (
+                header.get("version") != WORD_FILE_VERSION
+                or header.get("byteorder") != sys.byteorder
+                or header.get("id_itemsize") != array("I").itemsize
+            ):
+                return None
+            if source_path is not None and any(
+                header.get(key) != value
+                for key, value in _source_identity(source_path).items()
+            ):
+                return None
+            count, strings = header["words"], header["strings"]
+            size = WORD_FILE_HEADER_SIZE + 24 * count + 8 * (strings + 1)
+            size += array("I").itemsize * count + header["blob"]
+            if os.fstat(f.fileno()).st_size < size:
+                return None
+            if not count:
+                return WordStore()
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    views = [memoryview(buffer)]
+    position = WORD_FILE_HEADER_SIZE
+    for typecode, length in (
+        ("d", count),
+        ("d", count),
+        ("d", count),
+        ("Q", strings + 1),
+        ("I", count),
+    ):
+        end = position + array(typecode).itemsize * length
+        views.append(views[0][position:end].cast(typecode))
+        position = end
+    views.append(views[0][position : position + header["blob"]])
+    store = WordStore()
+    store.start, store.end, store.probability, offsets, ids, blob = views[1:]
+    store.words = WordTable(ids, offsets, blob)
+    store._mapping = (buffer, views)
+    return store
+
+
+def load_word_store(path, chunk_size=1 << 16):
+    """
+    Loads the words of a timestamp file into a WordStore.
+
+    A binary file is opened directly. For a `_timestamps.json`, its binary
+    sidecar is used when it is up to date; otherwise the JSON is stream-parsed:
+    only one word dict exists at a time, so the full JSON tree (and every Whisper
+    field besides word/start/end/probability) is never held in memory.
+
+    Args:
+        path (str): Path to the timestamp JSON file, or to a binary one.
+        chunk_size (int): Number of characters read from the file at a time.
+    """
+    if path.lower().endswith(WORD_FILE_SUFFIX):
+        store = open_word_file(path)
+        if store is None:
+            raise ValueError(f"{path} is not a usable binary timestamp file.")
+        logging.info(f"Loaded {len(store)} transcribed words from {path}.")
+        return store
+    binary_path = word_file_path(path)
+    store = open_word_file(binary_path, source_path=path)
+    if store is not None:
+        logging.info(f"Loaded {len(store)} transcribed words from {binary_path}.")
+        return store
+
+    store = WordStore()
+    for item in iter_json_words(path, chunk_size):
+        store.append(
+            item["word"], item["start"], item["end"], item.get("probability", 0.0)
+        )
+    logging.info(f"Loaded {len(store)} transcribed words from JSON.")
+    return store
+
+
+def iter_json_words(path, chunk_size=1 << 16):
+    """
+    Yields the dicts of the top-level "words" array of a JSON file one by one.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _JsonChunkReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+            if key == "words":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield reader.decode()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                reader.decode()  # Skip values we don't need, e.g. transcription_text.
+            if reader.expect(",}") == "}":
+                return
+
+
+class _JsonChunkReader:
+    """
+    A minimal pull parser that decodes one JSON value at a time from a text file.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, minimum):
+        chunk = self.f.read(max(self.chunk_size, minimum))
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it."""
+        while True:
+            while (
+                self.pos < len(self.buffer)
+                and self.buffer[self.pos] in self._WHITESPACE
+            ):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON file.")
+            self._fill(0)
+
+    def expect(self, allowed):
+        """Consumes the next non-whitespace character, which must be in `allowed`."""
+        char = self.peek()
+        if char not in allowed:
+            raise ValueError(
+                f"Malformed JSON: expected one of {allowed!r}, got {char!r}."
+            )
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value touching the end of the buffer may be a truncated number.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so a huge value is not re-decoded chunk by chunk.
+            self._fill(len(self.buffer) - self.pos)
+
+
+def convert_json(json_path):
+    """
+    Writes the binary sidecar of a timestamp JSON file.
+
+    Returns:
+        str: The path of the sidecar.
+    """
+    binary_path = word_file_path(json_path)
+    store = WordStore.from_dicts(iter_json_words(json_path))
+    write_word_file(binary_path, store, source_path=json_path)
+    return binary_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write binary sidecars for _timestamps.json files."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Timestamp JSON files, or directories of _timestamps.json files.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rewrite sidecars that are already up to date.",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    json_paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            json_paths.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith("_timestamps.json")
+            )
+        else:
+            json_paths.append(path)
+    failed = 0
+    for json_path in json_paths:
+        if (
+            not args.force
+            and open_word_file(word_file_path(json_path), json_path) is not None
+        ):
+            logging.info(f"Up to date: {json_path}")
+            continue
+        try:
+            logging.info(f"Converted {json_path} -> {convert_json(json_path)}")
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not convert {json_path}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())